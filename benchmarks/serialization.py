@@ -0,0 +1,49 @@
+"""Size and time of the serialization of tasks sent to worker processes, compared to
+cloudpickle.
+
+Usage:
+    python benchmarks/serialization.py [--n-tasks 100000]
+"""
+
+import argparse
+import pickle
+import time
+
+import cloudpickle
+
+from aqueduct.task.serialize import deserialize_task, serialize_task
+
+# Tasks defined in __main__ can not be imported by workers. Use those of another
+# benchmark instead.
+from traversal import Leaf
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-tasks", type=int, default=100000)
+    ns = parser.parse_args()
+
+    tasks = [Leaf(i) for i in range(ns.n_tasks)]
+
+    methods = {
+        "cloudpickle": (cloudpickle.dumps, pickle.loads),
+        "serialize_task": (serialize_task, deserialize_task),
+    }
+
+    print(f"{'method':<16} {'bytes/task':>10} {'dumps (s)':>10} {'loads (s)':>10}")
+    for name, (dumps, loads) in methods.items():
+        start = time.perf_counter()
+        serialized = [dumps(t) for t in tasks]
+        dumps_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for s in serialized:
+            loads(s)
+        loads_time = time.perf_counter() - start
+
+        size = sum([len(s) for s in serialized]) / len(serialized)
+        print(f"{name:<16} {size:>10.0f} {dumps_time:>10.2f} {loads_time:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Per-node overhead of the task tree traversals, on deep chains and wide trees.
+
+The timings on chains of tasks include building the tasks in `requirements()`,
+which usually dominates.
+
+Usage:
+    python benchmarks/traversal.py [--depth 20000] [--width 100000] [--repeat 5]
+"""
+
+from typing import Callable
+
+import argparse
+import sys
+import time
+
+from aqueduct import Task
+from aqueduct.backend.dask import add_work_to_dask_graph
+from aqueduct.cli.base import PeelParentTaskClasses
+from aqueduct.task_graph import TaskGraph
+from aqueduct.task_tree import _map_type_in_tree, reduce_type_in_tree
+
+
+class Link(Task):
+    def __init__(self, index: int):
+        self.index = index
+
+    def requirements(self):
+        return Link(self.index - 1) if self.index > 0 else None
+
+    def run(self, requirements=None):
+        return self.index
+
+
+class Leaf(Task):
+    def __init__(self, index: int):
+        self.index = index
+
+    def run(self):
+        return self.index
+
+
+def nested_tree(depth: int) -> list:
+    tree: list = []
+    for i in range(depth):
+        tree = [tree, {"value": i}]
+
+    return tree
+
+
+def wide_tree(width: int) -> dict:
+    return {
+        f"group_{g}": [(i, i + 1) for i in range(g * 50, (g + 1) * 50)]
+        for g in range(width // 100)
+    }
+
+
+def measure(name: str, n_nodes: int, fn: Callable, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print(f"{name:<40} {best * 1e3:>10.2f} ms {best / n_nodes * 1e6:>10.3f} us/node")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depth", type=int, default=20000)
+    parser.add_argument("--width", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    ns = parser.parse_args()
+
+    # None of the traversals should need more than the default recursion limit.
+    print(f"recursion limit: {sys.getrecursionlimit()}")
+
+    nested = nested_tree(ns.depth)
+    measure(
+        f"map nested tree (depth {ns.depth})",
+        ns.depth,
+        lambda: _map_type_in_tree(nested, int, lambda x: x),
+        ns.repeat,
+    )
+    measure(
+        f"reduce nested tree (depth {ns.depth})",
+        ns.depth,
+        lambda: reduce_type_in_tree(nested, int, int.__add__, 0),
+        ns.repeat,
+    )
+
+    wide = wide_tree(ns.width)
+    n_wide = (ns.width // 100) * 100
+    measure(
+        f"map wide tree ({n_wide} leaves)",
+        n_wide,
+        lambda: _map_type_in_tree(wide, int, lambda x: x),
+        ns.repeat,
+    )
+
+    chain = Link(ns.depth)
+    measure(
+        f"build graph of chain (depth {ns.depth})",
+        ns.depth + 1,
+        lambda: TaskGraph.build(chain),
+        ns.repeat,
+    )
+    measure(
+        f"visit chain (depth {ns.depth})",
+        ns.depth + 1,
+        lambda: PeelParentTaskClasses().visit(chain, []),
+        ns.repeat,
+    )
+    measure(
+        f"dask graph of chain (depth {ns.depth})",
+        ns.depth + 1,
+        lambda: add_work_to_dask_graph(chain, {}, {}),
+        ns.repeat,
+    )
+
+    leaves = [Leaf(i) for i in range(ns.width // 10)]
+    measure(
+        f"build graph of wide tree ({len(leaves)} tasks)",
+        len(leaves),
+        lambda: TaskGraph.build(leaves),
+        ns.repeat,
+    )
+    measure(
+        f"dask graph of wide tree ({len(leaves)} tasks)",
+        len(leaves),
+        lambda: add_work_to_dask_graph(leaves, {}, {}),
+        ns.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Speedup of the concurrent backends on a wide diamond-shaped graph.
+
+A source task is required by `--width` independent branches, which are all required by
+a sink task. Every branch sleeps for `--duration` seconds, so the ideal run time is
+`width * duration / n_workers`.
+
+Usage:
+    python benchmarks/wide_diamond.py [--width 32] [--duration 0.25] [--workers 1 2 4 8]
+"""
+
+import argparse
+import time
+
+from aqueduct import Task
+from aqueduct.backend import ConcurrentBackend, MultiprocessingBackend
+
+
+class Source(Task):
+    def run(self):
+        return 1
+
+
+class Branch(Task):
+    def __init__(self, index: int, duration: float):
+        self.index = index
+        self.duration = duration
+
+    def requirements(self):
+        return Source()
+
+    def run(self, requirements):
+        time.sleep(self.duration)
+        return requirements + self.index
+
+
+class Sink(Task):
+    def __init__(self, width: int, duration: float):
+        self.width = width
+        self.duration = duration
+
+    def requirements(self):
+        return [Branch(i, self.duration) for i in range(self.width)]
+
+    def run(self, requirements):
+        return sum(requirements)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=0.25)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ns = parser.parse_args()
+
+    backends = {
+        "concurrent": ConcurrentBackend,
+        "multiprocessing": MultiprocessingBackend,
+    }
+
+    print(f"{'backend':<16} {'workers':>8} {'time (s)':>10} {'speedup':>8}")
+    for name, backend_class in backends.items():
+        baseline = None
+        for n_workers in ns.workers:
+            backend = backend_class(n_workers=n_workers)
+            try:
+                start = time.perf_counter()
+                backend.run(Sink(ns.width, ns.duration))
+                elapsed = time.perf_counter() - start
+            finally:
+                backend.close()
+
+            if baseline is None:
+                baseline = elapsed * ns.workers[0]
+
+            print(
+                f"{name:<16} {n_workers:>8} {elapsed:>10.2f} {baseline / elapsed:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,7 @@ from .task import (
     apply,
     Functor,
 )
+from .task_graph import TaskGraph
 from .util import count_tasks_to_run, tasks_in_module
 
 
@@ -47,5 +48,6 @@ __all__ = [
     "run",
     "set_config",
     "Task",
+    "TaskGraph",
     "tasks_in_module",
 ]
@@ -0,0 +1,359 @@
+"""Batched, concurrent checks of the artifacts of a task graph.
+
+Checking artifacts one at a time means one or two `stat` calls per artifact, in
+sequence. On network filesystems, this dominates planning time for large trees. An
+:class:`ArtifactSnapshot` checks many artifacts at once on a thread pool, lists
+directories instead of stating their files when many artifacts share a directory, and
+remembers the results for the rest of the run."""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+
+import contextlib
+import dataclasses
+import datetime
+import os
+import pathlib
+import stat
+import threading
+
+from ..config import get_aqueduct_config
+from .artifact import Artifact
+from .base import resolve_artifact_from_spec
+from .composite import CompositeArtifact
+from .local import LocalFilesystemArtifact
+
+if TYPE_CHECKING:
+    from ..task import AbstractTask
+
+AQ_CURRENT_SNAPSHOT: Optional["ArtifactSnapshot"] = None
+
+
+@dataclasses.dataclass
+class ArtifactStatus:
+    exists: bool
+    size: int = 0
+    last_modified: Optional[datetime.datetime] = None
+
+
+MISSING = ArtifactStatus(exists=False)
+
+
+def status_of_stat_result(st: os.stat_result) -> ArtifactStatus:
+    if stat.S_ISREG(st.st_mode) or stat.S_ISDIR(st.st_mode):
+        return ArtifactStatus(
+            exists=True,
+            size=st.st_size,
+            last_modified=datetime.datetime.fromtimestamp(st.st_mtime),
+        )
+    else:
+        return MISSING
+
+
+def stat_path(path: pathlib.Path) -> ArtifactStatus:
+    try:
+        return status_of_stat_result(os.stat(path))
+    except (FileNotFoundError, NotADirectoryError):
+        return MISSING
+
+
+def scan_directory(
+    directory: pathlib.Path, paths: list[pathlib.Path]
+) -> Optional[list[tuple[pathlib.Path, ArtifactStatus]]]:
+    """List `directory` once and return the status of the `paths` it contains. Only
+    the entries that exist are stated. Returns `None` if the directory does not
+    exist."""
+    wanted = {p.name: p for p in paths}
+    statuses = {p: MISSING for p in paths}
+
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name in wanted:
+                    try:
+                        status = status_of_stat_result(entry.stat())
+                    except FileNotFoundError:
+                        status = MISSING
+                    statuses[wanted[entry.name]] = status
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+    return list(statuses.items())
+
+
+def leaf_artifacts(artifact: Artifact) -> Iterator[Artifact]:
+    if isinstance(artifact, CompositeArtifact):
+        for a in artifact.artifacts:
+            yield from leaf_artifacts(a)
+    else:
+        yield artifact
+
+
+class ArtifactSnapshot:
+    """Existence, size and modification time of the filesystem artifacts checked
+    during a run.
+
+    Results are cached, including negative ones: once a path or its parent directory
+    is known to be missing, it is not checked again. Call :meth:`invalidate` after
+    writing an artifact.
+
+    The snapshot also caches the resolved artifact of every task, keyed by the task
+    unique key, so that `artifact()` is only called once per task during a run. Call
+    :meth:`forget_task` if the artifact of a task changes during the run.
+
+    Arguments:
+        max_workers: Number of threads used to check artifacts concurrently. Defaults
+            to the `aqueduct.artifact_check_workers` configuration option, or to the
+            default of :class:`ThreadPoolExecutor`.
+        scan_threshold: If at least that many artifacts of a batch live in the same
+            directory, the directory is listed once instead of stating every
+            artifact."""
+
+    def __init__(self, max_workers: Optional[int] = None, scan_threshold: int = 8):
+        if max_workers is None:
+            max_workers = get_aqueduct_config().get("artifact_check_workers", None)
+
+        self.max_workers = max_workers
+        self.scan_threshold = scan_threshold
+
+        self._statuses: dict[pathlib.Path, ArtifactStatus] = {}
+        self._task_artifacts: dict[str, Optional[Artifact]] = {}
+        self._stale_keys: set[str] = set()
+        self._missing_directories: set[pathlib.Path] = set()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _is_known(self, path: pathlib.Path) -> bool:
+        return path in self._statuses or path.parent in self._missing_directories
+
+    def prefetch(self, artifacts: Iterable[Optional[Artifact]]):
+        """Check all the filesystem artifacts in `artifacts` concurrently. Artifacts
+        that were already checked are skipped."""
+        by_directory: dict[pathlib.Path, list[pathlib.Path]] = {}
+        with self._lock:
+            for artifact in artifacts:
+                if artifact is None:
+                    continue
+
+                for leaf in leaf_artifacts(artifact):
+                    if isinstance(leaf, LocalFilesystemArtifact) and not self._is_known(
+                        leaf.path
+                    ):
+                        by_directory.setdefault(leaf.path.parent, []).append(leaf.path)
+
+        if not by_directory:
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="aq-artifact-check"
+            )
+
+        scans, stats = [], []
+        for directory, paths in by_directory.items():
+            paths = list(dict.fromkeys(paths))
+            if len(paths) >= self.scan_threshold:
+                future = self._executor.submit(scan_directory, directory, paths)
+                scans.append((directory, paths, future))
+            else:
+                stats.extend([(p, self._executor.submit(stat_path, p)) for p in paths])
+
+        for directory, paths, future in scans:
+            statuses = future.result()
+            with self._lock:
+                if statuses is None:
+                    self._missing_directories.add(directory)
+                else:
+                    self._statuses.update(statuses)
+
+        for path, future in stats:
+            status = future.result()
+            with self._lock:
+                self._statuses[path] = status
+
+    def artifact_of(self, task: "AbstractTask") -> Optional[Artifact]:
+        """The resolved artifact of `task`. `task.artifact()` is only called the
+        first time a task with that unique key is seen."""
+        key = task._unique_key()
+
+        with self._lock:
+            if key in self._task_artifacts:
+                return self._task_artifacts[key]
+
+        artifact = resolve_artifact_from_spec(task.artifact())
+        with self._lock:
+            return self._task_artifacts.setdefault(key, artifact)
+
+    def forget_task(self, task: "AbstractTask"):
+        """Drop the cached artifact of `task`. The next call to :meth:`artifact_of`
+        calls `task.artifact()` again."""
+        with self._lock:
+            self._task_artifacts.pop(task._unique_key(), None)
+
+    def mark_stale(self, keys: Iterable[str]):
+        """Mark the tasks with the given unique keys as stale for the rest of the
+        run."""
+        with self._lock:
+            self._stale_keys.update(keys)
+
+    def is_marked_stale(self, task: "AbstractTask") -> bool:
+        return task._unique_key() in self._stale_keys
+
+    def status(self, artifact: LocalFilesystemArtifact) -> ArtifactStatus:
+        """The status of a filesystem artifact. It is checked now if it was not
+        prefetched."""
+        path = artifact.path
+        with self._lock:
+            if path.parent in self._missing_directories:
+                return MISSING
+            elif path in self._statuses:
+                return self._statuses[path]
+
+        status = stat_path(path)
+        with self._lock:
+            self._statuses[path] = status
+
+        return status
+
+    def exists(self, artifact: Artifact) -> bool:
+        """Same as `artifact.exists()`, using the snapshot for filesystem artifacts."""
+        if isinstance(artifact, CompositeArtifact):
+            return all([self.exists(a) for a in artifact.artifacts])
+        elif isinstance(artifact, LocalFilesystemArtifact):
+            return self.status(artifact).exists
+        else:
+            return artifact.exists()
+
+    def size(self, artifact: Artifact) -> int:
+        """Same as `artifact.size()`, using the snapshot for filesystem artifacts."""
+        if isinstance(artifact, CompositeArtifact):
+            return sum([self.size(a) for a in artifact.artifacts])
+        elif isinstance(artifact, LocalFilesystemArtifact):
+            return self.status(artifact).size
+        else:
+            return artifact.size()
+
+    def modification_times(
+        self, artifact: Artifact
+    ) -> tuple[Optional[float], Optional[float]]:
+        """The oldest and newest modification timestamps of the stored parts of
+        `artifact`. Both are `None` if nothing is stored."""
+        times = []
+        for leaf in leaf_artifacts(artifact):
+            if isinstance(leaf, LocalFilesystemArtifact):
+                last_modified = self.status(leaf).last_modified
+            elif leaf.exists():
+                last_modified = leaf.last_modified()
+            else:
+                last_modified = None
+
+            if last_modified is not None:
+                times.append(last_modified.timestamp())
+
+        if times:
+            return min(times), max(times)
+        else:
+            return None, None
+
+    def invalidate(self, artifact: Optional[Artifact]):
+        """Forget what is known about `artifact`, typically after it was written."""
+        if artifact is None:
+            return
+
+        with self._lock:
+            for leaf in leaf_artifacts(artifact):
+                if isinstance(leaf, LocalFilesystemArtifact):
+                    self._statuses.pop(leaf.path, None)
+                    self._missing_directories.difference_update(leaf.path.parents)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def current_snapshot() -> Optional[ArtifactSnapshot]:
+    return AQ_CURRENT_SNAPSHOT
+
+
+@contextlib.contextmanager
+def use_snapshot(snapshot: Optional[ArtifactSnapshot] = None):
+    """Make `snapshot` the current snapshot for the duration of the context. A new
+    snapshot is created if none is given. It is closed when the context exits."""
+    global AQ_CURRENT_SNAPSHOT
+
+    if snapshot is None:
+        snapshot = ArtifactSnapshot()
+
+    previous = AQ_CURRENT_SNAPSHOT
+    AQ_CURRENT_SNAPSHOT = snapshot
+    try:
+        yield snapshot
+    finally:
+        AQ_CURRENT_SNAPSHOT = previous
+        snapshot.close()
+
+
+def artifact_exists(artifact: Artifact) -> bool:
+    """Check if `artifact` exists, through the current snapshot if there is one."""
+    snapshot = current_snapshot()
+
+    if snapshot is None:
+        return artifact.exists()
+    else:
+        return snapshot.exists(artifact)
+
+
+def prefetch_artifacts(artifacts: Iterable[Optional[Artifact]]):
+    """Check `artifacts` concurrently, if a snapshot is active."""
+    snapshot = current_snapshot()
+
+    if snapshot is not None:
+        snapshot.prefetch(artifacts)
+
+
+def resolve_task_artifact(task: "AbstractTask") -> Optional[Artifact]:
+    """Resolve the artifact of `task`, through the current snapshot if there is
+    one."""
+    snapshot = current_snapshot()
+
+    if snapshot is None:
+        return resolve_artifact_from_spec(task.artifact())
+    else:
+        return snapshot.artifact_of(task)
+
+
+def forget_task_artifact(task: "AbstractTask"):
+    """Invalidate the cached artifact of `task` in the current snapshot, if any."""
+    snapshot = current_snapshot()
+
+    if snapshot is not None:
+        snapshot.forget_task(task)
+
+
+def artifact_modification_times(
+    artifact: Artifact,
+) -> tuple[Optional[float], Optional[float]]:
+    """The oldest and newest modification timestamps of `artifact`, through the
+    current snapshot if there is one."""
+    snapshot = current_snapshot()
+
+    if snapshot is None:
+        snapshot = ArtifactSnapshot()
+
+    return snapshot.modification_times(artifact)
+
+
+def is_marked_stale(task: "AbstractTask") -> bool:
+    """Indicates if `task` was marked stale in the current snapshot."""
+    snapshot = current_snapshot()
+
+    return snapshot is not None and snapshot.is_marked_stale(task)
+
+
+def invalidate_artifact(artifact: Optional[Artifact]):
+    """Tell the current snapshot, if any, that `artifact` was written."""
+    snapshot = current_snapshot()
+
+    if snapshot is not None:
+        snapshot.invalidate(artifact)
@@ -1,10 +1,10 @@
 import dataclasses
-from typing import MutableMapping, Type, TYPE_CHECKING, Sequence, List
+from typing import MutableMapping, Optional, Type, TYPE_CHECKING, Sequence, List
 
 from .artifact import Artifact
-from .base import resolve_artifact_from_spec
 from .composite import CompositeArtifact
-from ..task_tree import reduce_type_in_tree, _resolve_task_tree
+from .snapshot import ArtifactSnapshot, use_snapshot
+from ..task_tree import reduce_type_in_tree
 
 if TYPE_CHECKING:
     from ..task import AbstractTask
@@ -19,7 +19,9 @@ class ArtifactStatistics:
 
 
 def add_artifact_to_report(
-    artifact: Artifact, report: MutableMapping[Type[Artifact], ArtifactStatistics]
+    artifact: Artifact,
+    report: MutableMapping[Type[Artifact], ArtifactStatistics],
+    snapshot: Optional[ArtifactSnapshot] = None,
 ):
     if isinstance(artifact, CompositeArtifact):
         statistics = report.get(type(artifact), ArtifactStatistics())
@@ -27,14 +29,17 @@ def add_artifact_to_report(
         report[type(artifact)] = statistics
 
         for a in artifact.artifacts:
-            add_artifact_to_report(a, report)
+            add_artifact_to_report(a, report, snapshot)
     else:
         stats = report.get(type(artifact), ArtifactStatistics())
         stats.count += 1
 
-        if artifact.exists():
+        if snapshot is None:
+            snapshot = ArtifactSnapshot()
+
+        if snapshot.exists(artifact):
             stats.in_cache += 1
-            stats.stored_size += artifact.size()
+            stats.stored_size += snapshot.size(artifact)
 
         report[type(artifact)] = stats
 
@@ -44,35 +49,40 @@ def artifact_report(
 ) -> MutableMapping[Type[Artifact], ArtifactStatistics]:
     """Produce a small report about the artifacts associated with a task and its
     dependencies."""
-    artifacts_by_type = {}
+    from ..task_graph import TaskGraph
 
-    def accumulate_artifacts(task: "AbstractTask", *args, **kwargs):
-        spec = task.artifact()
+    artifacts_by_type = {}
 
-        if spec is not None:
-            artifact = resolve_artifact_from_spec(spec)
-            add_artifact_to_report(artifact, artifacts_by_type)
+    with use_snapshot() as snapshot:
+        graph = TaskGraph.build(task, ignore_cache=True)
+        artifacts = [t._resolve_artifact() for t in graph.tasks]
+        snapshot.prefetch(artifacts)
 
-    _resolve_task_tree(task, accumulate_artifacts, ignore_cache=True)
+        for artifact in artifacts:
+            if artifact is not None:
+                add_artifact_to_report(artifact, artifacts_by_type, snapshot)
 
     return artifacts_by_type
 
 
 def head_artifacts(task_tree: "TaskTree") -> Sequence[Artifact]:
     from ..task import AbstractTask
+    from ..task_graph import TaskGraph
 
-    def reduce_head_artifact(t: AbstractTask, acc: List[Artifact]) -> List[Artifact]:
-        a = resolve_artifact_from_spec(t.artifact())
+    head_artifacts = []
+
+    def expand_until_artifact(t: AbstractTask) -> bool:
+        a = t._resolve_artifact()
 
         if a is None:
-            r = t._resolve_requirements()
-            return reduce_type_in_tree(r, AbstractTask, reduce_head_artifact, acc)
+            return True
         else:
-            return [*acc, a]
+            head_artifacts.append(a)
+            return False
 
-    head_artifacts = reduce_type_in_tree(
-        task_tree, AbstractTask, reduce_head_artifact, []
-    )
+    # Only the tasks without artifacts are expanded, so every task that has an
+    # artifact in the graph is a head.
+    TaskGraph.build(task_tree, expand=expand_until_artifact)
 
     def flatten_composite_artifacts(a: Artifact, acc: List[Artifact]) -> List[Artifact]:
         if isinstance(a, CompositeArtifact):
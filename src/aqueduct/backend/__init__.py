@@ -6,24 +6,36 @@ from typing import TypeAlias, Literal, Mapping, cast
 import collections.abc
 
 from aqueduct.config import get_aqueduct_config
+from .asyncio import AsyncioBackend
 from .backend import Backend
 from .concurrent import ConcurrentBackend
 from .dask import DaskBackend, resolve_dask_backend_dict_spec
 from .immediate import ImmediateBackend
 from .multiprocessing import MultiprocessingBackend
+from .thread import ThreadBackend
 import hydra
 
 NAMES_OF_BACKENDS = {
+    "asyncio": AsyncioBackend,
     "immediate": ImmediateBackend,
     "concurrent": ConcurrentBackend,
     "dask": DaskBackend,
     "multiprocessing": MultiprocessingBackend,
+    "thread": ThreadBackend,
 }
 
 BackendDictSpec: TypeAlias = Mapping[str, int | str]
 
 BackendSpec: TypeAlias = (
-    Literal["immediate", "concurrent", "dask", "dask_graph", "multiprocessing"]
+    Literal[
+        "asyncio",
+        "immediate",
+        "concurrent",
+        "dask",
+        "dask_graph",
+        "multiprocessing",
+        "thread",
+    ]
     | Backend
     | BackendDictSpec
     | None
@@ -57,7 +69,29 @@ def resolve_dict_backend_spec(spec: BackendDictSpec) -> Backend:
     elif spec["type"] == "immediate":
         return ImmediateBackend()
     elif spec["type"] == "multiprocessing":
-        return MultiprocessingBackend(n_workers=int(spec["n_workers"]))
+        max_in_flight = spec.get("max_in_flight", None)
+        max_concurrent_tasks = spec.get("max_concurrent_tasks", None)
+        return MultiprocessingBackend(
+            n_workers=int(spec["n_workers"]),
+            max_in_flight=int(max_in_flight) if max_in_flight is not None else None,
+            max_concurrent_tasks=(
+                int(max_concurrent_tasks) if max_concurrent_tasks is not None else None
+            ),
+        )
+    elif spec["type"] == "asyncio":
+        max_concurrent_tasks = spec.get("max_concurrent_tasks", None)
+        return AsyncioBackend(
+            n_workers=int(spec["n_workers"]),
+            max_concurrent_tasks=(
+                int(max_concurrent_tasks) if max_concurrent_tasks is not None else None
+            ),
+        )
+    elif spec["type"] == "thread":
+        max_in_flight = spec.get("max_in_flight", None)
+        return ThreadBackend(
+            n_workers=int(spec["n_workers"]),
+            max_in_flight=int(max_in_flight) if max_in_flight is not None else None,
+        )
     else:
         raise KeyError("Unrecognized backend spec")
 
@@ -67,6 +101,7 @@ def get_default_backend() -> Backend:
 
 
 __all__ = [
+    "AsyncioBackend",
     "ConcurrentBackend",
     "DaskBackend",
     "ImmediateBackend",
@@ -75,4 +110,5 @@ __all__ = [
     "Backend",
     "get_default_backend",
     "MultiprocessingBackend",
+    "ThreadBackend",
 ]
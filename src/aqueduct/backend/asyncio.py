@@ -0,0 +1,157 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Iterator,
+    Literal,
+    NotRequired,
+    Optional,
+    Type,
+    TypedDict,
+    TypeVar,
+)
+
+import asyncio
+import contextlib
+import logging
+import os
+import threading
+
+from ..task import AbstractTask, Task
+from ..task_graph import TaskGraph
+from ..task_tree import TaskTree
+from .base import TaskError
+from .immediate import ImmediateBackend
+from .scheduler import schedule_task_graph
+from .spill import SpillingResultStore, memory_budget
+
+_T = TypeVar("_T")
+
+_logger = logging.getLogger(__name__)
+
+
+class AsyncioBackendDictSpec(TypedDict):
+    type: Literal["asyncio"]
+    n_workers: int
+    max_concurrent_tasks: NotRequired[int]
+
+
+@contextlib.contextmanager
+def running_event_loop(
+    executor: Optional[ThreadPoolExecutor] = None,
+) -> Iterator[asyncio.AbstractEventLoop]:
+    """Run a new event loop in a background thread for the duration of the context.
+
+    Coroutines are sent to the loop with :func:`asyncio.run_coroutine_threadsafe`.
+    Running the loop in its own thread also works when the calling thread already runs
+    an event loop, like in Jupyter.
+
+    Arguments:
+        executor: If specified, the default executor of the loop."""
+    loop = asyncio.new_event_loop()
+    if executor is not None:
+        loop.set_default_executor(executor)
+
+    thread = threading.Thread(
+        target=loop.run_forever, name="aq-event-loop", daemon=True
+    )
+    thread.start()
+    try:
+        yield loop
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+class AsyncioBackend(ImmediateBackend):
+    """Computing backend that drives the task graph from a single event loop.
+
+    Tasks whose `run` method is defined with `async def` run on the event loop, so
+    that thousands of tasks waiting on I/O overlap without a thread each. Other tasks,
+    as well as the loading and saving of artifacts, run in the default executor of the
+    loop, a pool of threads.
+
+    Arguments:
+        n_workers: Number of threads of the default executor. Defaults to the number
+            of CPUs.
+        max_concurrent_tasks: Maximum number of tasks running at the same time. If
+            `None`, every task starts as soon as its requirements are available."""
+
+    def __init__(self, n_workers=None, max_concurrent_tasks=None):
+        self.n_workers = n_workers
+        self.max_concurrent_tasks = max_concurrent_tasks
+
+    def _n_workers(self) -> int:
+        return self.n_workers or os.cpu_count() or 1
+
+    def _run(self, work: TaskTree, force_tasks: set[Type[AbstractTask]] = set()) -> Any:
+        graph = TaskGraph.build(work, force_tasks=force_tasks)
+
+        executor = ThreadPoolExecutor(
+            max_workers=self._n_workers(), thread_name_prefix="aq-worker"
+        )
+        budget = memory_budget()
+        results = SpillingResultStore(graph, budget) if budget is not None else None
+
+        try:
+            with running_event_loop(executor) as loop:
+
+                def submit(node: int, requirements=None) -> Future:
+                    return asyncio.run_coroutine_threadsafe(
+                        self.check_artifact_and_execute_async(
+                            graph.tasks[node], requirements, force_tasks
+                        ),
+                        loop,
+                    )
+
+                return schedule_task_graph(
+                    graph,
+                    submit,
+                    max_in_flight=self.max_concurrent_tasks,
+                    results=results,
+                )
+        finally:
+            executor.shutdown(cancel_futures=True)
+            if results is not None:
+                results.close()
+
+    async def check_artifact_and_execute_async(
+        self,
+        task: AbstractTask[_T],
+        requirements=None,
+        force_tasks: set[Type[AbstractTask]] = set(),
+    ) -> _T:
+        """Like :meth:`check_artifact_and_execute`, but the `run` method of
+        asynchronous tasks is awaited on the event loop."""
+        loop = asyncio.get_running_loop()
+
+        if not (isinstance(task, Task) and task._is_async()):
+            return await loop.run_in_executor(
+                None, self.check_artifact_and_execute, task, requirements, force_tasks
+            )
+
+        if await loop.run_in_executor(None, self.should_load, task, force_tasks):
+            _logger.info(f"Loading result of {task} from {task._resolve_artifact()}")
+            return await loop.run_in_executor(None, task.load)
+
+        _logger.info(f"Running task {task}")
+        try:
+            if requirements is not None:
+                task_result = await task.run(requirements)
+            else:
+                task_result = await task.run()
+        except Exception as e:
+            raise TaskError(f"Error while executing task {task}") from e
+
+        await loop.run_in_executor(None, self.save_result, task, task_result)
+        return task_result
+
+    def _spec(self) -> AsyncioBackendDictSpec:
+        spec: AsyncioBackendDictSpec = {
+            "type": "asyncio",
+            "n_workers": self._n_workers(),
+        }
+        if self.max_concurrent_tasks is not None:
+            spec["max_concurrent_tasks"] = self.max_concurrent_tasks
+
+        return spec
@@ -1,6 +1,10 @@
 import abc
+import contextlib
 from typing import Type, Any, TYPE_CHECKING, Optional
 
+from ..artifact.snapshot import current_snapshot, use_snapshot
+from ..config import get_aqueduct_config
+from ..staleness import mark_stale_tasks
 from ..task_tree import TaskTree
 from ..task import AbstractTask
 
@@ -26,7 +30,17 @@ class Backend(abc.ABC):
         global AQ_CURRENT_BACKEND
         AQ_CURRENT_BACKEND = self
 
-        result = self._run(work, force_tasks=force_tasks)
+        if force_tasks is None:
+            force_tasks = set()
+
+        # Artifact checks are batched and cached for the duration of the run. Nested
+        # runs share the snapshot of the outer run.
+        snapshot = current_snapshot()
+        with use_snapshot() if snapshot is None else contextlib.nullcontext():
+            if get_aqueduct_config().get("check_upstream_mtime", False):
+                mark_stale_tasks(work, force_tasks=force_tasks)
+
+            result = self._run(work, force_tasks=force_tasks)
         AQ_CURRENT_BACKEND = None
         return result
 
@@ -0,0 +1,116 @@
+"""Send large objects to worker processes once, instead of once per call.
+
+The object is pickled once into a shared memory block. Only a small handle travels
+with every call. Workers unpickle the block the first time they see a handle, and
+cache the result by key for the following calls. Handles also list the broadcasts
+closed before them, whose cached copies workers drop as soon as they receive a new
+broadcast."""
+
+from multiprocessing import shared_memory
+from typing import Any, Hashable, NamedTuple, Optional
+
+import collections
+import pickle
+
+MAX_CACHED_BROADCAST_BYTES = 256 * 2**20
+"""Maximum size, once pickled, of the broadcast objects a worker keeps in its cache.
+The object received last is kept whatever its size."""
+
+MAX_CLOSED_BROADCASTS = 16
+"""Number of closed broadcasts a process reports in the handles it creates."""
+
+AQ_WORKER_BROADCASTS: collections.OrderedDict[Hashable, tuple[str, int, Any]] = (
+    collections.OrderedDict()
+)
+"""Broadcast objects received by the current process, by key. The name of the shared
+memory block they came from and their size are stored along with them."""
+
+_CLOSED_BROADCASTS: collections.deque[str] = collections.deque(
+    maxlen=MAX_CLOSED_BROADCASTS
+)
+"""Names of the shared memory blocks of the last broadcasts closed by the current
+process."""
+
+
+class BroadcastHandle(NamedTuple):
+    """Travels to the workers instead of the broadcast object.
+
+    Attributes:
+        key: Identifies the object in the cache of the workers.
+        name: Name of the shared memory block.
+        size: Size of the pickled object.
+        closed: Names of the blocks of broadcasts closed before this one was created.
+            Workers drop their copies of these objects."""
+
+    key: Hashable
+    name: str
+    size: int
+    closed: tuple[str, ...] = ()
+
+
+class Broadcast:
+    """Pickle `value` into a shared memory block, for the lifetime of the object.
+
+    Use as a context manager, and send :attr:`handle` to the workers, who call
+    :func:`receive_broadcast` on it.
+
+    Arguments:
+        value: The object to broadcast.
+        key: Identifies the object in the cache of the workers. Objects broadcast with
+            the same key replace each other."""
+
+    def __init__(self, value: Any, key: Hashable):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self._shm: Optional[shared_memory.SharedMemory] = shared_memory.SharedMemory(
+            create=True, size=max(len(payload), 1)
+        )
+        self._shm.buf[: len(payload)] = payload
+        self.handle = BroadcastHandle(
+            key, self._shm.name, len(payload), tuple(_CLOSED_BROADCASTS)
+        )
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            _CLOSED_BROADCASTS.append(self._shm.name)
+            self._shm = None
+
+    def __enter__(self) -> "Broadcast":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def receive_broadcast(handle: BroadcastHandle) -> Any:
+    """Get the object behind `handle`. It is only read from shared memory the first
+    time it is received by the current process."""
+    cached = AQ_WORKER_BROADCASTS.get(handle.key, None)
+    if cached is not None and cached[0] == handle.name:
+        AQ_WORKER_BROADCASTS.move_to_end(handle.key)
+        return cached[2]
+
+    # The tasks which used closed broadcasts are over, release their objects.
+    closed = set(handle.closed)
+    for key, (name, _, _) in list(AQ_WORKER_BROADCASTS.items()):
+        if name in closed:
+            del AQ_WORKER_BROADCASTS[key]
+
+    shm = shared_memory.SharedMemory(name=handle.name)
+    try:
+        with shm.buf[: handle.size] as payload:
+            value = pickle.loads(payload)
+    finally:
+        shm.close()
+
+    AQ_WORKER_BROADCASTS[handle.key] = (handle.name, handle.size, value)
+    AQ_WORKER_BROADCASTS.move_to_end(handle.key)
+
+    total_size = sum([size for _, size, _ in AQ_WORKER_BROADCASTS.values()])
+    while total_size > MAX_CACHED_BROADCAST_BYTES and len(AQ_WORKER_BROADCASTS) > 1:
+        _, (_, size, _) = AQ_WORKER_BROADCASTS.popitem(last=False)
+        total_size -= size
+
+    return value
@@ -1,65 +1,271 @@
-from concurrent.futures import Executor, Future, ProcessPoolExecutor, wait
-from typing import Optional, TypeVar, Any, Literal, TypedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker
+from typing import Optional, TypeVar, Any, Literal, Type, TypedDict
 
-import cloudpickle
+import dataclasses
+import logging
 
+from ..artifact import Artifact, LocalFilesystemArtifact
+from ..artifact.snapshot import invalidate_artifact, leaf_artifacts
+from ..config import get_config, set_config
 from ..task import AbstractTask
-from ..util import TypeTree
-from ..task_tree import _map_type_in_tree, _resolve_task_tree
+from ..task.mapreduce import AbstractMapReduceTask, map_unit
+from ..task.serialize import deserialize_task, load_task, serialize_task
+from ..task.task import Task
+from ..task_graph import NodeTree, TaskGraph
+from ..task_tree import ResultStore, TaskTree, _map_type_in_tree
 from .backend import Backend
+from .base import TaskError
+from .broadcast import Broadcast, BroadcastHandle, receive_broadcast
+from .immediate import execute_map_reduce_task, execute_task, should_load
+from .scheduler import completed_future, map_reduce_futures, schedule_task_graph
 
 T = TypeVar("T")
 
+_logger = logging.getLogger(__name__)
 
-def undill_and_run(serialized_fn, *args, **kwargs):
-    fn = cloudpickle.loads(serialized_fn)
 
-    try:
-        return fn(*args, **kwargs)
-    except Exception as e:
-        raise
+@dataclasses.dataclass
+class LoadMarker:
+    """Stands for the result of a task that is stored in its artifact. It travels
+    between processes instead of the result itself, and is loaded where the result is
+    needed."""
 
+    serialized_task: bytes
 
-def task_to_future_resolve(task: AbstractTask[T], executor: Executor) -> Future[T]:
-    def map_task_to_future(
-        task: AbstractTask[T], requirements: Optional[TypeTree[Future]] = None
-    ) -> Future[T]:
-        if requirements is not None:
-            requirement_futures = []
+    def load(self) -> Any:
+        return deserialize_task(self.serialized_task).load()
 
-            def acc_reqs(f: Future) -> Future:
-                requirement_futures.append(f)
-                return f
 
-            def future_to_value(f: Future[T]) -> T:
-                return f.result()
+def resolve_load_marker(value: Any) -> Any:
+    if isinstance(value, LoadMarker):
+        return value.load()
+    else:
+        return value
 
-            _map_type_in_tree(requirements, Future, acc_reqs)
 
-            wait(requirement_futures)
+def is_reloadable(artifact: Optional[Artifact]) -> bool:
+    """Indicates if an artifact saved in a worker process can be loaded from any other
+    process, that is, if it lives on the filesystem."""
+    return artifact is not None and all(
+        [isinstance(a, LocalFilesystemArtifact) for a in leaf_artifacts(artifact)]
+    )
 
-            mapped_requirements = _map_type_in_tree(
-                requirements, Future, future_to_value
-            )
 
+def undill_and_run(
+    cfg,
+    serialized_task,
+    requirement_nodes: NodeTree = None,
+    requirement_values: Optional[dict[int, Any]] = None,
+):
+    """Run a task in a worker process.
+
+    Requirements are received as the tree of their node ids, along with the result of
+    every node. Results that were left in their artifact are loaded here. If the
+    result of the task can be saved to a filesystem artifact, it is saved here, and
+    only a :class:`LoadMarker` is sent back when the task can be loaded."""
+    set_config(cfg)
+    task = deserialize_task(serialized_task)
+
+    if requirement_nodes is None or requirement_values is None:
+        requirements = None
+    else:
+        requirements = _map_type_in_tree(
+            requirement_nodes,
+            int,
+            lambda node: resolve_load_marker(requirement_values[node]),
+        )
+
+    if isinstance(task, Task):
+        result = execute_task(task, requirements)
+    elif isinstance(task, AbstractMapReduceTask):
+        result = execute_map_reduce_task(task, requirements)
+    else:
+        raise RuntimeError("Unhandled task type.")
+
+    if (
+        task.AQ_AUTOSAVE
+        and result is not None
+        and is_reloadable(task._resolve_artifact())
+    ):
+        task.save(result)
+
+        if task.AQ_AUTOLOAD:
+            return LoadMarker(serialized_task)
+
+    return result
+
+
+def map_unit_in_worker(cfg, handle: BroadcastHandle, batched: bool, unit):
+    """Map a unit of items of a map-reduce task in a worker process. The task and its
+    requirements are received through a broadcast."""
+    set_config(cfg)
+    serialized_task, requirements = receive_broadcast(handle)
+    return map_unit(load_task(serialized_task), batched, unit, requirements)
+
+
+def map_reduce_on_executor(
+    executor: Executor,
+    task: AbstractMapReduceTask,
+    serialized_task: bytes,
+    requirements=None,
+    max_in_flight: Optional[int] = None,
+    n_workers: int = 1,
+) -> Any:
+    """Map the items of `task` on `executor`, and reduce them in the calling process.
+
+    The task and its requirements are broadcast to the workers once. See
+    :func:`map_reduce_futures` for the meaning of the other arguments."""
+    cfg = get_config()
+    accumulator = task.accumulator(requirements)
+
+    with Broadcast(
+        (serialized_task, requirements), key=task._unique_key()
+    ) as broadcast:
+
+        def submit(batched: bool, unit) -> Future:
             return executor.submit(
-                undill_and_run, cloudpickle.dumps(task), mapped_requirements
+                map_unit_in_worker, cfg, broadcast.handle, batched, unit
             )
+
+        accumulator = map_reduce_futures(
+            task, submit, accumulator, requirements, max_in_flight, n_workers
+        )
+
+    return task.post(accumulator, requirements)
+
+
+def run_task_graph_on_executor(
+    graph: TaskGraph,
+    executor: Executor,
+    max_in_flight: Optional[int] = None,
+    force_tasks: Optional[set[Type[AbstractTask]]] = None,
+    drivers: Optional[Executor] = None,
+    n_workers: int = 1,
+) -> Any:
+    """Run every task of `graph` on `executor`. A task is submitted as soon as its
+    requirements completed, so independent branches run concurrently.
+
+    Artifacts are checked in the calling process. Cached results are only loaded by
+    the processes that need them. Results are saved by the worker that computed them,
+    unless their artifact does not live on the filesystem.
+
+    If `drivers` is specified, the items of map-reduce tasks are mapped on `executor`
+    and reduced by a thread of `drivers`, in the calling process. Their results are
+    saved in the calling process. Otherwise, map-reduce tasks run in a single worker.
+
+    Arguments:
+        max_in_flight: Maximum number of tasks submitted to `executor` but not
+            completed. It also bounds the number of items of every map-reduce task
+            being mapped.
+        n_workers: Number of workers of `executor`, used to choose the batch size of
+            map-reduce tasks."""
+    cfg = get_config()
+    results = ResultStore(graph)
+    roots = set(graph.roots())
+    executed = set()
+    reduced_here = set()
+
+    def submit(node: int, requirements=None) -> Future:
+        task = graph.tasks[node]
+        serialized_task = serialize_task(task)
+
+        if should_load(task, force_tasks):
+            _logger.info(f"Result of {task} is cached in {task._resolve_artifact()}")
+            return completed_future(LoadMarker(serialized_task))
+
+        _logger.info(f"Running task {task}")
+        executed.add(node)
+
+        # Tasks are map-reduce tasks too, but they run in a single worker.
+        is_map_reduce = isinstance(task, AbstractMapReduceTask)
+        if drivers is not None and is_map_reduce and not isinstance(task, Task):
+            reduced_here.add(node)
+            if requirements is not None:
+                requirements = graph.map_requirements(
+                    node, lambda d: resolve_load_marker(results.get(d))
+                )
+
+            return drivers.submit(
+                map_reduce_on_executor,
+                executor,
+                task,
+                serialized_task,
+                requirements,
+                max_in_flight,
+                n_workers,
+            )
+
+        requirement_nodes = graph.requirements[node]
+        if requirement_nodes is None:
+            return executor.submit(undill_and_run, cfg, serialized_task)
         else:
-            return executor.submit(undill_and_run, cloudpickle.dumps(task))
+            requirement_values = {d: results.get(d) for d in graph.dependencies(node)}
+            return executor.submit(
+                undill_and_run,
+                cfg,
+                serialized_task,
+                requirement_nodes,
+                requirement_values,
+            )
+
+    def on_result(node: int, result):
+        task = graph.tasks[node]
+
+        if node in executed:
+            artifact = task._resolve_artifact()
+            if is_reloadable(artifact) and node not in reduced_here:
+                invalidate_artifact(artifact)
+            elif task.AQ_AUTOSAVE and result is not None:
+                _logger.info(f"Saving result of {task} to {artifact}")
+                task.save(result)
+                invalidate_artifact(artifact)
+
+        if node in roots:
+            result = resolve_load_marker(result)
 
-    return _resolve_task_tree(task, map_task_to_future)
+        return result
+
+    def on_error(node: int, e: BaseException):
+        raise TaskError(f"Error while executing task {graph.tasks[node]}") from e
+
+    return schedule_task_graph(
+        graph,
+        submit,
+        on_result=on_result,
+        on_error=on_error,
+        max_in_flight=max_in_flight,
+        results=results,
+    )
 
 
 class ConcurrentBackend(Backend):
     def __init__(self, n_workers=1):
         self.n_workers = n_workers
 
-    def _run(self, task: AbstractTask[T]) -> T:
-        with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
-            future = task_to_future_resolve(task, executor)
+    def _run(self, work: TaskTree, force_tasks=None) -> Any:
+        graph = TaskGraph.build(work, force_tasks=force_tasks)
 
-            return future.result()
+        # Workers must share the resource tracker of this process, see
+        # `MultiprocessingBackend`.
+        resource_tracker.ensure_running()
+
+        with (
+            ProcessPoolExecutor(max_workers=self.n_workers) as executor,
+            ThreadPoolExecutor(
+                max_workers=self.n_workers, thread_name_prefix="aq-map-reduce"
+            ) as drivers,
+        ):
+            # Keep a few tasks queued per worker so that workers never wait for the
+            # scheduler, while the remaining ready tasks are kept in priority order.
+            return run_task_graph_on_executor(
+                graph,
+                executor,
+                max_in_flight=2 * self.n_workers,
+                force_tasks=force_tasks,
+                drivers=drivers,
+                n_workers=self.n_workers,
+            )
 
     def _spec(self):
         return self
@@ -1,3 +1,4 @@
+import collections
 import functools
 from typing import (
     Any,
@@ -9,60 +10,227 @@ from typing import (
     Hashable,
     Mapping,
     MutableMapping,
+    Sequence,
 )
 
+import dataclasses
+import hashlib
 import logging
+import math
 import omegaconf as oc
+import os
+import pickle
+import threading
+import time
+import uuid
 
 import aqueduct.backend.backend
-from dask.optimization import fuse, inline_functions
-from dask.distributed import Client, LocalCluster
-from aqueduct.artifact.base import resolve_artifact_from_spec
+from dask.distributed import Client, Future, LocalCluster, get_client, get_worker
+from dask.highlevelgraph import HighLevelGraph, MaterializedLayer
+from dask.utils import parse_bytes
 
 from aqueduct.backend.immediate import ImmediateBackend
 
 from ..config import set_config, get_config
 from ..task import AbstractTask
 from ..task.task import Task
-from ..task.mapreduce import AbstractMapReduceTask
-from ..task_tree import (
-    TaskTree,
-)
+from ..task.mapreduce import AbstractMapReduceTask, map_reduce_units, map_unit
+from ..task.serialize import load_task, serialize_task
+from ..task_graph import NodeTree, TaskGraph, is_forced
+from ..task_tree import TaskTree, _fold_tree, gather_tasks_in_tree
 
 _logger = logging.getLogger(__name__)
 
 DaskComputation: TypeAlias = Any  # Must be any because of literal types.
 DaskGraph: TypeAlias = MutableMapping[Hashable, DaskComputation]
 
-DaskBackendDictSpec: TypeAlias = Mapping[str, int | str]
+DaskBackendDictSpec: TypeAlias = Mapping[str, Any]
+
+PARTITIONS_PER_WORKER = 4
+"""When the number of partitions of a map-reduce task is not specified, its items are
+split in that many partitions per worker."""
+
+SUBMIT_INTERVAL = 0.1
+"""Time in seconds between two submissions of tasks to the cluster, while the task
+graph is being built. Tasks found in the meantime are submitted together."""
 
 
 class DaskBackend(ImmediateBackend):
     """Execute :class:`Task` on a Dask cluster.
 
-    Arguments:
-        client (`dask.Client`): Client pointing to the desired Dask cluster."""
+    Tasks declare the resources they hold and their priority with their `AQ_RESOURCES`
+    and `AQ_PRIORITY` class attributes, which become annotations of their Dask tasks.
+    The workers must declare the matching resources, for instance with the
+    `resources` entry of the backend specification.
+
+    With `persist=True`, the result of every task stays in the memory of the cluster
+    after the run, keyed by the unique key of the task. Later runs reuse these results
+    instead of computing or loading them again, and do not even expand the
+    requirements of the tasks they come from. This suits long-lived sessions, like
+    notebooks, where the end of a pipeline is run many times. Results are released by
+    :meth:`evict`, or when `max_persisted_bytes` is exceeded, least recently used
+    first.
 
-    def __init__(self, client: Optional[Client] = None):
+    Arguments:
+        client (`dask.Client`): Client pointing to the desired Dask cluster, or a
+            function returning one. The function is called when the client is first
+            needed.
+        n_partitions: Maximum number of partitions the items of a
+            :class:`MapReduceTask` are split in. Every partition is a single Dask task.
+            Defaults to `PARTITIONS_PER_WORKER` partitions per thread of the cluster.
+        persist: If `True`, keep the results of tasks in the memory of the cluster
+            across runs.
+        max_persisted_bytes: Maximum size of the persisted results. If `None`, results
+            are kept until they are evicted.
+    """
+
+    def __init__(
+        self,
+        client: Optional[Client | Callable[[], Client]] = None,
+        n_partitions: Optional[int] = None,
+        persist: bool = False,
+        max_persisted_bytes: Optional[int] = None,
+    ):
         if client is None:
             cluster = LocalCluster()
-            self.client = cluster.get_client()
-        else:
-            self.client = client
+            client = cluster.get_client()
+
+        self._client = client
+        self._client_lock = threading.Lock()
+        self.n_partitions = n_partitions
+        self.persist = persist
+        self.max_persisted_bytes = max_persisted_bytes
+
+        # Futures of persisted results by unique key, least recently used first.
+        self._persisted: collections.OrderedDict[str, Future] = (
+            collections.OrderedDict()
+        )
+
+    @property
+    def client(self) -> Client:
+        if not isinstance(self._client, Client):
+            with self._client_lock:
+                if not isinstance(self._client, Client):
+                    self._client = self._client()
+
+        return self._client
+
+    def _n_workers(self) -> int:
+        """The number of threads of the cluster."""
+        return max(sum(self.client.nthreads().values()), 1)
+
+    def _n_partitions(self, n_workers: int) -> int:
+        if self.n_partitions is not None:
+            return self.n_partitions
+
+        return PARTITIONS_PER_WORKER * n_workers
 
     def _run(self, task: TaskTree, force_tasks: set[Type[AbstractTask]] = set()):
-        _logger.info("Computing Dask graph...")
-        computation, graph = add_work_to_dask_graph(
-            task, {}, self._spec(), ignore_cache=False, force_tasks=force_tasks
+        _logger.info("Submitting Dask graph...")
+        reused: dict[str, Future] = {}
+
+        def expand(t: AbstractTask) -> bool:
+            future = self._reusable_future(t, force_tasks)
+            if future is None:
+                return True
+
+            reused[t._unique_key()] = future
+            return False
+
+        # Tasks are sent to the cluster as soon as they are added to the task graph,
+        # so that they run while the rest of the graph is built. Persisted results
+        # stay on the scheduler under their key, so the tasks which run again get keys
+        # of their own.
+        n_workers = self._n_workers()
+        submission = IncrementalSubmission(
+            self.client,
+            build_dask_context(get_config(), self._spec()),
+            force_tasks=force_tasks,
+            n_partitions=self._n_partitions(n_workers),
+            n_workers=n_workers,
+            persisted=reused,
+            key_token=uuid.uuid4().hex if self.persist else None,
+        )
+        try:
+            task_graph = TaskGraph.build(
+                task,
+                force_tasks=force_tasks,
+                expand=expand if self.persist else None,
+                on_node=submission.add_node,
+            )
+        except BaseException:
+            submission.close()
+            raise
+
+        futures = submission.finish()
+        _logger.info(
+            f"Submitted {len(task_graph)} tasks in {submission.n_batches} batches, "
+            f"{len(reused)} results are reused."
+        )
+
+        root_futures = {n: futures[n] for n in task_graph.roots()}
+        if self.persist:
+            for key, future in zip(task_graph.keys, futures):
+                self._persisted[key] = future
+                self._persisted.move_to_end(key)
+
+        # Let Dask release intermediate results once their dependents completed.
+        del futures
+        values = self.client.gather(root_futures)
+
+        if self.persist:
+            self._release_over_budget()
+
+        return task_graph.map_root(values.__getitem__)
+
+    def _reusable_future(
+        self, task: AbstractTask, force_tasks: set[Type[AbstractTask]]
+    ) -> Optional[Future]:
+        """The persisted result of `task`, if it can be used in place of running it."""
+        key = task._unique_key()
+        future = self._persisted.get(key)
+        if future is None:
+            return None
+
+        force_run = getattr(task, "_aq_force_root", False) or is_forced(
+            task, force_tasks
         )
-        _logger.info(f"Dask Graph has {len(graph)} unique tasks.")
+        if force_run or future.status in ("error", "cancelled", "lost"):
+            # The task runs again under a new key, see `key_token`.
+            del self._persisted[key]
+            return None
+
+        return future
+
+    def _release_over_budget(self):
+        if self.max_persisted_bytes is None or len(self._persisted) == 0:
+            return
 
-        _logger.info("Optimizing graph...")
-        optimized, dependencies = fuse(graph, keys=computation)
-        optimized = inline_functions(optimized, computation, [tuple])
-        _logger.info(f"Optimized graph has {len(optimized)} tasks.")
+        keys = [f.key for f in self._persisted.values()]
+        sizes = self.client.nbytes(keys, summary=False)
+        total = sum(sizes.values())
 
-        return self.client.get(optimized, computation)
+        while total > self.max_persisted_bytes and len(self._persisted) > 0:
+            _, future = self._persisted.popitem(last=False)
+            total -= sizes.get(future.key, 0)
+
+    def evict(self, work: Optional[TaskTree] = None):
+        """Release results persisted in the memory of the cluster.
+
+        Arguments:
+            work: The tasks whose results are released. If `None`, every persisted
+                result is released."""
+        if work is None:
+            self._persisted.clear()
+            return
+
+        for task in gather_tasks_in_tree(work):
+            self._persisted.pop(task._unique_key(), None)
+
+    def persisted_keys(self) -> list[str]:
+        """The unique keys of the tasks whose result is persisted, least recently used
+        first."""
+        return list(self._persisted.keys())
 
     def _scheduler_address(self):
         return self.client.scheduler_info()["address"]
@@ -75,107 +243,254 @@ class DaskBackend(ImmediateBackend):
         return f"DaskBackend"
 
     def close(self):
-        self.client.close()
+        self._persisted.clear()
+
+        # Do not connect only to close the client.
+        if isinstance(self._client, Client):
+            self._client.close()
+
+
+@dataclasses.dataclass(frozen=True)
+class DaskContext:
+    """The configuration and backend specification that tasks run with on the
+    workers. A Dask graph holds it once, under the key :attr:`key`, and every task
+    depends on that key."""
+
+    fingerprint: str
+    cfg: oc.DictConfig
+    backend_spec: DaskBackendDictSpec
+
+    @property
+    def key(self) -> str:
+        return f"aq-context-{self.fingerprint}"
+
+
+AQ_WORKER_CONTEXT: Optional[DaskContext] = None
+"""The context installed in the current worker by :func:`wrap_in_context`."""
+
+
+def build_dask_context(
+    cfg: oc.DictConfig, backend_spec: DaskBackendDictSpec
+) -> DaskContext:
+    fingerprint = hashlib.sha1(pickle.dumps((cfg, backend_spec))).hexdigest()
+    return DaskContext(fingerprint, cfg, backend_spec)
+
+
+def add_context_to_dask_graph(context: DaskContext, graph: DaskGraph) -> DaskGraph:
+    graph[context.key] = (
+        DaskContext,
+        context.fingerprint,
+        context.cfg,
+        context.backend_spec,
+    )
+    return graph
 
 
 def wrap_in_context(
-    cfg: oc.DictConfig,
-    backend_spec,
+    context: DaskContext,
     fn: Callable,
     *args,
     **kwargs,
 ):
     """When executing a function on remote, make sure to set up the aqueduct context
-    before."""
-    aqueduct.backend.backend.AQ_CURRENT_BACKEND = resolve_dask_backend_dict_spec(
-        backend_spec
-    )
-    set_config(cfg)
+    before. The context is only installed when it differs from the one the worker
+    installed last. The current backend is the one of :func:`worker_backend`."""
+    global AQ_WORKER_CONTEXT
+
+    if (
+        AQ_WORKER_CONTEXT is None
+        or AQ_WORKER_CONTEXT.fingerprint != context.fingerprint
+        or get_config() is not AQ_WORKER_CONTEXT.cfg
+    ):
+        aqueduct.backend.backend.AQ_CURRENT_BACKEND = worker_backend(
+            context.backend_spec
+        )
+        set_config(context.cfg)
+        AQ_WORKER_CONTEXT = context
+
     return fn(*args, **kwargs)
 
 
-def build_dask_task(
-    cfg: oc.DictConfig, backend_spec: DaskBackendDictSpec, fn: Callable, *args
-) -> tuple:
-    """Utility function so that we can have type hints when building dask task tuples."""
-    return (wrap_in_context, cfg, backend_spec, fn, *args)
+@dataclasses.dataclass(frozen=True)
+class TaskCall:
+    """Call `function` on a task that travels in the graph in its serialized form. If
+    `function` is a string, the method of the task with that name is called.
+
+    The task is rebuilt when the call runs, once the context of the worker is set up.
+    Workers cache the tasks they rebuilt, so that the many calls of a map-reduce task
+    rebuild it once."""
+
+    serialized_task: bytes
+    function: Callable | str
+
+    def __call__(self, *args):
+        task = load_task(self.serialized_task)
+
+        if isinstance(self.function, str):
+            return getattr(task, self.function)(*args)
+        else:
+            return self.function(task, *args)
+
+
+def build_dask_task(context_key: str, fn: Callable, *args) -> tuple:
+    """Utility function so that we can have type hints when building dask task tuples.
+    `context_key` is the key of the :class:`DaskContext` in the graph."""
+    return (wrap_in_context, context_key, fn, *args)
 
 
 def resolve_dask_backend_dict_spec(
     spec: DaskBackendDictSpec,
 ) -> DaskBackend:
-    client = resolve_client_from_dict_spec(spec)
-    return DaskBackend(client)
+    """Build the backend described by `spec`. The backend connects to the cluster the
+    first time it needs its client."""
+    return DaskBackend(client_factory_from_dict_spec(spec))
+
 
+def resolve_client_from_dict_spec(spec: DaskBackendDictSpec) -> Client:
+    return client_factory_from_dict_spec(spec)()
 
-def resolve_client_from_dict_spec(spec: DaskBackendDictSpec):
+
+def client_factory_from_dict_spec(spec: DaskBackendDictSpec) -> Callable[[], Client]:
+    """A function that creates the client described by `spec`. The specification is
+    checked right away, but nothing is connected until the function is called."""
     match spec:
         case {"type": "dask", "address": str(address)}:
-            return Client(address)
+            return functools.partial(connect_to_scheduler, address)
         case {"type": "dask", "n_workers": int(n_workers)}:
-            return Client(LocalCluster(processes=n_workers))
+            # Resources the workers of the local cluster declare, see `AQ_RESOURCES`.
+            kwargs = {}
+            if spec.get("resources", None) is not None:
+                kwargs["resources"] = parse_resources(spec["resources"])
+
+            return lambda: Client(LocalCluster(processes=n_workers, **kwargs))
         case _:
             raise ValueError("Could not parse Dask backend specification.")
 
 
+def connect_to_scheduler(address: str) -> Client:
+    """Connect to the scheduler at `address`. In a worker of that scheduler, the client
+    of the worker is reused instead of opening a new connection."""
+    try:
+        worker = get_worker()
+    except ValueError:
+        return Client(address)
+
+    if worker.scheduler.address == address:
+        return get_client()
+    else:
+        return Client(address)
+
+
+@functools.lru_cache(maxsize=None)
+def _worker_backend(spec_items: tuple) -> DaskBackend:
+    return resolve_dask_backend_dict_spec(dict(spec_items))
+
+
+def worker_backend(spec: DaskBackendDictSpec) -> DaskBackend:
+    """The backend described by `spec`, created once per process.
+
+    Tasks running in a worker share this backend, and its client connects to the
+    cluster only when a task submits work of its own."""
+    return _worker_backend(tuple(sorted(spec.items())))
+
+
+def parse_resources(resources: Mapping[str, float | str]) -> dict[str, float]:
+    """Resource amounts as numbers, as Dask expects them. Amounts given as strings,
+    like `"8GB"`, are sizes in bytes."""
+    return {
+        name: float(parse_bytes(amount)) if isinstance(amount, str) else amount
+        for name, amount in resources.items()
+    }
+
+
+def dask_annotations(task: AbstractTask) -> Optional[dict[str, Any]]:
+    """The annotations of the Dask layer of `task`, from its `AQ_RESOURCES` and
+    `AQ_PRIORITY`. They apply to every Dask task of the layer, including the partitions
+    of a map-reduce task."""
+    annotations: dict[str, Any] = {}
+    if task.AQ_RESOURCES:
+        annotations["resources"] = parse_resources(task.AQ_RESOURCES)
+    if task.AQ_PRIORITY:
+        annotations["priority"] = task.AQ_PRIORITY
+
+    return annotations if len(annotations) > 0 else None
+
+
 def save_and_return(task, result):
     task.save(result)
     return result
 
 
 def add_task_to_dask_graph(
-    task: AbstractTask,
+    task_graph: TaskGraph,
+    node: int,
+    node_keys: list[str],
     graph: DaskGraph,
-    backend_spec: DaskBackendDictSpec,
-    ignore_cache: bool = False,
+    context_key: str,
     force_tasks: set[Type[AbstractTask]] = set(),
+    n_partitions: Optional[int] = None,
+    key_token: Optional[str] = None,
+    n_workers: Optional[int] = None,
 ) -> tuple[str, DaskGraph]:
-    # Check if task is already in graph.
-    task_key = task._unique_key()
-    if task_key in graph:
-        return task_key, graph
-
-    # Prepare context.
-    current_cfg = get_config()
+    """Add one node of a :class:`TaskGraph` to the Dask graph. The nodes it depends on
+    must already be in the Dask graph, their keys are given by `node_keys`. So must be
+    the :class:`DaskContext` the tasks run with, under `context_key`.
+
+    The Dask keys of the task derive from its unique key. If `key_token` is specified,
+    it is appended to them, so that they differ from the keys of earlier runs."""
+    task = task_graph.tasks[node]
+    task_key = task_graph.keys[node]
+    if key_token is not None:
+        task_key = f"{task_key}-{key_token}"
+    serialized_task = serialize_task(task)
 
     # Check if the artifact exists and computation is needed.
-    artifact_spec = task.artifact()
-    is_force_task = any([issubclass(task.__class__, x) for x in force_tasks])
-    force_run = getattr(task, "_aq_force_root", False) or is_force_task
+    artifact = task._resolve_artifact()
+    force_run = getattr(task, "_aq_force_root", False) or is_forced(task, force_tasks)
 
-    artifact = resolve_artifact_from_spec(artifact_spec)
-    if (
-        artifact is not None
-        and artifact.exists()
-        and not force_run
-        and task.AQ_AUTOLOAD
-    ):
+    if artifact is not None and task.is_cached() and not force_run and task.AQ_AUTOLOAD:
         # The task was in cache, we can just load it.
         _logger.info(f"Loading result of {task} from {artifact}")
-        graph[task_key] = build_dask_task(current_cfg, backend_spec, task.load)
+        graph[task_key] = build_dask_task(
+            context_key, TaskCall(serialized_task, "load")
+        )
         final_key = task_key
 
     else:
         # We need to execute the task.
+        if task_graph.requirements[node] is None:
+            requirements = None
+        else:
+            requirements = node_tree_to_dask_computation(
+                task_graph.requirements[node], node_keys
+            )
+
         if isinstance(task, Task):
             task_key, graph = add_single_task_to_dask_graph(
-                task, graph, backend_spec, ignore_cache=force_run
+                task, requirements, graph, context_key, serialized_task, task_key
             )
         elif isinstance(task, AbstractMapReduceTask):
             task_key, graph = add_parallel_task_to_dask_graph(
-                task, graph, backend_spec, ignore_cache=force_run
+                task,
+                requirements,
+                graph,
+                context_key,
+                serialized_task,
+                n_partitions=n_partitions,
+                task_key=task_key,
+                n_workers=n_workers,
             )
         else:
             raise RuntimeError("Unhandled type when adding task to dask graph.")
 
         if artifact is not None and task.AQ_AUTOSAVE:
-            # Put a new task in front of the original, which saves the result before returning it.
+            # Wrap the original task in a task which saves the result before returning
+            # it. They run as one Dask task.
             final_key = task_key + "_save_and_return"
             graph[final_key] = build_dask_task(
-                current_cfg,
-                backend_spec,
-                functools.partial(save_and_return, task),
-                task_key,
+                context_key,
+                TaskCall(serialized_task, save_and_return),
+                graph.pop(task_key),
             )
         else:
             final_key = task_key
@@ -183,107 +498,148 @@ def add_task_to_dask_graph(
     return final_key, graph
 
 
-def add_single_task_to_dask_graph(task: Task, graph, backend_spec, ignore_cache=False):
-    task_key = task._unique_key()
-
-    requirements = task._resolve_requirements(ignore_cache=ignore_cache)
+def add_single_task_to_dask_graph(
+    task: Task,
+    requirements: DaskComputation,
+    graph: DaskGraph,
+    context_key: str,
+    serialized_task: Optional[bytes] = None,
+    task_key: Optional[str] = None,
+) -> tuple[str, DaskGraph]:
+    if task_key is None:
+        task_key = task._unique_key()
+    if serialized_task is None:
+        serialized_task = serialize_task(task)
 
-    current_cfg = get_config()
+    call = TaskCall(serialized_task, "__call__")
 
     if requirements is None:
-        graph[task_key] = build_dask_task(
-            current_cfg,
-            backend_spec,
-            task,
-        )
+        graph[task_key] = build_dask_task(context_key, call)
     else:
-        computation, graph = add_work_to_dask_graph(
-            requirements, graph, backend_spec, ignore_cache=ignore_cache
-        )
-        graph[task_key] = build_dask_task(current_cfg, backend_spec, task, computation)
+        graph[task_key] = build_dask_task(context_key, call, requirements)
 
     return task_key, graph
 
 
-def add_parallel_task_to_dask_graph(
-    parallel_task: AbstractMapReduceTask, graph, backend_spec, ignore_cache=False
+@dataclasses.dataclass
+class Partition:
+    """Units of items of a map-reduce task, mapped and reduced by a single Dask task.
+    See :func:`map_unit` for the meaning of `batched`. Wrapping the units keeps Dask
+    from looking for keys among the items."""
+
+    batched: bool
+    units: list
+
+
+def map_reduce_partition(
+    task: AbstractMapReduceTask, partition: Partition, requirements=None
 ):
-    """Expand all the work in a parallel task and add it to the graph."""
-    # Resolve requirements.
-    requirements = parallel_task._resolve_requirements(ignore_cache=ignore_cache)
-    if requirements is not None:
-        requirements_key, graph = add_work_to_dask_graph(
-            requirements, graph, backend_spec, ignore_cache=ignore_cache
+    """Map every unit of `partition` and reduce them into a new accumulator."""
+    acc = task.accumulator(requirements)
+    for unit in partition.units:
+        acc = task.reduce(
+            map_unit(task, partition.batched, unit, requirements), acc, requirements
         )
-    else:
-        requirements_key = None
 
-    # Define a map_reduce function to avoid adding unnecessary complexity to the graph.
-    def map_reduce(item, acc, requirements):
-        return parallel_task.reduce(
-            parallel_task.map(item, requirements), acc, requirements
-        )
+    return acc
 
-    # Gather task context.
-    base_task_key = parallel_task._unique_key()
-    current_cfg = get_config()
 
-    # Insert accumulator into graph.
-    accumulator_key = f"{base_task_key}_accumulator"
-    graph[accumulator_key] = (parallel_task.accumulator, requirements_key)
+def partition_units(units: list, n_partitions: int) -> list[list]:
+    """Split `units` in at most `n_partitions` contiguous partitions of equal size."""
+    if len(units) == 0:
+        return []
 
-    # Expand items and perform map reduce.
-    items_list = list(parallel_task.items())
-    for idx, item in enumerate(items_list):
-        reduce_task_key = f"{base_task_key}_reduce_{idx}"
+    size = math.ceil(len(units) / max(n_partitions, 1))
+    return [units[i : i + size] for i in range(0, len(units), size)]
 
-        # We use a binary tree to make a balanced reduce.
-        left_child_idx = idx * 2 + 1
-        right_child_idx = idx * 2 + 2
 
-        if left_child_idx < len(items_list):
-            left_child_key = f"{base_task_key}_reduce_{left_child_idx}"
-        else:
-            left_child_key = accumulator_key
+def add_parallel_task_to_dask_graph(
+    parallel_task: AbstractMapReduceTask,
+    requirements_key: DaskComputation,
+    graph: DaskGraph,
+    context_key: str,
+    serialized_task: Optional[bytes] = None,
+    n_partitions: Optional[int] = None,
+    task_key: Optional[str] = None,
+    n_workers: Optional[int] = None,
+) -> tuple[str, DaskGraph]:
+    """Expand all the work in a parallel task and add it to the graph.
 
-        if right_child_idx < len(items_list):
-            right_child_key = f"{base_task_key}_reduce_{right_child_idx}"
-        else:
-            right_child_key = accumulator_key
-
-        # Add children together.
-        children_reduce_work_unit = build_dask_task(
-            current_cfg,
-            backend_spec,
-            parallel_task.reduce,
-            left_child_key,
-            right_child_key,
-            requirements_key,
-        )
+    The items are split in partitions. Every partition is mapped and reduced by a
+    single Dask task, and the partitions are then combined with a tree reduce, so that
+    the size of the graph depends on the number of partitions only.
 
-        # Add reduce of children with map of current node.
-        self_reduce_work_unit = build_dask_task(
-            current_cfg,
-            backend_spec,
-            map_reduce,
-            item,
-            children_reduce_work_unit,
+    Arguments:
+        n_partitions: Maximum number of partitions. Defaults to
+            `PARTITIONS_PER_WORKER` partitions per worker.
+        task_key: Prefix of the Dask keys of the task. Defaults to its unique key.
+        n_workers: Number of threads of the cluster, used for the default number of
+            partitions and the automatic size of batches. Defaults to the number of
+            CPUs of this machine."""
+    if serialized_task is None:
+        serialized_task = serialize_task(parallel_task)
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    if n_partitions is None:
+        n_partitions = PARTITIONS_PER_WORKER * n_workers
+
+    # Items are grouped in batches if the task maps them in batches.
+    batched, units = map_reduce_units(
+        parallel_task, list(parallel_task.items()), n_workers=n_workers
+    )
+
+    if task_key is None:
+        task_key = parallel_task._unique_key()
+    base_task_key = task_key
+
+    # Map and reduce every partition on its own.
+    reduce_keys = []
+    for idx, partition in enumerate(partition_units(list(units), n_partitions)):
+        partition_key = f"{base_task_key}_partition_{idx}"
+        graph[partition_key] = build_dask_task(
+            context_key,
+            TaskCall(serialized_task, map_reduce_partition),
+            Partition(batched, partition),
             requirements_key,
         )
+        reduce_keys.append(partition_key)
+
+    # Combine the partitions pairwise, to make a balanced reduce.
+    level = 0
+    while len(reduce_keys) > 1:
+        next_keys = []
+        for idx in range(0, len(reduce_keys) - 1, 2):
+            reduce_key = f"{base_task_key}_reduce_{level}_{idx // 2}"
+            graph[reduce_key] = build_dask_task(
+                context_key,
+                TaskCall(serialized_task, "reduce"),
+                reduce_keys[idx],
+                reduce_keys[idx + 1],
+                requirements_key,
+            )
+            next_keys.append(reduce_key)
+
+        if len(reduce_keys) % 2 == 1:
+            next_keys.append(reduce_keys[-1])
 
-        # Add all the tasks implied by this in the graph.
-        graph[reduce_task_key] = self_reduce_work_unit
+        reduce_keys = next_keys
+        level += 1
 
-    if len(items_list) > 0:
-        root_reduce_key = f"{base_task_key}_reduce_{0}"
+    if len(reduce_keys) > 0:
+        root_reduce_key = reduce_keys[0]
     else:
-        root_reduce_key = accumulator_key
+        root_reduce_key = f"{base_task_key}_accumulator"
+        graph[root_reduce_key] = build_dask_task(
+            context_key,
+            TaskCall(serialized_task, "accumulator"),
+            requirements_key,
+        )
 
     post_task_key = f"{base_task_key}"
     graph[post_task_key] = build_dask_task(
-        current_cfg,
-        backend_spec,
-        parallel_task.post,
+        context_key,
+        TaskCall(serialized_task, "post"),
         root_reduce_key,
         requirements_key,
     )
@@ -291,44 +647,321 @@ def add_parallel_task_to_dask_graph(
     return post_task_key, graph
 
 
-def add_list_to_dask_graph(
-    work: list, graph: DaskGraph, backend_spec, ignore_cache: bool = False
-) -> tuple[list[str | list], DaskGraph]:
-    new_list = []
-    for x in work:
-        computation, graph = add_work_to_dask_graph(
-            x, graph, backend_spec, ignore_cache=ignore_cache
-        )
-        new_list.append(computation)
+def rebuild_dict(keys: tuple, mapped_values: list) -> dict:
+    return {k: v for k, v in zip(keys, mapped_values)}
+
 
-    return new_list, graph
+def node_tree_to_dask_computation(
+    tree: NodeTree, node_keys: list[str]
+) -> DaskComputation:
+    """Translate a tree of :class:`TaskGraph` nodes into a Dask computation, given the
+    Dask key of every node."""
+    return _fold_tree(tree, int, node_keys.__getitem__, container_to_dask_computation)
+
+
+def container_to_dask_computation(
+    container: list | tuple | dict, computations: list[DaskComputation]
+) -> DaskComputation:
+    if isinstance(container, list):
+        return computations
+    elif isinstance(container, tuple):
+        return (tuple, computations)
+    else:
+        return (functools.partial(rebuild_dict, tuple(container.keys())), computations)
 
 
-def add_tuple_to_dask_graph(
-    work: tuple, graph: DaskGraph, backend_spec, ignore_cache: bool = False
+def add_task_graph_to_dask_graph(
+    task_graph: TaskGraph,
+    graph: DaskGraph,
+    backend_spec: DaskBackendDictSpec,
+    force_tasks: set[Type[AbstractTask]] = set(),
+    n_partitions: Optional[int] = None,
+    n_workers: Optional[int] = None,
 ) -> tuple[DaskComputation, DaskGraph]:
-    work_as_list = list(work)
+    """Add every node of a :class:`TaskGraph` to the Dask graph. See
+    :func:`add_parallel_task_to_dask_graph` for the meaning of `n_partitions` and
+    `n_workers`.
+
+    Returns:
+        The computation corresponding to the root of the task graph, and the updated
+        Dask graph."""
+    # The configuration and backend spec are shipped once, and shared by all tasks.
+    context = build_dask_context(get_config(), backend_spec)
+    graph = add_context_to_dask_graph(context, graph)
+
+    node_keys: list[str] = []
+    for node in range(len(task_graph)):
+        key, graph = add_task_to_dask_graph(
+            task_graph,
+            node,
+            node_keys,
+            graph,
+            context.key,
+            force_tasks=force_tasks,
+            n_partitions=n_partitions,
+            n_workers=n_workers,
+        )
+        node_keys.append(key)
+
+    return node_tree_to_dask_computation(task_graph.root, node_keys), graph
+
 
-    computation, graph = add_list_to_dask_graph(
-        work_as_list, graph, backend_spec, ignore_cache=ignore_cache
+def task_graph_to_high_level_graph(
+    task_graph: TaskGraph,
+    backend_spec: DaskBackendDictSpec,
+    force_tasks: set[Type[AbstractTask]] = set(),
+    n_partitions: Optional[int] = None,
+    n_workers: Optional[int] = None,
+) -> tuple[DaskComputation, HighLevelGraph]:
+    """Like :func:`add_task_graph_to_dask_graph`, but every node of the task graph is
+    a layer of a :class:`HighLevelGraph`. A map-reduce task is a single layer, and the
+    dependencies between layers follow those of the task graph, so that Dask never
+    has to compute them from the keys of the tasks.
+
+    Returns:
+        The computation corresponding to the root of the task graph, and the graph."""
+    node_keys, graph = task_graph_to_dask_layers(
+        task_graph,
+        backend_spec,
+        force_tasks=force_tasks,
+        n_partitions=n_partitions,
+        n_workers=n_workers,
     )
+    return node_tree_to_dask_computation(task_graph.root, node_keys), graph
 
-    return (tuple, computation), graph
 
+def task_graph_to_dask_layers(
+    task_graph: TaskGraph,
+    backend_spec: DaskBackendDictSpec,
+    force_tasks: set[Type[AbstractTask]] = set(),
+    n_partitions: Optional[int] = None,
+    persisted: Mapping[str, Future] = {},
+    n_workers: Optional[int] = None,
+) -> tuple[list[str], HighLevelGraph]:
+    """Build the :class:`HighLevelGraph` of :func:`task_graph_to_high_level_graph`.
 
-def add_dict_to_dask_graph(
-    work: dict, graph: DaskGraph, backend_spec, ignore_cache: bool = False
-) -> tuple[DaskComputation, DaskGraph]:
-    work_as_list = list(work.values())
+    Arguments:
+        persisted: Futures of results already in the memory of the cluster, by unique
+            key. The tasks they belong to are not added to the graph, their layer only
+            refers to the future.
+
+    Returns:
+        The Dask key of every node of the task graph, and the graph."""
+    context = build_dask_context(get_config(), backend_spec)
+    layers = {context.key: MaterializedLayer(add_context_to_dask_graph(context, {}))}
+    dependencies: dict[str, set[str]] = {context.key: set()}
+
+    node_keys: list[str] = []
+    for node in range(len(task_graph)):
+        future = persisted.get(task_graph.keys[node])
+        if future is not None:
+            key = future.key
+            layers[key] = MaterializedLayer({key: future})
+            dependencies[key] = set()
+            node_keys.append(key)
+            continue
+
+        key, layer = add_task_to_dask_graph(
+            task_graph,
+            node,
+            node_keys,
+            {},
+            context.key,
+            force_tasks=force_tasks,
+            n_partitions=n_partitions,
+            n_workers=n_workers,
+        )
+        node_keys.append(key)
 
-    computation, graph = add_list_to_dask_graph(
-        work_as_list, graph, backend_spec, ignore_cache=ignore_cache
-    )
+        layers[key] = MaterializedLayer(
+            layer, annotations=dask_annotations(task_graph.tasks[node])
+        )
+        dependencies[key] = {context.key}
+        dependencies[key].update([node_keys[d] for d in task_graph.dependencies(node)])
+
+    return node_keys, HighLevelGraph(layers, dependencies)
+
+
+class IncrementalSubmission:
+    """Send the nodes of a :class:`TaskGraph` to a Dask cluster while the graph is
+    being built. Pass :meth:`add_node` as the `on_node` argument of
+    :meth:`TaskGraph.build`.
+
+    Nodes are sent in batches, every `interval` seconds. A node found after a quiet
+    period is sent right away, and a background thread sends the nodes found since,
+    so that they do not wait for the next node while the graph builder is busy with
+    slow requirements or artifact checks. Every batch is a :class:`HighLevelGraph`
+    with a layer per node, like those of :func:`task_graph_to_dask_layers`. The nodes
+    of earlier batches are referred to by their futures, so leaf tasks run while their
+    dependents are still being found. The futures of all the nodes are kept until
+    :meth:`finish` returns them. Call :meth:`close` instead if the graph could not be
+    built.
+
+    Arguments:
+        client: Client the batches are submitted with.
+        context: Context the tasks run with. It is sent with the first batch.
+        persisted: Futures of results already in the memory of the cluster, by unique
+            key. The tasks they belong to are not submitted again.
+        interval: Time in seconds between two batches.
+        key_token: Appended to the Dask keys of the submitted tasks, see
+            :func:`add_task_to_dask_graph`.
+        n_workers: Number of threads of the cluster, see
+            :func:`add_parallel_task_to_dask_graph`.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        context: DaskContext,
+        force_tasks: set[Type[AbstractTask]] = set(),
+        n_partitions: Optional[int] = None,
+        persisted: Mapping[str, Future] = {},
+        interval: float = SUBMIT_INTERVAL,
+        key_token: Optional[str] = None,
+        n_workers: Optional[int] = None,
+    ):
+        self.client = client
+        self.context = context
+        self.force_tasks = force_tasks
+        self.n_partitions = n_partitions
+        self.persisted = persisted
+        self.interval = interval
+        self.key_token = key_token
+        self.n_workers = n_workers
+        self.n_batches = 0
+
+        self._context_future: Optional[Future] = None
+        self._node_keys: list[str] = []
+        self._futures: list[Optional[Future]] = []
+        self._pending: list[int] = []
+        self._layers: dict[int, MaterializedLayer] = {}
+        self._dependencies: dict[int, Sequence[int]] = {}
+        self._last_submit = -math.inf
+
+        # Nodes are added by the thread building the graph, and submitted by either
+        # that thread or the timer.
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._timer = threading.Thread(
+            target=self._submit_periodically, name="aq-dask-submit", daemon=True
+        )
+        self._timer.start()
+
+    def add_node(self, task_graph: TaskGraph, node: int):
+        """Add the Dask tasks of `node`, whose dependencies were added before it. The
+        pending nodes are submitted if the last batch is old enough."""
+        future = self.persisted.get(task_graph.keys[node])
+        if future is not None:
+            with self._lock:
+                self._node_keys.append(future.key)
+                self._futures.append(future)
+            return
+
+        # The keys of the other nodes are only appended by this thread.
+        key, layer = add_task_to_dask_graph(
+            task_graph,
+            node,
+            self._node_keys,
+            {},
+            self.context.key,
+            force_tasks=self.force_tasks,
+            n_partitions=self.n_partitions,
+            key_token=self.key_token,
+            n_workers=self.n_workers,
+        )
+        annotated_layer = MaterializedLayer(
+            layer, annotations=dask_annotations(task_graph.tasks[node])
+        )
+
+        with self._lock:
+            self._node_keys.append(key)
+            self._futures.append(None)
+
+            self._pending.append(node)
+            self._layers[node] = annotated_layer
+            self._dependencies[node] = task_graph.dependencies(node)
+
+            if time.monotonic() - self._last_submit >= self.interval:
+                self._submit_pending()
+
+    def _submit_periodically(self):
+        while not self._stopped.wait(self.interval):
+            self.submit()
+
+    def submit(self):
+        """Submit the pending nodes as one batch."""
+        with self._lock:
+            self._submit_pending()
+
+    def _submit_pending(self):
+        if len(self._pending) == 0:
+            return
+
+        if self._context_future is None:
+            context_graph = add_context_to_dask_graph(self.context, {})
+        else:
+            context_graph = {self.context.key: self._context_future}
+
+        layers = {self.context.key: MaterializedLayer(context_graph)}
+        dependencies: dict[str, set[str]] = {self.context.key: set()}
 
-    def rebuild_dict(mapped_values):
-        return {k: v for k, v in zip(work.keys(), mapped_values)}
+        keys = [self.context.key]
+        for node in self._pending:
+            key = self._node_keys[node]
 
-    return (rebuild_dict, computation), graph
+            dependency_keys = {self.context.key}
+            for dependency in self._dependencies.pop(node):
+                dependency_key = self._node_keys[dependency]
+                dependency_keys.add(dependency_key)
+
+                # Dependencies submitted in earlier batches are referred to by future.
+                if dependency_key not in layers:
+                    future = self._futures[dependency]
+                    layers[dependency_key] = MaterializedLayer({dependency_key: future})
+                    dependencies[dependency_key] = set()
+
+            layers[key] = self._layers.pop(node)
+            dependencies[key] = dependency_keys
+            keys.append(key)
+
+        graph = HighLevelGraph(layers, dependencies)
+        futures = self.client.get(graph, keys, sync=False)
+
+        self._context_future = futures[0]
+        for node, future in zip(self._pending, futures[1:]):
+            self._futures[node] = future
+
+        self._pending = []
+        self._last_submit = time.monotonic()
+        self.n_batches += 1
+
+    def finish(self) -> list[Future]:
+        """Stop the timer and submit the remaining nodes.
+
+        Returns:
+            The future of every node of the task graph, by node id. The submission
+            does not keep them, so that Dask can release the results nobody holds."""
+        self._stop_timer()
+        self.submit()
+        futures = cast(list[Future], self._futures)
+
+        self.close()
+        return futures
+
+    def close(self):
+        """Stop the timer and release the futures, without submitting the remaining
+        nodes."""
+        self._stop_timer()
+        with self._lock:
+            self._pending = []
+            self._layers.clear()
+            self._dependencies.clear()
+            self._futures = []
+            self._context_future = None
+
+    def _stop_timer(self):
+        self._stopped.set()
+        self._timer.join()
 
 
 def add_work_to_dask_graph(
@@ -337,29 +970,18 @@ def add_work_to_dask_graph(
     backend_spec: DaskBackendDictSpec,
     ignore_cache: bool = False,
     force_tasks: set[Type[AbstractTask]] = set(),
+    n_partitions: Optional[int] = None,
+    n_workers: Optional[int] = None,
 ) -> tuple[DaskComputation, DaskGraph]:
+    task_graph = TaskGraph.build(
+        work, ignore_cache=ignore_cache, force_tasks=force_tasks
+    )
 
-    if isinstance(work, AbstractTask):
-        computation, graph = add_task_to_dask_graph(
-            work,
-            graph,
-            backend_spec,
-            ignore_cache=ignore_cache,
-            force_tasks=force_tasks,
-        )
-    elif isinstance(work, list):
-        computation, graph = add_list_to_dask_graph(
-            work, graph, backend_spec, ignore_cache=ignore_cache
-        )
-    elif isinstance(work, tuple):
-        computation, graph = add_tuple_to_dask_graph(
-            work, graph, backend_spec, ignore_cache=ignore_cache
-        )
-    elif isinstance(work, dict):
-        computation, graph = add_dict_to_dask_graph(
-            work, graph, backend_spec, ignore_cache=ignore_cache
-        )
-    else:
-        raise RuntimeError("Unhandled type when adding work to dask graph.")
-
-    return computation, graph
+    return add_task_graph_to_dask_graph(
+        task_graph,
+        graph,
+        backend_spec,
+        force_tasks=force_tasks,
+        n_partitions=n_partitions,
+        n_workers=n_workers,
+    )
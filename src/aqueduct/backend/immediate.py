@@ -1,15 +1,17 @@
-from typing import Type, TypeVar, Any, TypedDict, Literal
+from typing import Optional, Type, TypeVar, Any, TypedDict, Literal
 
 import logging
 
 from aqueduct.backend.base import TaskError
 
-from ..artifact import resolve_artifact_from_spec
+from ..artifact.snapshot import invalidate_artifact
 from .backend import Backend
+from .spill import SpillingResultStore, memory_budget
 from ..task import AbstractTask
-from ..task.mapreduce import AbstractMapReduceTask
-from ..task_tree import TaskTree, _resolve_task_tree
-from ..task.task import Task
+from ..task.mapreduce import AbstractMapReduceTask, map_reduce_units, map_unit
+from ..task_graph import TaskGraph, is_forced
+from ..task_tree import TaskTree, _resolve_task_graph
+from ..task.task import Task, resolve_coroutine
 
 T = TypeVar("T")
 
@@ -26,7 +28,7 @@ def execute_task(task: Task[T], requirements=None) -> T:
     else:
         task_result = task.run()
 
-    return task_result
+    return resolve_coroutine(task_result)
 
 
 def execute_map_reduce_task(
@@ -34,21 +36,42 @@ def execute_map_reduce_task(
 ) -> T:
     accumulator = task.accumulator(requirements)
 
-    def map_reduce(item, acc, requirements):
-        return task.reduce(task.map(item, requirements), acc, requirements)
+    def map_reduce(unit, acc, requirements):
+        return task.reduce(
+            map_unit(task, batched, unit, requirements), acc, requirements
+        )
 
-    for item in task.items():
-        accumulator = map_reduce(item, accumulator, requirements)
+    batched, units = map_reduce_units(task, task.items())
+    for unit in units:
+        accumulator = map_reduce(unit, accumulator, requirements)
 
     return task.post(accumulator)
 
 
+def should_load(
+    task: AbstractTask, force_tasks: Optional[set[Type[AbstractTask]]] = None
+) -> bool:
+    """Indicates if the result of `task` should be loaded from its artifact instead of
+    being computed."""
+    force_run = getattr(task, "_aq_force_root", False) or is_forced(task, force_tasks)
+
+    return (
+        task._resolve_artifact() is not None
+        and task.is_cached()
+        and not force_run
+        and task.AQ_AUTOLOAD
+    )
+
+
 class ImmediateBackend(Backend):
     """Simple Backend that executes the :class:`Task` immediately, in the current
     process.
 
     No parallelism is involved. Useful for debugging purposes. For any form of
-    parallelism, the :class:`DaskBackend` is probably more appropriate."""
+    parallelism, the :class:`DaskBackend` is probably more appropriate.
+
+    If the `aqueduct.memory_budget` configuration option is set, intermediate results
+    are spilled to the scratch store when they exceed it."""
 
     def check_artifact_and_execute(
         self,
@@ -57,39 +80,39 @@ class ImmediateBackend(Backend):
         force_tasks: set[Type[AbstractTask]] = set(),
     ) -> T:
         # Check if the artifact exists and computation is needed.
-        artifact_spec = task.artifact()
-
-        if force_tasks:
-            is_forced_task = any([issubclass(task.__class__, c) for c in force_tasks])
-        else:
-            is_forced_task = False
-        force_run = getattr(task, "_aq_force_root", False) or is_forced_task
-
-        artifact = resolve_artifact_from_spec(artifact_spec)
-        if (
-            artifact is not None
-            and artifact.exists()
-            and not force_run
-            and task.AQ_AUTOLOAD
-        ):
-            _logger.info(f"Loading result of {task} from {artifact}")
+        if self.should_load(task, force_tasks):
+            _logger.info(f"Loading result of {task} from {task._resolve_artifact()}")
             return task.load()
 
         # Execute task.
         _logger.info(f"Running task {task}")
+        task_result = self.execute(task, requirements)
+
+        self.save_result(task, task_result)
+        return task_result
+
+    def should_load(
+        self, task: AbstractTask, force_tasks: set[Type[AbstractTask]] = set()
+    ) -> bool:
+        """Indicates if the result of `task` should be loaded from its artifact
+        instead of being computed."""
+        return should_load(task, force_tasks)
+
+    def execute(self, task: AbstractTask[T], requirements=None) -> T:
         if isinstance(task, Task):
-            task_result = self.execute_task(task, requirements)
+            return self.execute_task(task, requirements)
         elif isinstance(task, AbstractMapReduceTask):
-            task_result = self.execute_map_reduce_task(task, requirements)
+            return self.execute_map_reduce_task(task, requirements)
         else:
             raise RuntimeError("Unhandled task type.")
 
-        # Save task.
+    def save_result(self, task: AbstractTask[T], task_result: T):
+        """Save the result of a task that was just computed, if needed."""
         if task.AQ_AUTOSAVE and task_result is not None:
+            artifact = task._resolve_artifact()
             _logger.info(f"Saving result of {task} to {artifact}")
             task.save(task_result)
-
-        return task_result
+            invalidate_artifact(artifact)
 
     def execute_task(self, task: Task[T], requirements=None) -> T:
         try:
@@ -111,8 +134,15 @@ class ImmediateBackend(Backend):
                 task, requirements, force_tasks=force_tasks
             )
 
-        result = _resolve_task_tree(work, fn, force_tasks=force_tasks)
-        return result
+        graph = TaskGraph.build(work, force_tasks=force_tasks)
+
+        budget = memory_budget()
+        results = SpillingResultStore(graph, budget) if budget is not None else None
+        try:
+            return _resolve_task_graph(graph, fn, results=results)
+        finally:
+            if results is not None:
+                results.close()
 
     def _spec(self) -> str:
         return "immediate"
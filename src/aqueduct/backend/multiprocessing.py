@@ -1,60 +1,240 @@
-from typing import TypedDict, Literal, Any, TypeVar
-
-import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import resource_tracker
+from typing import (
+    TypedDict,
+    Literal,
+    Any,
+    Callable,
+    NotRequired,
+    Optional,
+    Type,
+    TypeVar,
+)
+
+import logging
 import multiprocessing
+import os
 
+from ..config import get_config, set_config
 from ..task import AbstractTask, Task
-from ..task.mapreduce import AbstractMapReduceTask
+from ..task.mapreduce import AbstractMapReduceTask, map_unit
+from ..task.serialize import deserialize_task, load_task, serialize_task
+from ..task_graph import TaskGraph
+from ..task_tree import TaskTree
+from .base import TaskError
+from .broadcast import Broadcast, BroadcastHandle, receive_broadcast
 from .immediate import ImmediateBackend, execute_task
+from .scheduler import completed_future, map_reduce_futures, schedule_task_graph
+from .spill import SpillingResultStore, memory_budget
 
 _T = TypeVar("_T")
 
+_logger = logging.getLogger(__name__)
+
 
 class MultiprocessingBackendDictSpec(TypedDict):
     type: Literal["multiprocessing"]
     n_workers: int
+    max_in_flight: NotRequired[int]
+    max_concurrent_tasks: NotRequired[int]
+
+
+def call_broadcast_map_fn(handle: BroadcastHandle, batched: bool, unit):
+    serialized_task, requirements = receive_broadcast(handle)
+    return map_unit(load_task(serialized_task), batched, unit, requirements)
+
 
+def execute_parallel_task(
+    pool,
+    task: AbstractMapReduceTask,
+    requirements=None,
+    max_in_flight: Optional[int] = None,
+    n_workers: int = 1,
+):
+    """Map the items of `task` on the pool and reduce them as they complete.
 
-def call_map_fn(args):
-    map_fn, item, requirements = args
-    return map_fn(item, requirements)
+    Items are consumed lazily. No more than `max_in_flight` items are submitted to the
+    pool without having been reduced, so that generators yielding many items are not
+    materialized up front.
 
+    The task and its requirements are broadcast to the workers once, through shared
+    memory. Only the items are sent with every call. If the task maps items in
+    batches, every call gets a batch of items instead, and `max_in_flight` counts
+    batches.
 
-def execute_parallel_task(pool, task: AbstractMapReduceTask, requirements=None):
+    Arguments:
+        max_in_flight: Maximum number of items submitted but not yet reduced. If
+            `None`, every item is submitted as soon as it is yielded.
+        n_workers: Number of workers, used to choose the batch size."""
     accumulator = task.accumulator(requirements)
-    for mapped_item in pool.imap_unordered(
-        call_map_fn, [(task.map, item, requirements) for item in task.items()]
-    ):
-        accumulator = task.reduce(mapped_item, accumulator, requirements)
+
+    with Broadcast(
+        (serialize_task(task), requirements), key=task._unique_key()
+    ) as broadcast:
+        accumulator = map_reduce_items(
+            pool,
+            task,
+            broadcast.handle,
+            accumulator,
+            requirements,
+            max_in_flight,
+            n_workers,
+        )
 
     return task.post(accumulator, requirements)
 
 
-def execution_dispatch(pool, task: AbstractTask, requirements=None):
-    if isinstance(task, Task):
-        return execute_task(task, requirements)
-    elif isinstance(task, AbstractMapReduceTask):
-        return execute_parallel_task(pool, task, requirements)
-    else:
-        raise RuntimeError("Unhandled task type.")
+def map_reduce_items(
+    pool,
+    task: AbstractMapReduceTask,
+    handle: BroadcastHandle,
+    accumulator,
+    requirements=None,
+    max_in_flight: Optional[int] = None,
+    n_workers: int = 1,
+):
+    def submit(batched: bool, unit) -> Future:
+        return apply_future(pool, call_broadcast_map_fn, handle, batched, unit)
+
+    return map_reduce_futures(
+        task, submit, accumulator, requirements, max_in_flight, n_workers
+    )
+
+
+def execute_task_in_worker(cfg, serialized_task: bytes, requirements=None) -> Any:
+    """Run a task in a worker process. The task is sent in the form of
+    :func:`serialize_task`, so that tasks which plain `pickle` rejects, like those
+    built from lambdas or defined locally, still reach the workers."""
+    set_config(cfg)
+    return execute_task(deserialize_task(serialized_task), requirements)
+
+
+def apply_future(pool, fn: Callable[..., _T], *args) -> "Future[_T]":
+    """Submit `fn(*args)` to a `multiprocessing` pool, and return a
+    :class:`concurrent.futures.Future` of the result."""
+    future: Future = Future()
+    future.set_running_or_notify_cancel()
+    pool.apply_async(
+        fn, args, callback=future.set_result, error_callback=future.set_exception
+    )
+
+    return future
 
 
 class MultiprocessingBackend(ImmediateBackend):
-    """Computing backend based on the `multiprocessing` module. It only parallelizes
-    execution of :class:`ParallelTask` instances. For other tasks, it behaves like the
-    :class:`ImmediateBackend`."""
+    """Computing backend based on the `multiprocessing` module.
+
+    Every :class:`Task` whose requirements are available is run on the pool, so that
+    independent tasks run in parallel. The items of a :class:`MapReduceTask` are
+    mapped on the pool as well. Artifacts are checked, loaded and saved in the
+    calling process, like with the :class:`ImmediateBackend`.
 
-    def __init__(self, n_workers=None):
+    Arguments:
+        n_workers: Number of worker processes. Defaults to the number of CPUs.
+        max_in_flight: Maximum number of items of a :class:`MapReduceTask` that are
+            mapped but not yet reduced. Defaults to twice the number of workers.
+        max_concurrent_tasks: Maximum number of tasks running at the same time.
+            Defaults to the number of workers."""
+
+    def __init__(self, n_workers=None, max_in_flight=None, max_concurrent_tasks=None):
         self.n_workers = n_workers
+        self.max_in_flight = max_in_flight
+        self.max_concurrent_tasks = max_concurrent_tasks
+
+        # Workers must share the resource tracker of this process. Otherwise, they
+        # start their own when they attach to a broadcast, and it reports the shared
+        # memory block as leaked when they exit.
+        resource_tracker.ensure_running()
         self.pool = multiprocessing.Pool(processes=self.n_workers)
 
+    def _n_workers(self) -> int:
+        return self.n_workers or os.cpu_count() or 1
+
+    def _run(self, work: TaskTree, force_tasks: set[Type[AbstractTask]] = set()) -> Any:
+        graph = TaskGraph.build(work, force_tasks=force_tasks)
+        max_concurrent_tasks = self.max_concurrent_tasks or self._n_workers()
+
+        # Map-reduce tasks are driven from threads of this process, and map their items
+        # on the pool.
+        drivers = ThreadPoolExecutor(
+            max_workers=max_concurrent_tasks, thread_name_prefix="aq-map-reduce"
+        )
+        executed = set()
+
+        def submit(node: int, requirements=None) -> Future:
+            task = graph.tasks[node]
+
+            if self.should_load(task, force_tasks):
+                _logger.info(
+                    f"Loading result of {task} from {task._resolve_artifact()}"
+                )
+                return completed_future(task.load())
+
+            _logger.info(f"Running task {task}")
+            executed.add(node)
+            if isinstance(task, Task):
+                return apply_future(
+                    self.pool,
+                    execute_task_in_worker,
+                    get_config(),
+                    serialize_task(task),
+                    requirements,
+                )
+            elif isinstance(task, AbstractMapReduceTask):
+                return drivers.submit(self.execute_map_reduce_task, task, requirements)
+            else:
+                raise RuntimeError("Unhandled task type.")
+
+        def on_result(node: int, result):
+            if node in executed:
+                self.save_result(graph.tasks[node], result)
+
+            return result
+
+        def on_error(node: int, e: BaseException):
+            raise TaskError(f"Error while executing task {graph.tasks[node]}") from e
+
+        budget = memory_budget()
+        results = SpillingResultStore(graph, budget) if budget is not None else None
+        try:
+            return schedule_task_graph(
+                graph,
+                submit,
+                on_result=on_result,
+                on_error=on_error,
+                max_in_flight=max_concurrent_tasks,
+                results=results,
+            )
+        finally:
+            drivers.shutdown(cancel_futures=True)
+            if results is not None:
+                results.close()
+
     def execute_map_reduce_task(
         self, task: AbstractMapReduceTask[Any, Any, _T], requirements=None
     ) -> _T:
-        return execute_parallel_task(self.pool, task, requirements)
+        n_workers = self._n_workers()
+
+        max_in_flight = self.max_in_flight
+        if max_in_flight is None:
+            max_in_flight = 2 * n_workers
+
+        return execute_parallel_task(
+            self.pool,
+            task,
+            requirements,
+            max_in_flight=max_in_flight,
+            n_workers=n_workers,
+        )
 
     def _spec(self):
-        return {"type": "multiprocessing", "n_workers": self.n_workers}
+        spec = {"type": "multiprocessing", "n_workers": self.n_workers}
+        if self.max_in_flight is not None:
+            spec["max_in_flight"] = self.max_in_flight
+        if self.max_concurrent_tasks is not None:
+            spec["max_concurrent_tasks"] = self.max_concurrent_tasks
+
+        return spec
 
     def close(self):
         self.pool.close()
@@ -0,0 +1,166 @@
+"""Run the tasks of a :class:`TaskGraph` concurrently, as soon as their requirements
+are available."""
+
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Optional
+
+import heapq
+
+from ..task.mapreduce import AbstractMapReduceTask, map_reduce_units
+from ..task_graph import TaskGraph
+from ..task_tree import ResultStore
+
+
+def completed_future(value: Any) -> Future:
+    """A future that already holds `value`."""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def schedule_task_graph(
+    graph: TaskGraph,
+    submit: Callable[[int, Any], Future],
+    on_result: Optional[Callable[[int, Any], Any]] = None,
+    on_error: Optional[Callable[[int, BaseException], None]] = None,
+    max_in_flight: Optional[int] = None,
+    results: Optional[ResultStore] = None,
+) -> Any:
+    """Resolve a task graph, running independent tasks concurrently.
+
+    A task is submitted as soon as all its requirements completed. When several tasks
+    are ready, the one with the smallest node id goes first, which follows the
+    topological order of the graph. Like in :func:`_resolve_task_graph`, results are
+    released once all their consumers completed.
+
+    Arguments:
+        graph: The graph to resolve.
+        submit: Called as `submit(node, requirements)` to start the task of a node,
+            with its requirements mapped to their result. `requirements` is `None` for
+            tasks without requirements. Returns a future holding the result.
+        on_result: If specified, called in the calling thread as
+            `on_result(node, result)` when a task completes. Its return value replaces
+            the result.
+        on_error: If specified, called as `on_error(node, exception)` when a task
+            fails. It typically raises a more specific exception. The exception of the
+            task is raised otherwise.
+        max_in_flight: Maximum number of tasks submitted but not completed.
+        results: Where the results are held during the run.
+
+    Returns:
+        The task tree of the graph, with tasks replaced by their result."""
+    if results is None:
+        results = ResultStore(graph)
+
+    n_nodes = len(graph)
+    missing = [len(graph.dependencies(node)) for node in range(n_nodes)]
+    consumers = [len(graph.dependents(node)) for node in range(n_nodes)]
+    for root in graph.roots():
+        consumers[root] += 1
+
+    ready = [node for node in range(n_nodes) if missing[node] == 0]
+    heapq.heapify(ready)
+    running: dict[Future, int] = {}
+
+    try:
+        while ready or running:
+            while ready and (max_in_flight is None or len(running) < max_in_flight):
+                node = heapq.heappop(ready)
+
+                if graph.requirements[node] is None:
+                    requirements = None
+                else:
+                    requirements = graph.map_requirements(node, results.get)
+
+                running[submit(node, requirements)] = node
+                del requirements
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+
+                try:
+                    result = future.result()
+                except BaseException as e:
+                    if on_error is not None:
+                        on_error(node, e)
+                    raise
+
+                if on_result is not None:
+                    result = on_result(node, result)
+                results.put(node, result)
+                del result
+
+                for dependency in graph.dependencies(node):
+                    consumers[dependency] -= 1
+                    if consumers[dependency] == 0:
+                        results.release(dependency)
+
+                for dependent in graph.dependents(node):
+                    missing[dependent] -= 1
+                    if missing[dependent] == 0:
+                        heapq.heappush(ready, dependent)
+    finally:
+        for future in running:
+            future.cancel()
+
+    return graph.map_root(results.get)
+
+
+def map_reduce_futures(
+    task: AbstractMapReduceTask,
+    submit: Callable[[bool, Any], Future],
+    accumulator: Any,
+    requirements=None,
+    max_in_flight: Optional[int] = None,
+    n_workers: int = 1,
+) -> Any:
+    """Map the items of `task` concurrently and reduce them in the calling thread, as
+    they complete.
+
+    Items are consumed lazily. No more than `max_in_flight` items are submitted without
+    having been reduced, so that generators yielding many items are not materialized up
+    front. If the task maps items in batches, batches are submitted instead, and
+    `max_in_flight` counts batches.
+
+    Arguments:
+        task: The map-reduce task.
+        submit: Called as `submit(batched, unit)` to map a unit, see
+            :func:`map_unit`. Returns a future holding the mapped unit.
+        accumulator: The value the mapped units are reduced into.
+        requirements: The requirements of the task.
+        max_in_flight: Maximum number of units submitted but not yet reduced. If
+            `None`, every unit is submitted as soon as it is yielded.
+        n_workers: Number of workers, used to choose the batch size.
+
+    Returns:
+        The accumulator, once every unit was reduced into it."""
+    batched, units = map_reduce_units(task, task.items(), n_workers)
+    units = iter(units)
+    exhausted = False
+    running: set[Future] = set()
+
+    try:
+        while True:
+            while not exhausted and (
+                max_in_flight is None or len(running) < max_in_flight
+            ):
+                try:
+                    unit = next(units)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                running.add(submit(batched, unit))
+
+            if not running:
+                break
+
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                accumulator = task.reduce(future.result(), accumulator, requirements)
+    finally:
+        for future in running:
+            future.cancel()
+
+    return accumulator
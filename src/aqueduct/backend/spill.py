@@ -0,0 +1,146 @@
+"""Spill the in-flight results of a run to the scratch store when they use too much
+memory."""
+
+from typing import Any, Optional, Type
+
+import logging
+import shutil
+import uuid
+
+from dask.sizeof import sizeof
+from dask.utils import parse_bytes
+
+from ..artifact import LocalFilesystemArtifact, LocalStoreArtifact
+from ..artifact.snapshot import artifact_exists
+from ..config import get_aqueduct_config
+from ..task.autostore import load_artifact, store_artifact
+from ..task_graph import TaskGraph
+from ..task_tree import ResultStore
+
+_logger = logging.getLogger(__name__)
+
+
+def memory_budget() -> Optional[int]:
+    """The memory budget of a run in bytes, as specified by the
+    `aqueduct.memory_budget` configuration option. `None` if there is no budget."""
+    budget = get_aqueduct_config().get("memory_budget", None)
+
+    if budget is None:
+        return None
+    elif isinstance(budget, str):
+        return parse_bytes(budget)
+    else:
+        return int(budget)
+
+
+class SpillingResultStore(ResultStore):
+    """Keeps the results held in memory under a budget.
+
+    When the results held in memory exceed the budget, the results that will be needed
+    last are spilled first. Results of tasks that were saved to their artifact are
+    simply dropped, and loaded from the artifact when needed. Other results are written
+    to the scratch store using the `autostore` writers. Spilled results are loaded every
+    time they are needed, and are not brought back in memory for good.
+
+    Arguments:
+        graph: The graph being resolved.
+        memory_budget: Size of the results that can be held in memory, in bytes."""
+
+    def __init__(self, graph: TaskGraph, memory_budget: int):
+        super().__init__(graph)
+        self.memory_budget = memory_budget
+        self.directory = LocalStoreArtifact(
+            f"aq-spill-{uuid.uuid4().hex}", scratch=True
+        ).path
+
+        self._sizes: dict[int, int] = {}
+        self._in_memory = 0
+        self._spilled: dict[int, Optional[tuple[LocalFilesystemArtifact, Type]]] = {}
+        self._unspillable: set[int] = set()
+        self._position = 0
+
+    def put(self, node: int, value: Any):
+        self._position = max(self._position, node)
+        super().put(node, value)
+
+        if value is not None:
+            size = sizeof(value)
+            self._sizes[node] = size
+            self._in_memory += size
+
+            if self._in_memory > self.memory_budget:
+                self._spill_until_under_budget()
+
+    def get(self, node: int) -> Any:
+        if node not in self._spilled:
+            return super().get(node)
+
+        spilled = self._spilled[node]
+        if spilled is None:
+            return self.graph.tasks[node].load()
+        else:
+            artifact, type_hint = spilled
+            return load_artifact(artifact, type_hint)
+
+    def release(self, node: int):
+        super().release(node)
+        self._in_memory -= self._sizes.pop(node, 0)
+        self._unspillable.discard(node)
+
+        spilled = self._spilled.pop(node, None)
+        if spilled is not None:
+            artifact, _ = spilled
+            artifact.path.unlink(missing_ok=True)
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def is_spilled(self, node: int) -> bool:
+        return node in self._spilled
+
+    def _next_use(self, node: int) -> float:
+        """The first node still to be resolved that requires `node`. Infinity if no such
+        node exists, in which case the result is only needed at the end of the run."""
+        for dependent in self.graph.dependents(node):
+            if dependent > self._position:
+                return dependent
+
+        return float("inf")
+
+    def _spill_until_under_budget(self):
+        candidates = [n for n in self._sizes if n not in self._unspillable]
+        for node in sorted(candidates, key=self._next_use, reverse=True):
+            if self._in_memory <= self.memory_budget:
+                break
+
+            self._spill(node)
+
+    def _spill(self, node: int):
+        value = self._values[node]
+        task = self.graph.tasks[node]
+        task_artifact = task._resolve_artifact()
+
+        if (
+            task_artifact is not None
+            and task.AQ_AUTOSAVE
+            and artifact_exists(task_artifact)
+        ):
+            self._spilled[node] = None
+        else:
+            artifact = LocalFilesystemArtifact(self.directory / str(node))
+
+            try:
+                store_artifact(artifact, value)
+            except Exception:
+                _logger.warning(
+                    f"Could not spill result of {task}, keeping it in memory.",
+                    exc_info=True,
+                )
+                self._unspillable.add(node)
+                return
+
+            self._spilled[node] = (artifact, type(value))
+
+        _logger.info(f"Spilled result of {task}")
+        self._values[node] = None
+        self._in_memory -= self._sizes.pop(node)
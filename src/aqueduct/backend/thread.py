@@ -0,0 +1,123 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Literal, NotRequired, Type, TypedDict, TypeVar
+
+import logging
+import os
+
+from ..task import AbstractTask, Task
+from ..task.mapreduce import AbstractMapReduceTask, map_unit
+from ..task_graph import TaskGraph
+from ..task_tree import TaskTree
+from .base import TaskError
+from .immediate import ImmediateBackend
+from .scheduler import map_reduce_futures, schedule_task_graph
+from .spill import SpillingResultStore, memory_budget
+
+_T = TypeVar("_T")
+
+_logger = logging.getLogger(__name__)
+
+
+class ThreadBackendDictSpec(TypedDict):
+    type: Literal["thread"]
+    n_workers: int
+    max_in_flight: NotRequired[int]
+
+
+class ThreadBackend(ImmediateBackend):
+    """Computing backend that runs tasks on a pool of threads of the current process.
+
+    Every :class:`Task` whose requirements are available is run on the pool, and the
+    items of a :class:`MapReduceTask` are mapped on the pool as well. Nothing is
+    pickled: results are shared between tasks as they are. This suits tasks that wait
+    on I/O, or that spend their time in code that releases the GIL, like NumPy.
+    Artifacts are loaded and saved by the threads running the tasks.
+
+    Tasks running at the same time must not modify shared state without a lock. This
+    is required by free-threaded builds of Python, where tasks run truly in parallel.
+
+    Arguments:
+        n_workers: Number of threads. Defaults to the number of CPUs.
+        max_in_flight: Maximum number of items of a :class:`MapReduceTask` that are
+            mapped but not yet reduced. Defaults to twice the number of threads."""
+
+    def __init__(self, n_workers=None, max_in_flight=None):
+        self.n_workers = n_workers
+        self.max_in_flight = max_in_flight
+        self.executor = ThreadPoolExecutor(
+            max_workers=self._n_workers(), thread_name_prefix="aq-worker"
+        )
+
+    def _n_workers(self) -> int:
+        return self.n_workers or os.cpu_count() or 1
+
+    def _run(self, work: TaskTree, force_tasks: set[Type[AbstractTask]] = set()) -> Any:
+        graph = TaskGraph.build(work, force_tasks=force_tasks)
+        n_workers = self._n_workers()
+
+        # Map-reduce tasks wait for their items, so they are driven from other threads
+        # than the workers mapping the items.
+        drivers = ThreadPoolExecutor(
+            max_workers=n_workers, thread_name_prefix="aq-map-reduce"
+        )
+
+        def submit(node: int, requirements=None) -> Future:
+            task = graph.tasks[node]
+
+            if isinstance(task, Task):
+                executor = self.executor
+            else:
+                executor = drivers
+
+            return executor.submit(
+                self.check_artifact_and_execute, task, requirements, force_tasks
+            )
+
+        budget = memory_budget()
+        results = SpillingResultStore(graph, budget) if budget is not None else None
+        try:
+            return schedule_task_graph(
+                graph,
+                submit,
+                max_in_flight=n_workers,
+                results=results,
+            )
+        finally:
+            drivers.shutdown(cancel_futures=True)
+            if results is not None:
+                results.close()
+
+    def execute_map_reduce_task(
+        self, task: AbstractMapReduceTask[Any, Any, _T], requirements=None
+    ) -> _T:
+        n_workers = self._n_workers()
+
+        max_in_flight = self.max_in_flight
+        if max_in_flight is None:
+            max_in_flight = 2 * n_workers
+
+        def submit(batched: bool, unit) -> Future:
+            return self.executor.submit(map_unit, task, batched, unit, requirements)
+
+        try:
+            accumulator = map_reduce_futures(
+                task,
+                submit,
+                task.accumulator(requirements),
+                requirements,
+                max_in_flight=max_in_flight,
+                n_workers=n_workers,
+            )
+            return task.post(accumulator, requirements)
+        except Exception as e:
+            raise TaskError(f"Error while executing task {task}") from e
+
+    def _spec(self) -> ThreadBackendDictSpec:
+        spec: ThreadBackendDictSpec = {"type": "thread", "n_workers": self._n_workers()}
+        if self.max_in_flight is not None:
+            spec["max_in_flight"] = self.max_in_flight
+
+        return spec
+
+    def close(self):
+        self.executor.shutdown()
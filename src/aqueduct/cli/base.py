@@ -1,4 +1,13 @@
-from typing import Generic, Mapping, Iterable, Sequence, Optional, Type, TypeVar
+from typing import (
+    Callable,
+    Generic,
+    Mapping,
+    Iterable,
+    Sequence,
+    Optional,
+    Type,
+    TypeVar,
+)
 
 import argparse
 import omegaconf
@@ -8,12 +17,13 @@ from aqueduct.cli.tasklang import parse_task_spec
 from aqueduct.config import set_config
 from aqueduct.task.functor import Functor
 
-from ..artifact import Artifact, CompositeArtifact, resolve_artifact_from_spec
+from ..artifact import Artifact, CompositeArtifact
 from ..config.configsource import ConfigSource, DotListConfigSource
 from ..config.aqueduct import DefaultAqueductConfigSource
 from ..task import AbstractTask
 from ..taskresolve import get_modules_from_extensions
-from ..task_tree import reduce_type_in_tree
+from ..task_graph import TaskGraph
+from ..task_tree import gather_tasks_in_tree
 
 
 def resolve_source_modules(ns: argparse.Namespace) -> Mapping[str, Iterable[str]]:
@@ -112,52 +122,95 @@ def flatten_artifact(artifact: Artifact) -> list[Artifact]:
         return [artifact]
 
 
+def tasks_within_depth(
+    tree, max_depth: int, expand: Optional[Callable[[AbstractTask], bool]] = None
+) -> list[AbstractTask]:
+    """Gather the unique tasks of a task tree that are at most `max_depth`
+    requirement edges away from its root. The tree is walked breadth first, so the
+    requirements of the tasks at the depth limit are never resolved.
+
+    Args:
+        tree: The task tree to expand.
+        max_depth: The maximum depth of the gathered tasks.
+        expand: If specified, the requirements of a task are only expanded if
+            `expand(task)` is `True`.
+
+    Returns:
+        The tasks, deepest first."""
+    level = []
+    seen: set[str] = set()
+    for task in gather_tasks_in_tree(tree):
+        if task._unique_key() not in seen:
+            seen.add(task._unique_key())
+            level.append(task)
+
+    tasks = []
+    for depth in range(max(max_depth, 0) + 1):
+        tasks.extend(level)
+        if depth >= max_depth:
+            break
+
+        next_level = []
+        for task in level:
+            if expand is not None and not expand(task):
+                continue
+
+            requirements = task._resolve_requirements(ignore_cache=True)
+            for requirement in gather_tasks_in_tree(requirements):
+                if requirement._unique_key() not in seen:
+                    seen.add(requirement._unique_key())
+                    next_level.append(requirement)
+
+        level = next_level
+
+    return tasks[::-1]
+
+
 def accumulate_artifacts_of_tree(
     tree,
     artifacts: list[tuple[AbstractTask, Artifact]],
     below: Optional[Type[AbstractTask]] = None,
     max_depth: Optional[int] = None,
+    graph: Optional[TaskGraph] = None,
 ):
     """Expand a task tree and gather all its artifacts in a list.
     Args:
         tree: The task tree to expand.
         artifacts: The list of artifacts to accumulate.
         below: If specified, only accumulate artifacts of tasks that are of this type or below it in the task tree.
+        max_depth: If specified, only accumulate artifacts of tasks that are at most
+            this many requirement edges away from the root.
+        graph: The graph of `tree`, if it was already built.
 
     Returns:
         A list of of tuples (task, artifact)."""
 
-    max_depth_closure = max_depth
-
-    def accumulate_artifacts_of_task(
-        task: AbstractTask,
-        artifacts: list[tuple[AbstractTask, Artifact]],
-    ):
-
-        if max_depth_closure is not None:
-            max_depth = max_depth_closure - 1
+    if graph is not None:
+        if max_depth is not None:
+            depths = graph.depths()
+            tasks = [
+                t for n, t in enumerate(graph.tasks) if depths[n] <= max(max_depth, 0)
+            ]
         else:
-            max_depth = None
-
-        if (below is None or not isinstance(task, below)) and (
-            max_depth is None or max_depth >= 0
-        ):
-            # Expand requirements of that task because it is not of type below.
-            reqs = task._resolve_requirements(ignore_cache=True)
+            tasks = graph.tasks
+    else:
+        if below is not None:
+            expand = lambda task: not isinstance(task, below)
+        else:
+            expand = None
 
-            artifacts = accumulate_artifacts_of_tree(
-                reqs, artifacts, below=below, max_depth=max_depth
-            )
+        if max_depth is not None:
+            # Only the requirements above the depth limit are resolved.
+            tasks = tasks_within_depth(tree, max_depth, expand=expand)
+        else:
+            tasks = TaskGraph.build(tree, ignore_cache=True, expand=expand).tasks
 
-        resolved_artifact = resolve_artifact_from_spec(task.artifact())
+    for task in tasks:
+        resolved_artifact = task._resolve_artifact()
         if resolved_artifact is not None:
             artifacts.extend([(task, x) for x in flatten_artifact(resolved_artifact)])
 
-        return artifacts
-
-    return reduce_type_in_tree(
-        tree, AbstractTask, accumulate_artifacts_of_task, artifacts
-    )
+    return artifacts
 
 
 _T = TypeVar("_T")
@@ -182,37 +235,63 @@ class TaskTreeVisitor(Generic[_T]):
         acc: _T,
         max_depth: Optional[int] = None,
         min_depth: Optional[int] = None,
+        graph: Optional[TaskGraph] = None,
     ) -> _T:
-        if isinstance(work, list):
-            acc = self.on_list(work, acc)
-
-            for item in work:
-                self.visit(item, acc, max_depth=max_depth, min_depth=min_depth)
-        elif isinstance(work, tuple):
-            acc = self.on_tuple(work, acc)
-
-            for item in work:
-                self.visit(item, acc, max_depth=max_depth, min_depth=min_depth)
-        elif isinstance(work, dict):
-            acc = self.on_dict(work, acc)
+        """Visit a task tree.
+
+        The tree is walked depth-first with an explicit stack, so deep chains of tasks
+        do not hit the recursion limit.
+
+        Args:
+            graph: If specified, the requirements of the visited tasks are taken from
+                this graph instead of being resolved again."""
+        result = acc
+
+        # Every frame is an item to visit, the accumulator handed to it, its depth
+        # bounds, and whether its accumulator is the result of the whole visit. The
+        # result is the accumulator of the root, or of the requirements of the root
+        # if it is an expanded task, and so on.
+        stack = [(work, acc, max_depth, min_depth, True)]
+        while stack:
+            work, acc, max_depth, min_depth, is_result = stack.pop()
+
+            if isinstance(work, (list, tuple, dict)):
+                if isinstance(work, list):
+                    acc = self.on_list(work, acc)
+                    items = work
+                elif isinstance(work, tuple):
+                    acc = self.on_tuple(work, acc)
+                    items = work
+                else:
+                    acc = self.on_dict(work, acc)
+                    items = work.values()
+
+                stack.extend(
+                    [(x, acc, max_depth, min_depth, False) for x in reversed(items)]
+                )
+            elif isinstance(work, AbstractTask):
+                if min_depth is None or min_depth <= 0:
+                    acc = self.on_task(work, acc)
 
-            for item in work:
-                self.visit(work[item], acc, max_depth=max_depth, min_depth=min_depth)
-        elif isinstance(work, AbstractTask):
-            if min_depth is None or min_depth <= 0:
-                acc = self.on_task(work, acc)
+                if max_depth is None or max_depth > 0:
+                    new_min_depth = min_depth - 1 if min_depth else None
+                    new_max_depth = max_depth - 1 if max_depth else None
 
-            new_min_depth = min_depth - 1 if min_depth else None
+                    reqs = self._requirements_of(work, graph)
+                    stack.append((reqs, acc, new_max_depth, new_min_depth, is_result))
+                    continue
 
-            if max_depth is None or max_depth > 0:
-                new_max_depth = max_depth - 1 if max_depth else None
+            if is_result:
+                result = acc
 
-                reqs = work._resolve_requirements(ignore_cache=True)
-                acc = self.visit(
-                    reqs, acc, max_depth=new_max_depth, min_depth=new_min_depth
-                )
+        return result
 
-        return acc
+    def _requirements_of(self, task: AbstractTask, graph: Optional[TaskGraph]):
+        if graph is not None and task._unique_key() in graph:
+            node = graph.index[task._unique_key()]
+            return graph.map_requirements(node, graph.tasks.__getitem__)
+        else:
+            return task._resolve_requirements(ignore_cache=True)
 
 
 class PeelParentTaskClasses(TaskTreeVisitor[list[AbstractTask]]):
@@ -226,25 +305,23 @@ def peel_parents(task):
     return visitor.visit(task, [], max_depth=1, min_depth=1)
 
 
-class BuildParentsDict(
-    TaskTreeVisitor[dict[Type[AbstractTask], set[Type[AbstractTask]]]]
-):
-    def on_task(self, task, acc):
-        parents = peel_parents(task)
-
-        for parent in parents:
-            children_set = acc.get(parent.__class__, set())
-            children_set.add(task.__class__)
-            acc[parent.__class__] = children_set
-        return acc
-
-
 def build_parents_dict(
-    task: AbstractTask,
+    task: AbstractTask, graph: Optional[TaskGraph] = None
 ) -> dict[Type[AbstractTask], set[Type[AbstractTask]]]:
-    visitor = BuildParentsDict()
+    """Map every task class of the tree to the set of task classes that require
+    it."""
+    if graph is None:
+        graph = TaskGraph.build(task, ignore_cache=True)
+
+    parents_dict = {}
+    for node, t in enumerate(graph.tasks):
+        for dependency in graph.dependencies(node):
+            children_set = parents_dict.setdefault(
+                graph.tasks[dependency].__class__, set()
+            )
+            children_set.add(t.__class__)
 
-    return visitor.visit(task, {})
+    return parents_dict
 
 
 def downstream_of(root_task, target_task: Type[AbstractTask]) -> set[AbstractTask]:
@@ -18,29 +18,24 @@ from .base import (
 from .tasklang import parse_task_spec
 from aqueduct.config import set_config
 from aqueduct.task.abstract_task import AbstractTask
-from aqueduct.task_tree import _map_tasks_in_tree
+from aqueduct.task_graph import TaskGraph, iter_nodes
 from aqueduct.taskresolve import create_task_index
 
-
 logger = logging.getLogger(__name__)
 
 
 def print_task_tree(task: AbstractTask, ignore_cache=False):
-    def print_one_task(
-        task: AbstractTask,
-        indent=0,
-    ):
-        pad = " " * indent
-        print(f"{pad}{str(task)}")
+    graph = TaskGraph.build(task, ignore_cache=ignore_cache)
 
-        reqs = task._resolve_requirements(ignore_cache=ignore_cache)
+    stack = [(root, 0) for root in reversed(list(iter_nodes(graph.root)))]
+    while stack:
+        node, indent = stack.pop()
 
-        if reqs is not None:
-            _map_tasks_in_tree(
-                task.requirements(), lambda x: print_one_task(x, indent=indent + 1)
-            )
+        pad = " " * indent
+        print(f"{pad}{str(graph.tasks[node])}")
 
-    print_one_task(task)
+        requirements = list(iter_nodes(graph.requirements[node]))
+        stack.extend([(r, indent + 1) for r in reversed(requirements)])
 
 
 def run_cli(ns: argparse.Namespace):
@@ -79,6 +74,17 @@ def run_cli(ns: argparse.Namespace):
         cfg["aqueduct"]["backend"]["type"] = "multiprocessing"
         cfg["aqueduct"]["backend"]["n_workers"] = ns.multiprocessing
 
+    elif ns.asyncio is not None:
+        cfg["aqueduct"]["backend"]["type"] = "asyncio"
+        cfg["aqueduct"]["backend"]["n_workers"] = ns.asyncio
+
+    elif ns.thread is not None:
+        cfg["aqueduct"]["backend"]["type"] = "thread"
+        cfg["aqueduct"]["backend"]["n_workers"] = ns.thread
+
+    if ns.check_upstream_mtime:
+        cfg["aqueduct"]["check_upstream_mtime"] = True
+
     if ns.cfg:
         print(omegaconf.OmegaConf.to_yaml(cfg, resolve=ns.resolve))
         return
@@ -147,6 +153,11 @@ def add_run_cli_to_parser(parser: argparse.ArgumentParser):
         help="Ignore cache for the root task and force it to run.",
     )
     parser.add_argument("--force-downstream-of", type=str, default=None)
+    parser.add_argument(
+        "--check-upstream-mtime",
+        action="store_true",
+        help="Recompute artifacts that are older than an upstream artifact.",
+    )
     parser.add_argument(
         "--resolve", action="store_true", help="Resolve the config before printing."
     )
@@ -170,5 +181,7 @@ def add_run_cli_to_parser(parser: argparse.ArgumentParser):
     backend_group.add_argument("--dask-url", type=str, default=None)
     backend_group.add_argument("--dask", type=int, default=None)
     backend_group.add_argument("--multiprocessing", type=int, default=None)
+    backend_group.add_argument("--thread", type=int, default=None)
+    backend_group.add_argument("--asyncio", type=int, default=None)
 
     parser.set_defaults(func=run_cli)
@@ -18,6 +18,7 @@ class DefaultAqueductConfigSource:
                 "aqueduct": {
                     "scratch_store": "${oc.env:AQ_SCRATCH_STORE,./}",
                     "local_store": "${oc.env:AQ_LOCAL_STORE,./}",
+                    "memory_budget": "${oc.env:AQ_MEMORY_BUDGET,null}",
                     "backend": {"type": "immediate"},
                 }
             }
@@ -0,0 +1,104 @@
+"""Make-style staleness of stored artifacts.
+
+An artifact is stale if it is older than the `AQ_UPDATED` date of its task. When
+upstream modification times are checked, an artifact is also stale if it is older
+than the artifact of any task upstream of it, or if a task upstream of it is stale.
+Stale tasks are recomputed even if their artifact exists."""
+
+from typing import Optional, Type, TYPE_CHECKING
+
+import datetime
+import functools
+
+import pandas as pd
+
+from .artifact.snapshot import (
+    artifact_exists,
+    artifact_modification_times,
+    current_snapshot,
+)
+from .task_graph import TaskGraph
+from .task_tree import TaskTree
+
+if TYPE_CHECKING:
+    from .task import AbstractTask
+
+
+@functools.lru_cache(maxsize=None)
+def _updated_timestamp(updated: str | datetime.datetime) -> float:
+    return pd.to_datetime(updated).to_pydatetime().timestamp()
+
+
+def updated_timestamp(task: "AbstractTask") -> Optional[float]:
+    """The `AQ_UPDATED` date of a task, as a timestamp. `None` if it is not set."""
+    if task.AQ_UPDATED is None:
+        return None
+    else:
+        return _updated_timestamp(task.AQ_UPDATED)
+
+
+def is_older_than_updated(task: "AbstractTask") -> bool:
+    """Indicates if the stored artifact of `task` is older than its `AQ_UPDATED`
+    date."""
+    updated = updated_timestamp(task)
+    if updated is None:
+        return False
+
+    artifact = task._resolve_artifact()
+    if artifact is None:
+        return False
+
+    oldest, _ = artifact_modification_times(artifact)
+    return oldest is not None and oldest < updated
+
+
+def find_stale_tasks(
+    work: TaskTree, force_tasks: Optional[set[Type["AbstractTask"]]] = None
+) -> set[str]:
+    """Find the tasks of a tree whose artifact exists but is stale.
+
+    The whole tree is expanded, including below cached tasks. Walking the graph in
+    topological order, every node gets an effective modification time: the time of its
+    artifact if it is up to date, infinity if it is stale, and the newest time of its
+    requirements if it has no stored artifact.
+
+    Returns:
+        The unique keys of the stale tasks."""
+    graph = TaskGraph.build(work, ignore_cache=True, force_tasks=force_tasks)
+
+    stale = set()
+    times = [float("-inf")] * len(graph)
+    for node, task in enumerate(graph.tasks):
+        upstream = max(
+            [times[d] for d in graph.dependencies(node)], default=float("-inf")
+        )
+
+        artifact = task._resolve_artifact()
+        if artifact is None or not artifact_exists(artifact):
+            # Tasks without a stored artifact are transparent.
+            times[node] = upstream
+            continue
+
+        oldest, newest = artifact_modification_times(artifact)
+        if oldest is None or newest is None:
+            times[node] = upstream
+        elif oldest < upstream or is_older_than_updated(task):
+            stale.add(graph.keys[node])
+            times[node] = float("inf")
+        else:
+            times[node] = newest
+
+    return stale
+
+
+def mark_stale_tasks(
+    work: TaskTree, force_tasks: Optional[set[Type["AbstractTask"]]] = None
+):
+    """Mark the stale tasks of `work` in the current snapshot, so that they are
+    recomputed during the run."""
+    snapshot = current_snapshot()
+
+    if snapshot is None:
+        raise RuntimeError("Marking stale tasks requires an active snapshot.")
+
+    snapshot.mark_stale(find_stale_tasks(work, force_tasks=force_tasks))
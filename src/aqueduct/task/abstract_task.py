@@ -14,13 +14,14 @@ import inspect
 import logging
 
 
-from ..artifact import Artifact, ArtifactSpec, resolve_artifact_from_spec
+from ..artifact import Artifact, ArtifactSpec
+from ..artifact.snapshot import artifact_exists, is_marked_stale, resolve_task_artifact
 from ..config import AqueductConfig, ConfigSpec, resolve_config_from_spec
 from .autoresolve import WrapInitMeta
+from ..staleness import is_older_than_updated
 from ..task_tree import reduce_type_in_tree
 from .autostore import load_artifact, store_artifact
 
-
 if TYPE_CHECKING:
     from ..backend import Backend
     from ..task_tree import TaskTree
@@ -53,7 +54,19 @@ class AbstractTask(Generic[_T], metaclass=WrapInitMeta):
 
     AQ_UPDATED: str | datetime.datetime | None = None
     """If set, sent through `pd.to_datetime`. Any artifacts older than the resulting
-    date are considered stale and recomputed."""
+    date are considered stale and recomputed. If the `aqueduct.check_upstream_mtime`
+    configuration option is set, the tasks downstream of a stale task are recomputed
+    as well."""
+
+    AQ_RESOURCES: Optional[dict[str, float | str]] = None
+    """Abstract resources held by the task while it runs, like
+    `{"memory": "8GB", "GPU": 1}`. Backends which support it, like the
+    :class:`DaskBackend`, only run the task on a worker which declares enough of these
+    resources. Amounts given as strings are sizes in bytes."""
+
+    AQ_PRIORITY: int = 0
+    """When several tasks can start, backends which support it, like the
+    :class:`DaskBackend`, start the tasks with the highest priority first."""
 
     def __init__(self):
         """The __init__ method of a :class:`Task` automatically retrieves the value of
@@ -61,10 +74,8 @@ class AbstractTask(Generic[_T], metaclass=WrapInitMeta):
         :ref:`configuration` for more details."""
         self._aq_force_root = False
 
-        # These two values are set by the wrapper around __init__ introduced by
-        # `WrapInitMeta`.
-        self._args = ""
-        self._kwargs = ""
+        # The arguments of the task, `_args` and `_kwargs`, are set by the wrapper
+        # around __init__ introduced by `WrapInitMeta`.
 
     def artifact(self) -> Optional[ArtifactSpec]:
         """Describe the artifact produced by `run`. See :class:`Artifact` for more
@@ -85,14 +96,28 @@ class AbstractTask(Generic[_T], metaclass=WrapInitMeta):
 
         Returns:
             A boolean indicating if there exists a stored artifact as specified by the
-            `artifact` method."""
-        artifact = resolve_artifact_from_spec(self.artifact())
+            `artifact` method, and that artifact is not stale."""
+        artifact = self._resolve_artifact()
 
         if artifact is not None:
-            return artifact.exists()
+            return artifact_exists(artifact) and not self.is_stale()
         else:
             return False
 
+    def is_stale(self) -> bool:
+        """Indicates if the stored artifact of the Task is outdated and must be
+        recomputed even though it exists.
+
+        Returns:
+            `True` if the artifact is older than `AQ_UPDATED`, or if the task was found
+            stale because of its upstream artifacts during the current run."""
+        return is_marked_stale(self) or is_older_than_updated(self)
+
+    def _resolve_artifact(self) -> Optional[Artifact]:
+        """Resolve the specification returned by `artifact`. During a run, the result
+        is cached by unique key, so `artifact` is only called once per task."""
+        return resolve_task_artifact(self)
+
     def requirements(self) -> "TaskTree":
         """Subclass this to express the Tasks that are required for this Task to run.
         The tasks specified here will be computed before this Task is executed. The
@@ -161,7 +186,7 @@ class AbstractTask(Generic[_T], metaclass=WrapInitMeta):
         return result
 
     def save(self, object: _T):
-        artifact = resolve_artifact_from_spec(self.artifact())
+        artifact = self._resolve_artifact()
 
         if artifact is not None:
             store_artifact(artifact, object)
@@ -173,7 +198,7 @@ class AbstractTask(Generic[_T], metaclass=WrapInitMeta):
         to avoid excecuting the `run` method. Override this to implement your own
         loading behavior.
         """
-        artifact = resolve_artifact_from_spec(self.artifact())
+        artifact = self._resolve_artifact()
 
         if artifact is None:
             raise ValueError(
@@ -3,7 +3,7 @@ from typing import Optional
 from aqueduct.artifact import Artifact
 
 from .abstract_task import AbstractTask
-from ..artifact import CompositeArtifact, resolve_artifact_from_spec
+from ..artifact import CompositeArtifact
 from .task import Task
 from ..task_tree import _map_tasks_in_tree
 
@@ -15,9 +15,9 @@ class AggregateTask(Task):
         artifacts = []
 
         def accumulate_artifacts(t):
-            spec = t.artifact()
-            if spec is not None:
-                artifacts.append(resolve_artifact_from_spec(spec))
+            artifact = t._resolve_artifact()
+            if artifact is not None:
+                artifacts.append(artifact)
 
             return t
 
@@ -2,7 +2,7 @@ import inspect
 from typing import Callable, Optional, Type, TypeVar, overload
 
 from .abstract_task import AbstractTask
-from .task import Task
+from .task import Task, apply_to_awaitable
 
 _T = TypeVar("_T")
 _Task = TypeVar("_Task", bound=AbstractTask)
@@ -23,6 +23,9 @@ class TaskWithApply(Task[_U]):
 
     def run(self, *args, **kwargs) -> _U:
         retval = self.inner.run(*args, **kwargs)
+        if inspect.isawaitable(retval):
+            return apply_to_awaitable(self.fn, retval)
+
         return self.fn(retval)
 
     def ui_name(self) -> str:
@@ -59,6 +62,9 @@ def apply(
         class AnonymousTask(task):
             def run(self, *args, **kwargs):
                 x = super().run(*args, **kwargs)
+                if inspect.isawaitable(x):
+                    return apply_to_awaitable(fn, x)
+
                 return fn(x)
 
             @classmethod
@@ -72,12 +72,15 @@ def init_wrapper(task_class: Type["AbstractTask"], fn):
 
         new_args, new_kwargs = bind.args, bind.kwargs
 
-        # Remove self from new_args
-        self._args_hash = dask.base.tokenize(
-            self._fully_qualified_name(), *new_args[1:], **new_kwargs
-        )
-        self._args = new_args
-        self._kwargs = new_kwargs
+        # Only the outermost __init__ describes the object. The __init__ of parent
+        # classes, called through super(), must not overwrite its arguments.
+        if "_args_hash" not in self.__dict__:
+            # Remove self from new_args
+            self._args_hash = dask.base.tokenize(
+                self._fully_qualified_name(), *new_args[1:], **new_kwargs
+            )
+            self._args = new_args
+            self._kwargs = new_kwargs
 
         return fn(*new_args, **new_kwargs)
 
@@ -1,6 +1,5 @@
 from .abstract_task import AbstractTask
 from .task import Task
-from ..artifact import resolve_artifact_from_spec
 
 
 class ExtractArtifact(Task):
@@ -11,7 +10,7 @@ class ExtractArtifact(Task):
         return self.inner
 
     def run(self, req):
-        return resolve_artifact_from_spec(self.inner.artifact())
+        return self.inner._resolve_artifact()
 
     def artifact(self):
         return None
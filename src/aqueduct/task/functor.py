@@ -46,7 +46,9 @@ class MappedTask(Task, Generic[_T, _U]):
 
     def _unique_key(self) -> str:
         task_key = self.task._unique_key()
-        functor_key = "-".join([self.functor_name(), self._args_hash])  # type: ignore
+        functor_key = "-".join(
+            [self.functor.ui_name(), self.functor._args_hash]  # type: ignore
+        )
 
         return "--".join([functor_key, task_key])
 
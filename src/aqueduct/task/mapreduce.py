@@ -1,4 +1,7 @@
-from typing import Iterable, TYPE_CHECKING, Generic, TypeVar
+from typing import Any, Iterable, Iterator, Optional, TYPE_CHECKING, Generic, TypeVar
+
+import itertools
+import math
 
 from .abstract_task import AbstractTask
 
@@ -9,10 +12,24 @@ _A = TypeVar("_A")
 _T = TypeVar("_T")
 _U = TypeVar("_U")
 
+DEFAULT_BATCH_SIZE = 128
+"""Batch size used when it is chosen automatically and the number of items is not
+known in advance."""
+
+BATCHES_PER_WORKER = 4
+"""When the batch size is chosen automatically and the number of items is known, the
+items are split in that many batches per worker."""
+
 
 class AbstractMapReduceTask(AbstractTask, Generic[_T, _A, _U]):
     """"""
 
+    AQ_BATCH_SIZE: int | None = None
+    """Number of items handed to each call of `map_batch`. If `None`, items are mapped
+    one by one with `map`, unless `map_batch` is overridden, in which case the batch
+    size is chosen automatically. When `map_batch` is overridden, it maps every item,
+    even in batches of a single item."""
+
     def items(self) -> Iterable:
         """The list of input items to be processed in parallel."""
         raise NotImplementedError()
@@ -29,6 +46,39 @@ class AbstractMapReduceTask(AbstractTask, Generic[_T, _A, _U]):
         function. Override to provide a custom map function."""
         raise NotImplementedError()
 
+    def map_batch(self, items: list[_T], requirements=None) -> _A:
+        """Map a batch of items at once. Override to process a whole batch in one
+        call, for instance with vectorized NumPy or pandas code.
+
+        The result is reduced with the results of the other batches using `reduce`.
+        Defaults to reducing the `map` of every item, starting from the
+        `accumulator`."""
+        acc = self.accumulator(requirements)
+        for item in items:
+            acc = self.reduce(self.map(item, requirements), acc, requirements)
+
+        return acc
+
+    def _overrides_map_batch(self) -> bool:
+        return type(self).map_batch is not AbstractMapReduceTask.map_batch
+
+    def _batch_size(self, n_items: Optional[int] = None, n_workers: int = 1) -> int:
+        """The number of items handed to each call of `map_batch`. A batch size of 1
+        means that items are mapped one by one with `map`, unless `map_batch` is
+        overridden.
+
+        Arguments:
+            n_items: The number of items, if known.
+            n_workers: The number of workers the batches are spread over."""
+        if self.AQ_BATCH_SIZE is not None:
+            return max(int(self.AQ_BATCH_SIZE), 1)
+        elif not self._overrides_map_batch():
+            return 1
+        elif n_items is not None:
+            return max(math.ceil(n_items / (BATCHES_PER_WORKER * n_workers)), 1)
+        else:
+            return DEFAULT_BATCH_SIZE
+
     def accumulator(self, requirements=None) -> _A:
         """Base accumulator with which the reduce operation is initialized.
         Override this method to provide a custom accumulator.
@@ -47,6 +97,40 @@ class AbstractMapReduceTask(AbstractTask, Generic[_T, _A, _U]):
         raise NotImplementedError()
 
 
+def iter_batches(items: Iterable[_T], batch_size: int) -> Iterator[list[_T]]:
+    """Group `items` in lists of `batch_size` items. The last list may be shorter."""
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, batch_size)):
+        yield batch
+
+
+def map_reduce_units(
+    task: AbstractMapReduceTask, items: Iterable, n_workers: int = 1
+) -> tuple[bool, Iterable]:
+    """Split the items of `task` in the units dispatched by the backends.
+
+    Returns:
+        A flag that is `True` if the units are batches, to be mapped with `map_batch`,
+        and `False` if they are single items, to be mapped with `map`. Then the units
+        themselves."""
+    n_items = len(items) if hasattr(items, "__len__") else None
+    batch_size = task._batch_size(n_items, n_workers)
+
+    # Tasks which override `map_batch` may not implement `map` consistently with it.
+    if batch_size == 1 and not task._overrides_map_batch():
+        return False, items
+    else:
+        return True, iter_batches(items, batch_size)
+
+
+def map_unit(task: AbstractMapReduceTask, batched: bool, unit: Any, requirements=None):
+    """Map a unit returned by :func:`map_reduce_units`."""
+    if batched:
+        return task.map_batch(unit, requirements)
+    else:
+        return task.map(unit, requirements)
+
+
 class MapReduceTask(AbstractMapReduceTask[_T, list[_T], list[_T]]):
     """A default ParallelTask implementation with trivial choices for `items`, `map`,
     `accumulator` and `reduce`."""
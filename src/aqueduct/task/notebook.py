@@ -1,6 +1,5 @@
 from typing import TypeAlias, Any, TypedDict, Optional, TYPE_CHECKING, Callable
 
-import asyncio
 import base64
 from aqueduct.artifact import Artifact
 import cloudpickle
@@ -143,25 +142,27 @@ class NotebookTask(Task):
         else:
             return super()._resolve_requirements(ignore_cache=ignore_cache)
 
-    def run(self, requirements=None):
+    async def run(self, requirements=None):
         notebook_path = self._resolve_notebook()
 
         with open(notebook_path) as f:
             notebook_source = nbformat.read(f, as_version=4)
 
         kernel_manager = jupyter_client.manager.AsyncKernelManager()
-        asyncio.run(kernel_manager.start_kernel())  # type: ignore
+        await kernel_manager.start_kernel()  # type: ignore
         notebook_client = nbclient.client.NotebookClient(
             notebook_source, km=kernel_manager
         )
-        kernel_client = asyncio.run(notebook_client.async_start_new_kernel_client())
+        kernel_client = await notebook_client.async_start_new_kernel_client()
 
         if self.REQUIREMENTS_INJECTION:
             injected_requirements = requirements
         else:
             injected_requirements = None
 
-        self._prepare_kernel_with_injected_code(kernel_client, injected_requirements)
+        await self._prepare_kernel_with_injected_code(
+            kernel_client, injected_requirements
+        )
 
         try:
             _logger.info("Executing notebook...")
@@ -170,7 +171,7 @@ class NotebookTask(Task):
                 total=len(notebook_source["cells"]),
                 unit="cell",
             ):
-                notebook_client.execute_cell(c, i)
+                await notebook_client.async_execute_cell(c, i)
         except nbclient.exceptions.CellExecutionError as e:
             raise e
         finally:
@@ -179,14 +180,13 @@ class NotebookTask(Task):
                 export_fn = resolve_notebook_export_spec(export_spec)
                 export_fn(notebook_source)
 
-        sinked_value = self._fetch_sinked_value(kernel_client)
+        sinked_value = await self._fetch_sinked_value(kernel_client)
 
-        future = kernel_manager.shutdown_kernel()
-        asyncio.run(future)  # type: ignore
+        await kernel_manager.shutdown_kernel()  # type: ignore
 
         return sinked_value
 
-    def _prepare_kernel_with_injected_code(self, kernel_client, requirements):
+    async def _prepare_kernel_with_injected_code(self, kernel_client, requirements):
         add_sys_string = str([str(x) for x in self.add_to_sys()])
 
         _logger.info("Serializing task...")
@@ -222,22 +222,15 @@ class NotebookTask(Task):
         )
 
         _logger.info("Injecting code...")
-        response = asyncio.run(
-            kernel_client.execute_interactive(
-                injected_code,
-            ),
-            debug=False,
+        response = await kernel_client.execute_interactive(
+            injected_code,
         )
         _logger.info("Done preparing kernel.")
 
-    def _fetch_sinked_value(self, kernel_client) -> Any:
-        response = asyncio.run(
-            kernel_client.execute_interactive(
-                code="import aqueduct.notebook",
-                user_expressions={
-                    "aq_return_value": "aqueduct.notebook.AQ_ENCODED_RETURN"
-                },
-            )
+    async def _fetch_sinked_value(self, kernel_client) -> Any:
+        response = await kernel_client.execute_interactive(
+            code="import aqueduct.notebook",
+            user_expressions={"aq_return_value": "aqueduct.notebook.AQ_ENCODED_RETURN"},
         )
 
         aq_return_value_dict = response["content"]["user_expressions"][
@@ -3,7 +3,7 @@ from typing import Iterable, Mapping, Type, TypeVar, Generic, Sequence
 import itertools
 
 from .abstract_task import AbstractTask
-from ..artifact import CompositeArtifact, resolve_artifact_from_spec
+from ..artifact import CompositeArtifact
 from .task import Task
 from .extract_artifact import ExtractArtifact, as_artifact
 from .inline import inline, InlineTaskWrapper
@@ -65,7 +65,7 @@ class RepeaterTask(Task, Generic[_Task]):
 
         all_artifacts = []
         for r in requirements:
-            artifact_spec = resolve_artifact_from_spec(r.artifact())
+            artifact_spec = r._resolve_artifact()
             if artifact_spec is not None:
                 all_artifacts.append(artifact_spec)
 
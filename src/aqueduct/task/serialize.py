@@ -0,0 +1,122 @@
+"""Compact serialization of tasks, to send them to other processes.
+
+A task is described by its class and the arguments its `__init__` was called with,
+which are captured by :class:`WrapInitMeta`. When the class can be imported by name,
+only the module, the qualified name of the class and the arguments are sent, and the
+task is rebuilt by calling its `__init__` again. The arguments are already resolved, so
+the configuration is not looked up again. Tasks are expected to be fully described by
+their arguments, as their unique key is. Other tasks are serialized with cloudpickle.
+"""
+
+from typing import Any, Optional, TYPE_CHECKING
+
+import functools
+import importlib
+import inspect
+import pickle
+
+import cloudpickle
+
+if TYPE_CHECKING:
+    from .abstract_task import AbstractTask
+
+MAX_CACHED_TASKS = 128
+"""Number of tasks a process keeps in the cache of :func:`load_task`."""
+
+_COMPACT = b"c"
+_CLOUDPICKLE = b"p"
+
+
+@functools.lru_cache(maxsize=None)
+def _import_task_class(module: str, qualname: str) -> Any:
+    """Find a class from its module and qualified name. Cached, so that every class is
+    looked up once per process."""
+    value: Any = importlib.import_module(module)
+    for name in qualname.split("."):
+        value = getattr(value, name)
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def _unwrapped_init(task_class: type) -> Any:
+    """The `__init__` of `task_class`, without the wrappers of :class:`WrapInitMeta`."""
+    return inspect.unwrap(task_class.__init__)
+
+
+def _compact_form(task: "AbstractTask") -> Optional[tuple]:
+    """The module, qualified name and arguments of `task`, or `None` if the task can
+    not be rebuilt from them."""
+    task_class = type(task)
+    module, qualname = task_class.__module__, task_class.__qualname__
+
+    if module == "__main__" or "<locals>" in qualname:
+        return None
+
+    args = task.__dict__.get("_args", None)
+    kwargs = task.__dict__.get("_kwargs", None)
+    if (
+        not isinstance(args, tuple)
+        or len(args) == 0
+        or args[0] is not task
+        or not isinstance(kwargs, dict)
+    ):
+        return None
+
+    try:
+        if _import_task_class(module, qualname) is not task_class:
+            return None
+    except (ImportError, AttributeError):
+        return None
+
+    return module, qualname, task.__dict__["_args_hash"], args[1:], kwargs
+
+
+def serialize_task(task: "AbstractTask") -> bytes:
+    """Serialize a task to send it to another process. See :func:`deserialize_task`.
+
+    Arguments:
+        task: The task to serialize.
+
+    Returns:
+        The task as bytes. Tasks which can be rebuilt from their class and arguments
+        take a few bytes more than their arguments."""
+    compact = _compact_form(task)
+
+    if compact is not None:
+        try:
+            return _COMPACT + pickle.dumps(compact, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # Some arguments need cloudpickle.
+            pass
+
+    return _CLOUDPICKLE + cloudpickle.dumps(task)
+
+
+def deserialize_task(serialized_task: bytes) -> "AbstractTask":
+    """Rebuild a task serialized by :func:`serialize_task`."""
+    tag, payload = serialized_task[:1], serialized_task[1:]
+
+    if tag == _COMPACT:
+        module, qualname, args_hash, args, kwargs = pickle.loads(payload)
+        task_class = _import_task_class(module, qualname)
+
+        # Do what the wrapper around __init__ does, without resolving the arguments.
+        task = task_class.__new__(task_class)
+        task._args_hash = args_hash
+        task._args = (task, *args)
+        task._kwargs = kwargs
+        _unwrapped_init(task_class)(task, *args, **kwargs)
+
+        return task
+    elif tag == _CLOUDPICKLE:
+        return cloudpickle.loads(payload)
+    else:
+        raise ValueError("Could not deserialize task, unknown format.")
+
+
+@functools.lru_cache(maxsize=MAX_CACHED_TASKS)
+def load_task(serialized_task: bytes) -> "AbstractTask":
+    """Like :func:`deserialize_task`, but the tasks are cached, so that workers which
+    receive the same task many times rebuild it once. The tasks must not be modified.
+    """
+    return deserialize_task(serialized_task)
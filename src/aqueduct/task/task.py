@@ -1,5 +1,7 @@
-from typing import Generic, Type, TypeVar, Optional
+from typing import Any, Awaitable, Callable, Generic, Type, TypeVar, Optional
 
+import asyncio
+import inspect
 import logging
 
 
@@ -16,11 +18,29 @@ _T = TypeVar("_T")
 _logger = logging.getLogger(__name__)
 
 
+def resolve_coroutine(value: Any) -> Any:
+    """The `run` method of a task can be defined with `async def`, in which case it
+    returns a coroutine. Run such a coroutine to completion on a new event loop, and
+    return its result. Other values are returned as is."""
+    if inspect.iscoroutine(value):
+        return asyncio.run(value)
+    else:
+        return value
+
+
+async def apply_to_awaitable(fn: Callable[[Any], _T], awaitable: Awaitable) -> _T:
+    return fn(await awaitable)
+
+
 class Task(MapReduceTask, Generic[_T]):
-    """Pose a regular task as a specialized version of a parallel task."""
+    """Pose a regular task as a specialized version of a parallel task.
+
+    The `run` method can be defined with `async def`. The :class:`AsyncioBackend` then
+    runs it on its event loop, concurrently with the other tasks. The other backends
+    run it on a new event loop."""
 
     def __call__(self, requirements=None) -> _T:
-        return self.run(requirements)
+        return resolve_coroutine(self.run(requirements))
 
     def items(self, requirements=None) -> list:
         """The list of input items to be processed in parallel."""
@@ -39,4 +59,8 @@ class Task(MapReduceTask, Generic[_T]):
         return None
 
     def post(self, acc: None, requirements=None) -> _T:
-        return self.run(requirements)
+        return resolve_coroutine(self.run(requirements))
+
+    def _is_async(self) -> bool:
+        """Indicates if `run` is a coroutine function."""
+        return inspect.iscoroutinefunction(self.run)
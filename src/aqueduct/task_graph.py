@@ -0,0 +1,306 @@
+"""Compact dependency graph of a task tree.
+
+A :class:`TaskGraph` is built once from a :class:`TaskTree`. Every unique task (as
+identified by its `_unique_key()`) becomes a node with an integer id. The
+`requirements()` and `_resolve_requirements()` of a task are only called once, when
+the graph is built. Consumers then walk the graph instead of the task tree."""
+
+from array import array
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Optional,
+    Sequence,
+    Type,
+    TYPE_CHECKING,
+)
+
+from .artifact.snapshot import current_snapshot, prefetch_artifacts
+from .task_tree import (
+    TaskTree,
+    TypeTree,
+    _map_type_in_tree,
+    gather_tasks_in_tree,
+    iter_type_in_tree,
+)
+
+if TYPE_CHECKING:
+    from .task import AbstractTask
+
+
+NodeTree = TypeTree[int]
+"""A task tree where the tasks were replaced by their node id."""
+
+
+def is_forced(
+    task: "AbstractTask", force_tasks: Optional[set[Type["AbstractTask"]]]
+) -> bool:
+    """Indicates if `task` is an instance of one of the classes in `force_tasks`."""
+    if force_tasks:
+        return any([issubclass(task.__class__, c) for c in force_tasks])
+    else:
+        return False
+
+
+def _prefetch_artifacts(tasks: list["AbstractTask"]):
+    """Check the artifacts of `tasks` at once. Nothing is resolved when no snapshot
+    is active. Otherwise, the snapshot keeps the resolved artifacts, so the cache
+    check of every task reuses them."""
+    if current_snapshot() is None:
+        return
+
+    prefetch_artifacts([t._resolve_artifact() for t in tasks])
+
+
+class TaskGraph:
+    """Dependency graph of a task tree, where each unique task is a node.
+
+    Nodes are numbered in topological order: the dependencies of a node always have a
+    smaller id than the node itself. Iterating over `range(len(graph))` therefore
+    visits every task after all its requirements.
+
+    Attributes:
+        tasks: The task of each node.
+        keys: The unique key of each node.
+        index: Maps a unique key to its node id.
+        requirements: The resolved requirements of each node, where tasks are replaced
+            by their node id. `None` if the requirements of the task were not
+            expanded, either because there are none or because the task is cached.
+        root: The task tree the graph was built from, where tasks are replaced by their
+            node id."""
+
+    def __init__(self):
+        self.tasks: list["AbstractTask"] = []
+        self.keys: list[str] = []
+        self.index: dict[str, int] = {}
+        self.requirements: list[NodeTree] = []
+        self.root: NodeTree = None
+
+        # Adjacency is stored in compressed sparse row format. The dependencies of
+        # node `i` are `_dependency_ids[_dependency_offsets[i]:_dependency_offsets[i+1]]`.
+        self._dependency_offsets = array("l", [0])
+        self._dependency_ids = array("l")
+        self._dependent_offsets = array("l", [0])
+        self._dependent_ids = array("l")
+
+    @classmethod
+    def build(
+        cls,
+        work: TaskTree,
+        ignore_cache: bool = False,
+        force_tasks: Optional[set[Type["AbstractTask"]]] = None,
+        expand: Optional[Callable[["AbstractTask"], bool]] = None,
+        on_node: Optional[Callable[["TaskGraph", int], None]] = None,
+    ) -> "TaskGraph":
+        """Build the dependency graph of a task tree.
+
+        Arguments:
+            work: The task tree to build the graph from.
+            ignore_cache: If `True`, expand the requirements of cached tasks as well.
+            force_tasks: Task classes whose requirements are expanded even if cached.
+            expand: If specified, the requirements of a task are only expanded if
+                `expand(task)` is `True`.
+            on_node: If specified, called with the graph and the id of every node as
+                soon as it is added, before the graph is complete. The tasks, keys,
+                requirements and dependencies of the nodes added so far are available.
+
+        Returns:
+            The graph of all the tasks reachable from `work`."""
+        graph = cls()
+        in_progress: set[str] = set()
+
+        root_tasks = gather_tasks_in_tree(work)
+        _prefetch_artifacts(root_tasks)
+
+        for root_task in root_tasks:
+            root_key = root_task._unique_key()
+            if root_key in graph.index:
+                continue
+
+            # Explicit depth-first stack, so that deep chains of tasks do not hit the
+            # recursion limit. Each frame holds a task, its key, its requirements and
+            # the requirement tasks that are left to visit.
+            in_progress.add(root_key)
+            stack = [
+                graph._open_frame(
+                    root_task, root_key, ignore_cache, force_tasks, expand
+                )
+            ]
+            while stack:
+                task, key, requirements, children = stack[-1]
+
+                pushed = False
+                while children:
+                    child = children.pop()
+                    child_key = child._unique_key()
+                    if child_key in graph.index:
+                        continue
+                    elif child_key in in_progress:
+                        raise RuntimeError(
+                            f"Task {child} depends on itself through its requirements."
+                        )
+
+                    in_progress.add(child_key)
+                    stack.append(
+                        graph._open_frame(
+                            child, child_key, ignore_cache, force_tasks, expand
+                        )
+                    )
+                    pushed = True
+                    break
+
+                if not pushed:
+                    stack.pop()
+                    in_progress.discard(key)
+                    node = graph._add_node(task, key, requirements)
+                    if on_node is not None:
+                        on_node(graph, node)
+
+        graph.root = _map_type_in_tree(work, _task_type(), graph._node_of_task)
+        graph._freeze()
+
+        return graph
+
+    def _open_frame(
+        self,
+        task: "AbstractTask",
+        key: str,
+        ignore_cache: bool,
+        force_tasks: Optional[set[Type["AbstractTask"]]],
+        expand: Optional[Callable[["AbstractTask"], bool]],
+    ) -> tuple["AbstractTask", str, TaskTree, list["AbstractTask"]]:
+        if expand is None or expand(task):
+            requirements = task._resolve_requirements(
+                ignore_cache=ignore_cache or is_forced(task, force_tasks)
+            )
+        else:
+            requirements = None
+
+        if requirements is None:
+            children = []
+        else:
+            # Reversed so that popping visits the requirements in declaration order.
+            children = gather_tasks_in_tree(requirements)[::-1]
+
+            # Check the artifacts of all the new requirements at once, before they are
+            # expanded one by one.
+            _prefetch_artifacts(
+                [c for c in children if c._unique_key() not in self.index]
+            )
+
+        return task, key, requirements, children
+
+    def _add_node(self, task: "AbstractTask", key: str, requirements: TaskTree) -> int:
+        node = len(self.tasks)
+        self.tasks.append(task)
+        self.keys.append(key)
+        self.index[key] = node
+
+        if requirements is None:
+            self.requirements.append(None)
+        else:
+            node_requirements = _map_type_in_tree(
+                requirements, _task_type(), self._node_of_task
+            )
+            self.requirements.append(node_requirements)
+
+            dependencies = dict.fromkeys(iter_nodes(node_requirements))
+            self._dependency_ids.extend(dependencies)
+
+        self._dependency_offsets.append(len(self._dependency_ids))
+        return node
+
+    def _node_of_task(self, task: "AbstractTask") -> int:
+        return self.index[task._unique_key()]
+
+    def _freeze(self):
+        """Compute the reverse edges once all the nodes were added."""
+        n_nodes = len(self.tasks)
+        counts = [0] * (n_nodes + 1)
+        for dependency in self._dependency_ids:
+            counts[dependency + 1] += 1
+
+        offsets = array("l", counts)
+        for i in range(1, n_nodes + 1):
+            offsets[i] += offsets[i - 1]
+
+        cursor = array("l", offsets[:-1])
+        dependent_ids = array("l", bytes(len(self._dependency_ids) * offsets.itemsize))
+        for node in range(n_nodes):
+            for dependency in self.dependencies(node):
+                dependent_ids[cursor[dependency]] = node
+                cursor[dependency] += 1
+
+        self._dependent_offsets = offsets
+        self._dependent_ids = dependent_ids
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def dependencies(self, node: int) -> Sequence[int]:
+        """The ids of the nodes `node` directly depends on."""
+        start, end = self._dependency_offsets[node], self._dependency_offsets[node + 1]
+        return self._dependency_ids[start:end]
+
+    def dependents(self, node: int) -> Sequence[int]:
+        """The ids of the nodes that directly depend on `node`."""
+        start, end = self._dependent_offsets[node], self._dependent_offsets[node + 1]
+        return self._dependent_ids[start:end]
+
+    def roots(self) -> list[int]:
+        """The ids of the nodes that appear in the task tree the graph was built
+        from."""
+        return list(dict.fromkeys(iter_nodes(self.root)))
+
+    def occurrences(self) -> list[int]:
+        """The number of times each node appears in the fully expanded task tree,
+        that is, if shared tasks were not deduplicated."""
+        counts = [0] * len(self)
+        for node in iter_nodes(self.root):
+            counts[node] += 1
+
+        for node in reversed(range(len(self))):
+            for dependency in iter_nodes(self.requirements[node]):
+                counts[dependency] += counts[node]
+
+        return counts
+
+    def depths(self) -> list[int]:
+        """The minimum number of requirement edges between each node and the root of
+        the graph."""
+        depths = [len(self)] * len(self)
+        for node in iter_nodes(self.root):
+            depths[node] = 0
+
+        # Dependents always have a larger id than their dependencies, so the depth of
+        # a node is final by the time we reach it.
+        for node in reversed(range(len(self))):
+            for dependency in self.dependencies(node):
+                depths[dependency] = min(depths[dependency], depths[node] + 1)
+
+        return depths
+
+    def map_requirements(self, node: int, fn: Callable[[int], Any]) -> Any:
+        """Rebuild the requirements of `node`, with every node id mapped through
+        `fn`."""
+        return _map_type_in_tree(self.requirements[node], int, fn)
+
+    def map_root(self, fn: Callable[[int], Any]) -> Any:
+        """Rebuild the task tree the graph was built from, with every node id mapped
+        through `fn`."""
+        return _map_type_in_tree(self.root, int, fn)
+
+
+def iter_nodes(tree: NodeTree) -> Iterable[int]:
+    """Iterate over the node ids found in `tree`, in order and with repetitions."""
+    return iter_type_in_tree(tree, int)
+
+
+def _task_type() -> Type["AbstractTask"]:
+    from .task import AbstractTask
+
+    return AbstractTask
@@ -5,6 +5,7 @@ from typing import (
     Any,
     Callable,
     Iterable,
+    Iterator,
     overload,
     Optional,
     Type,
@@ -16,6 +17,7 @@ from typing import (
 
 if TYPE_CHECKING:
     from .task import AbstractTask
+    from .task_graph import TaskGraph
 
 _K = TypeVar("_K")
 _A = TypeVar("_A")
@@ -28,26 +30,43 @@ TypeTree: TypeAlias = list | tuple | dict | _T | None
 TaskTree: TypeAlias = TypeTree["AbstractTask"]
 
 
+class UnhandledTreeNode(ValueError, TypeError):
+    """Raised when a tree contains something that is neither a container, `None`, nor
+    an instance of the type being looked for."""
+
+
+def iter_type_in_tree(tree: TypeTree[_T], type: Type[_T]) -> Iterator[_T]:
+    """Iterate over the instances of `type` found in `tree`, in depth-first order.
+
+    The tree is walked with an explicit stack, so arbitrarily nested trees do not hit
+    the recursion limit."""
+    stack: list[Iterator] = [iter((tree,))]
+    while stack:
+        for x in stack[-1]:
+            if isinstance(x, (list, tuple)):
+                stack.append(iter(x))
+                break
+            elif isinstance(x, dict):
+                stack.append(iter(x.values()))
+                break
+            elif isinstance(x, type):
+                yield x
+            elif x is not None:
+                raise UnhandledTreeNode(f"Could not handle tree node {x}.")
+        else:
+            stack.pop()
+
+
 def reduce_type_in_tree(
     tree: TypeTree[_T],
     type: Type[_T],
     reduce_fn: Callable[[_T, _A], _A],
     acc: _A,
 ) -> _A:
-    if isinstance(tree, (list, tuple)):
-        for x in tree:
-            acc = reduce_type_in_tree(x, type, reduce_fn, acc)
-        return acc
-    elif isinstance(tree, dict):
-        for v in tree.values():
-            acc = reduce_type_in_tree(v, type, reduce_fn, acc)
-        return acc
-    elif isinstance(tree, type):
-        return reduce_fn(tree, acc)
-    elif tree is None:
-        return acc
-    else:
-        raise ValueError(f"Could not handle tree node {tree}.")
+    for x in iter_type_in_tree(tree, type):
+        acc = reduce_fn(x, acc)
+
+    return acc
 
 
 def gather_tasks_in_tree(tree: TypeTree["AbstractTask"]) -> list["AbstractTask"]:
@@ -126,34 +145,83 @@ def _map_type_in_tree(
     before_map: Optional[Callable[[_T], None]] = None,
     after_map: Optional[Callable[[_U], None]] = None,
 ) -> Any:
-    if isinstance(tree, (list, tuple, dict)):
-        if on_expand is not None:
-            on_expand(tree)
-
-        kwargs = {
-            "on_expand": on_expand,
-            "before_map": before_map,
-            "after_map": after_map,
-        }
-
-        if isinstance(tree, list):
-            return [_map_type_in_tree(x, type, map_fn, **kwargs) for x in tree]
-        elif isinstance(tree, tuple):
-            return tuple([_map_type_in_tree(x, type, map_fn, **kwargs) for x in tree])
-        elif isinstance(tree, dict):
-            return {k: _map_type_in_tree(tree[k], type, map_fn, **kwargs) for k in tree}
-    elif tree is None:
-        return None
-    elif isinstance(tree, type):
-        if before_map:
-            before_map(tree)
-        mapped = map_fn(tree)
-        if after_map:
-            after_map(mapped)
-
-        return mapped
+    if before_map is None and after_map is None:
+        on_leaf = map_fn
+    else:
+
+        def on_leaf(x: _T) -> _U:
+            if before_map:
+                before_map(x)
+            mapped = map_fn(x)
+            if after_map:
+                after_map(mapped)
+
+            return mapped
+
+    return _fold_tree(tree, type, on_leaf, _rebuild_container, on_expand=on_expand)
+
+
+def _rebuild_container(container: list | tuple | dict, values: list) -> Any:
+    if isinstance(container, list):
+        return values
+    elif isinstance(container, tuple):
+        return tuple(values)
     else:
-        raise ValueError(f"Could not handle tree node {tree}.")
+        return dict(zip(container.keys(), values))
+
+
+def _fold_tree(
+    tree: Any,
+    type: Type[_T],
+    on_leaf: Callable[[_T], Any],
+    on_container: Callable[[list | tuple | dict, list], Any],
+    on_expand: Optional[OneExpandCallback] = None,
+) -> Any:
+    """Traversal engine shared by the functions that rebuild a tree.
+
+    The tree is walked depth-first with an explicit stack. Leaves of type `type` are
+    replaced by `on_leaf(leaf)`, and every container by
+    `on_container(container, values)` once its children were folded into `values`,
+    in order. `None` is kept as is. `on_expand` is called on every container before its
+    children are visited.
+
+    Arguments:
+        tree: The tree to fold.
+        type: The type of the leaves.
+        on_leaf: Maps a leaf.
+        on_container: Builds the output of a container from the outputs of its
+            children.
+        on_expand: If specified, called with every container when it is entered.
+
+    Returns:
+        The output of `on_leaf` or `on_container` for the root of the tree."""
+    # Every frame is a container, an iterator over its children and the outputs of the
+    # children that were already folded.
+    root: list = []
+    stack: list[tuple[Any, Iterator, list]] = [(None, iter((tree,)), root)]
+    while stack:
+        _, children, values = stack[-1]
+
+        for x in children:
+            if isinstance(x, (list, tuple, dict)):
+                if on_expand is not None:
+                    on_expand(x)
+
+                child_iter = iter(x.values() if isinstance(x, dict) else x)
+                stack.append((x, child_iter, []))
+                break
+            elif x is None:
+                values.append(None)
+            elif isinstance(x, type):
+                values.append(on_leaf(x))
+            else:
+                raise UnhandledTreeNode(f"Could not handle tree node {x}.")
+        else:
+            container, _, values = stack.pop()
+            if stack:
+                stack[-1][2].append(on_container(container, values))
+
+    return root[0]
 
 
 def _map_tasks_in_tree(
@@ -171,24 +239,83 @@ def _resolve_task_tree(
     fn: Callable,
     ignore_cache=False,
     force_tasks: Optional[set[Type["AbstractTask"]]] = None,
-    **kwargs,
 ) -> Any:
-    def mapper(task: "AbstractTask") -> Any:
-        if force_tasks:
-            is_forced = any([issubclass(task.__class__, c) for c in force_tasks])
-        else:
-            is_forced = False
+    """Map every task of `work` through `fn`, after its requirements were mapped.
+
+    Arguments:
+        work: The task tree to resolve.
+        fn: Called as `fn(task)` for tasks without requirements, and as
+            `fn(task, mapped_requirements)` otherwise.
+        ignore_cache: If `True`, expand the requirements of cached tasks as well.
+        force_tasks: Task classes whose requirements are expanded even if cached.
+
+    Returns:
+        The same data structure as `work`, with the tasks replaced by the output of
+        `fn`. Tasks sharing the same `_unique_key()` are resolved only once and the
+        result of `fn` is shared by all their consumers."""
+    from .task_graph import TaskGraph
+
+    graph = TaskGraph.build(work, ignore_cache=ignore_cache, force_tasks=force_tasks)
+    return _resolve_task_graph(graph, fn)
 
-        requirements = task._resolve_requirements(
-            ignore_cache=ignore_cache or is_forced
-        )
 
-        if requirements is None:
-            to_return = fn(task)
+class ResultStore:
+    """Holds the results of the nodes of a :class:`TaskGraph` while it is resolved.
+
+    Results are kept in memory. Subclasses can move them elsewhere, as long as
+    :meth:`get` returns them when they are needed."""
+
+    def __init__(self, graph: "TaskGraph"):
+        self.graph = graph
+        self._values: list[Any] = [None] * len(graph)
+
+    def put(self, node: int, value: Any):
+        """Store the result of `node`. Nodes are stored in topological order, or
+        close to it when tasks run concurrently."""
+        self._values[node] = value
+
+    def get(self, node: int) -> Any:
+        return self._values[node]
+
+    def release(self, node: int):
+        """Called once the result of `node` is not needed anymore."""
+        self._values[node] = None
+
+    def close(self):
+        pass
+
+
+def _resolve_task_graph(
+    graph: "TaskGraph", fn: Callable, results: Optional[ResultStore] = None
+) -> Any:
+    """Same as :func:`_resolve_task_tree`, for a graph that was already built.
+
+    The result of a task is released as soon as all the tasks that require it were
+    resolved, unless it is part of the returned tree. Intermediate results therefore
+    do not stay in memory for the whole run.
+
+    Arguments:
+        results: Where the results are held during the run. Defaults to an in-memory
+            :class:`ResultStore`."""
+    if results is None:
+        results = ResultStore(graph)
+
+    consumers = [len(graph.dependents(node)) for node in range(len(graph))]
+    for root in graph.roots():
+        # Results that are returned are never released.
+        consumers[root] += 1
+
+    for node, task in enumerate(graph.tasks):
+        if graph.requirements[node] is None:
+            results.put(node, fn(task))
         else:
-            mapped_requirements = _map_tasks_in_tree(requirements, mapper, **kwargs)
-            to_return = fn(task, mapped_requirements)
+            requirements = graph.map_requirements(node, results.get)
+            results.put(node, fn(task, requirements))
+            del requirements
 
-        return to_return
+            for dependency in graph.dependencies(node):
+                consumers[dependency] -= 1
+                if consumers[dependency] == 0:
+                    results.release(dependency)
 
-    return _map_tasks_in_tree(work, mapper, **kwargs)
+    return graph.map_root(results.get)
@@ -13,7 +13,8 @@ from typing import (
 
 from aqueduct.task.functor import Functor
 
-from .task_tree import TypeTree, _map_tasks_in_tree, _resolve_task_tree
+from .task_graph import TaskGraph
+from .task_tree import TypeTree, _map_type_in_tree
 
 if TYPE_CHECKING:
     from .task import AbstractTask
@@ -38,60 +39,42 @@ def map_type_in_tree(
     Returns:
         An equivalent data structure, where all the T have been mapped using
         `fn`."""
-    if isinstance(tree, list):
+    if isinstance(tree, (list, tuple, dict)):
         if on_expand is not None:
             on_expand(len(tree))
-        return map_type_in_list(tree, type, fn)
-    elif isinstance(tree, tuple):
-        if on_expand is not None:
-            on_expand(len(tree))
-        return map_type_in_tuple(tree, type, fn)
-    elif isinstance(tree, dict):
-        if on_expand is not None:
-            on_expand(len(tree))
-        return map_type_in_dict(tree, type, fn)
-    elif isinstance(tree, type):
-        to_return = fn(tree)
-        return to_return
-    else:
+    elif not isinstance(tree, type):
         raise TypeError("Unexpected type inside Tree")
 
+    return _map_type_in_tree(tree, type, fn)
+
 
 def map_type_in_tuple(input: tuple, type, fn) -> tuple:
-    return tuple([map_type_in_tree(x, type, fn) for x in input])
+    return map_type_in_tree(input, type, fn)
 
 
 def map_type_in_list(input: list, type, fn) -> list:
-    return [map_type_in_tree(x, type, fn) for x in input]
+    return map_type_in_tree(input, type, fn)
 
 
 def map_type_in_dict(input: dict[_T, Any], type, fn) -> dict[_T, Any]:
-    return {k: map_type_in_tree(input[k], type, fn) for k in input}
+    return map_type_in_tree(input, type, fn)
 
 
 def count_tasks_to_run(
     task: "AbstractTask", remove_duplicates=True, ignore_cache=False
 ):
-    tasks_by_type = {}
-
-    def handle_one_task(task: "AbstractTask", *args, **kwargs):
-        if ignore_cache or not task.is_cached():
-            task_type = task.ui_name()
-            list_of_type = tasks_by_type.get(task_type, [])
-            list_of_type.append(task)
-            tasks_by_type[task_type] = list_of_type
-
-        return task
-
-    _resolve_task_tree(task, handle_one_task, ignore_cache=ignore_cache)
+    graph = TaskGraph.build(task, ignore_cache=ignore_cache)
 
     if remove_duplicates:
-        counts = {
-            k: len(set([x._unique_key() for x in tasks_by_type[k]]))
-            for k in tasks_by_type
-        }
+        occurrences = [1] * len(graph)
     else:
-        counts = {k: len(tasks_by_type[k]) for k in tasks_by_type}
+        occurrences = graph.occurrences()
+
+    counts = {}
+    for node, task in enumerate(graph.tasks):
+        if ignore_cache or not task.is_cached():
+            task_type = task.ui_name()
+            counts[task_type] = counts.get(task_type, 0) + occurrences[node]
 
     return counts
 
@@ -1,11 +1,20 @@
+import asyncio
 import numpy as np
+import os
+import threading
+import time
 import unittest
+import weakref
 
-from aqueduct import Task, MapReduceTask
+from aqueduct import Task, MapReduceTask, apply
 from aqueduct.artifact import InMemoryArtifact
+from aqueduct.backend.asyncio import AsyncioBackend
+from aqueduct.backend.concurrent import ConcurrentBackend
 from aqueduct.backend.dask import DaskBackend
 from aqueduct.backend.immediate import ImmediateBackend
 from aqueduct.backend.multiprocessing import MultiprocessingBackend
+from aqueduct.backend.thread import ThreadBackend
+from dask.distributed import LocalCluster
 
 
 ARTIFACT_STORE = {}
@@ -64,6 +73,271 @@ class TaskWithArtifact(Task):
         return InMemoryArtifact('backend_artifact', ARTIFACT_STORE)
 
 
+RUN_COUNTS = {}
+
+
+class CountedTask(Task):
+    def __init__(self, value):
+        self.value = value
+
+    def run(self, requirements=None):
+        RUN_COUNTS[self.value] = RUN_COUNTS.get(self.value, 0) + 1
+        return self.value
+
+
+class DiamondBranch(Task):
+    def __init__(self, offset):
+        self.offset = offset
+
+    def requirements(self):
+        return CountedTask(10)
+
+    def run(self, requirements):
+        return requirements + self.offset
+
+
+class DiamondTask(Task):
+    def requirements(self):
+        return [DiamondBranch(1), DiamondBranch(2), {"shared": CountedTask(10)}]
+
+    def run(self, requirements):
+        lhs, rhs, other = requirements
+        return lhs + rhs + other["shared"]
+
+
+EXPANSIONS = []
+
+
+class ExpandedTask(DiamondTask):
+    def requirements(self):
+        EXPANSIONS.append(self)
+        return super().requirements()
+
+
+STAMPS = []
+
+
+class StampTask(Task):
+    def run(self, requirements=None):
+        STAMPS.append(len(STAMPS))
+        return len(STAMPS)
+
+
+class StampedTask(Task):
+    def requirements(self):
+        return StampTask()
+
+    def run(self, requirements):
+        return requirements
+
+
+LEAVES_STARTED = {1: threading.Event(), 2: threading.Event()}
+LEAVES_STARTED_BEFORE_BRANCH = []
+
+
+class StartingLeaf(Task):
+    def __init__(self, index):
+        self.index = index
+
+    def run(self, requirements=None):
+        LEAVES_STARTED[self.index].set()
+        return 1
+
+
+class LateBranch(Task):
+    def requirements(self):
+        # Expanded after the leaves were found. They must run on the cluster while
+        # this slow expansion is still going on.
+        LEAVES_STARTED_BEFORE_BRANCH.extend(
+            [e.wait(timeout=10) for e in LEAVES_STARTED.values()]
+        )
+        return None
+
+    def run(self, requirements=None):
+        return 0
+
+
+class StreamedTask(Task):
+    def requirements(self):
+        return [StartingLeaf(1), StartingLeaf(2), LateBranch()]
+
+    def run(self, requirements):
+        return sum(requirements)
+
+
+class HeavyTask(TaskA):
+    AQ_RESOURCES = {"memory": "1GB"}
+    AQ_PRIORITY = 3
+
+
+class Intermediate:
+    def __init__(self, value):
+        self.value = value
+
+
+INTERMEDIATES = []
+
+
+class IntermediateTask(Task):
+    def run(self, requirements=None):
+        intermediate = Intermediate(3)
+        INTERMEDIATES.append(weakref.ref(intermediate))
+        return intermediate
+
+
+class ConsumerTask(Task):
+    def requirements(self):
+        return IntermediateTask()
+
+    def run(self, requirements):
+        return requirements.value + 1
+
+
+class LastTask(Task):
+    def requirements(self):
+        return ConsumerTask()
+
+    def run(self, requirements):
+        # The result of IntermediateTask was consumed and is not needed anymore.
+        return [ref() is None for ref in INTERMEDIATES]
+
+
+STREAM_STATE = {"yielded": 0, "reduced": 0, "max_ahead": 0}
+
+
+class StreamingTask(MapReduceTask):
+    def items(self):
+        for i in range(50):
+            STREAM_STATE["yielded"] += 1
+            ahead = STREAM_STATE["yielded"] - STREAM_STATE["reduced"]
+            STREAM_STATE["max_ahead"] = max(STREAM_STATE["max_ahead"], ahead)
+            yield i
+
+    def map(self, x, requirements=None):
+        return x
+
+    def accumulator(self, requirements=None):
+        return 0
+
+    def reduce(self, lhs, rhs, requirements=None):
+        STREAM_STATE["reduced"] += 1
+        return lhs + rhs
+
+
+UNPICKLE_COUNT = 0
+
+
+def restore_lookup_table(values):
+    global UNPICKLE_COUNT
+    UNPICKLE_COUNT += 1
+    return LookupTable(values)
+
+
+class LookupTable:
+    def __init__(self, values):
+        self.values = values
+
+    def __reduce__(self):
+        return restore_lookup_table, (self.values,)
+
+
+class LookupTableTask(Task):
+    def run(self, requirements=None):
+        return LookupTable(list(range(100)))
+
+
+class LookupTask(MapReduceTask):
+    def requirements(self):
+        return LookupTableTask()
+
+    def items(self):
+        return range(20)
+
+    def map(self, x, requirements=None):
+        return {os.getpid(): UNPICKLE_COUNT}
+
+    def accumulator(self, requirements=None):
+        return {}
+
+    def reduce(self, lhs, rhs, requirements=None):
+        for pid, count in lhs.items():
+            rhs[pid] = max(count, rhs.get(pid, 0))
+        return rhs
+
+
+class SquaresTask(MapReduceTask):
+    def items(self):
+        return range(100)
+
+    def map_batch(self, items, requirements=None):
+        return [float((np.array(items) ** 2).sum())]
+
+    def accumulator(self, requirements=None):
+        return [0.0]
+
+    def reduce(self, lhs, rhs, requirements=None):
+        return [lhs[0] + rhs[0]]
+
+
+class FewSquaresTask(SquaresTask):
+    def __init__(self, n_items):
+        self.n_items = n_items
+
+    def items(self):
+        return range(self.n_items)
+
+
+class SingleSquaresTask(SquaresTask):
+    AQ_BATCH_SIZE = 1
+
+
+class BatchLengthsTask(MapReduceTask):
+    AQ_BATCH_SIZE = 3
+
+    def items(self):
+        return range(10)
+
+    def map_batch(self, items, requirements=None):
+        return [len(items)]
+
+
+class PidTask(Task):
+    def __init__(self, index):
+        self.index = index
+
+    def run(self, requirements=None):
+        time.sleep(0.2)
+        return os.getpid()
+
+
+class PidItemsTask(MapReduceTask):
+    def items(self):
+        return range(8)
+
+    def map(self, x, requirements=None):
+        time.sleep(0.1)
+        return {os.getpid()}
+
+    def accumulator(self, requirements=None):
+        return set()
+
+    def reduce(self, lhs, rhs, requirements=None):
+        return lhs | rhs
+
+
+class AsyncTask(Task):
+    def __init__(self, index=0, delay=0.0):
+        self.index = index
+        self.delay = delay
+
+    def requirements(self):
+        return TaskA(4)
+
+    async def run(self, requirements):
+        await asyncio.sleep(self.delay)
+        return requirements + self.index
+
+
 class TestImmediateBackend(unittest.TestCase):
     BACKEND_CLASS = ImmediateBackend
 
@@ -71,6 +345,7 @@ class TestImmediateBackend(unittest.TestCase):
         self.backend = self.BACKEND_CLASS()
         global ARTIFACT_STORE
         ARTIFACT_STORE = {}
+        RUN_COUNTS.clear()
 
     def tearDown(self):
         self.backend.close()
@@ -120,10 +395,78 @@ class TestImmediateBackend(unittest.TestCase):
         result = self.backend.run(task)
         self.assertEqual(result, "14") 
 
+    def test_shared_dependency_runs_once(self):
+        task = DiamondTask()
+        result = self.backend.run(task)
+        self.assertEqual(result, 33)
+        self.assertEqual(RUN_COUNTS, {10: 1})
+
+    def test_map_batch(self):
+        result = self.backend.run(SquaresTask())
+        self.assertEqual([float(sum([x**2 for x in range(100)]))], result)
+
+    def test_map_batch_few_items(self):
+        # Batches of a single item are still mapped with `map_batch`.
+        for n_items in range(1, 5):
+            result = self.backend.run(FewSquaresTask(n_items))
+            self.assertEqual([float(sum([x**2 for x in range(n_items)]))], result)
+
+    def test_map_batch_size_one(self):
+        result = self.backend.run(SingleSquaresTask())
+        self.assertEqual([float(sum([x**2 for x in range(100)]))], result)
+
+    def test_batch_size(self):
+        result = self.backend.run(BatchLengthsTask())
+        self.assertEqual([1, 3, 3, 3], sorted(result))
+
+    def test_intermediate_results_are_released(self):
+        INTERMEDIATES.clear()
+        result = self.backend.run(LastTask())
+        self.assertEqual([True], result)
+
+    def test_async_task(self):
+        result = self.backend.run(AsyncTask(1))
+        self.assertEqual(5, result)
+
+    def test_requested_results_are_kept(self):
+        result = self.backend.run([IntermediateTask(), ConsumerTask()])
+        self.assertEqual(3, result[0].value)
+        self.assertEqual(4, result[1])
+
 
 class TestMultiprocessingBackend(TestImmediateBackend):
     BACKEND_CLASS = MultiprocessingBackend
 
+    def test_shared_dependency_runs_once(self):
+        # Tasks run in worker processes, so the run counts cannot be observed here.
+        result = self.backend.run(DiamondTask())
+        self.assertEqual(result, 33)
+
+    def test_intermediate_results_are_released(self):
+        # Results are created in worker processes, they cannot be tracked here.
+        pass
+
+    def test_independent_tasks_run_in_workers(self):
+        backend = MultiprocessingBackend(n_workers=2)
+        try:
+            pids = backend.run([PidTask(i) for i in range(4)])
+        finally:
+            backend.close()
+
+        self.assertEqual(2, len(set(pids)))
+        self.assertNotIn(os.getpid(), pids)
+
+    def test_apply_lambda(self):
+        # Tasks which plain pickle rejects are sent to the workers with cloudpickle.
+        result = self.backend.run(apply(lambda x: x + 1, TaskA(3)))
+        self.assertEqual(4, result)
+
+    def test_local_map_reduce_task(self):
+        class LocalTask(TaskB):
+            pass
+
+        self.assertEqual(14, self.backend.run(LocalTask()))
+
     def test_multiple_cores(self):
         backend = MultiprocessingBackend(n_workers=2)
         try:
@@ -133,6 +476,120 @@ class TestMultiprocessingBackend(TestImmediateBackend):
         finally:
             backend.close()
 
+    def test_bounded_items_in_flight(self):
+        STREAM_STATE.update({"yielded": 0, "reduced": 0, "max_ahead": 0})
+
+        backend = MultiprocessingBackend(n_workers=2, max_in_flight=3)
+        try:
+            result = backend.run(StreamingTask())
+        finally:
+            backend.close()
+
+        self.assertEqual(sum(range(50)), result)
+        self.assertLessEqual(STREAM_STATE["max_ahead"], 3)
+
+    def test_requirements_sent_once_per_worker(self):
+        backend = MultiprocessingBackend(n_workers=2)
+        try:
+            unpickle_counts = backend.run(LookupTask())
+        finally:
+            backend.close()
+
+        self.assertEqual([1], list(set(unpickle_counts.values())))
+
+
+class TestConcurrentBackend(TestImmediateBackend):
+    BACKEND_CLASS = ConcurrentBackend
+
+    def test_shared_dependency_runs_once(self):
+        # Tasks run in worker processes, so the run counts cannot be observed here.
+        result = self.backend.run(DiamondTask())
+        self.assertEqual(result, 33)
+
+    def test_intermediate_results_are_released(self):
+        # Results are created in worker processes, they cannot be tracked here.
+        pass
+
+    def test_items_are_mapped_in_workers(self):
+        backend = ConcurrentBackend(n_workers=2)
+        pids = backend.run(PidItemsTask())
+
+        self.assertEqual(2, len(pids))
+        self.assertNotIn(os.getpid(), pids)
+
+    def test_bounded_items_in_flight(self):
+        STREAM_STATE.update({"yielded": 0, "reduced": 0, "max_ahead": 0})
+
+        result = ConcurrentBackend(n_workers=2).run(StreamingTask())
+
+        self.assertEqual(sum(range(50)), result)
+        self.assertLessEqual(STREAM_STATE["max_ahead"], 4)
+
+
+class ThreadIdTask(Task):
+    def __init__(self, index):
+        self.index = index
+
+    def run(self, requirements=None):
+        time.sleep(0.2)
+        return threading.get_ident()
+
+
+class TestThreadBackend(TestImmediateBackend):
+    BACKEND_CLASS = ThreadBackend
+
+    def test_independent_tasks_run_concurrently(self):
+        backend = ThreadBackend(n_workers=4)
+        try:
+            start = time.perf_counter()
+            idents = backend.run([ThreadIdTask(i) for i in range(4)])
+            elapsed = time.perf_counter() - start
+        finally:
+            backend.close()
+
+        self.assertEqual(4, len(set(idents)))
+        self.assertNotIn(threading.get_ident(), idents)
+        self.assertLess(elapsed, 0.7)
+
+    def test_results_are_not_copied(self):
+        intermediate, consumer = self.backend.run([IntermediateTask(), ConsumerTask()])
+        self.assertIs(INTERMEDIATES[-1](), intermediate)
+        self.assertEqual(4, consumer)
+
+    def test_bounded_items_in_flight(self):
+        STREAM_STATE.update({"yielded": 0, "reduced": 0, "max_ahead": 0})
+
+        backend = ThreadBackend(n_workers=2, max_in_flight=3)
+        try:
+            result = backend.run(StreamingTask())
+        finally:
+            backend.close()
+
+        self.assertEqual(sum(range(50)), result)
+        self.assertLessEqual(STREAM_STATE["max_ahead"], 3)
+
+
+class TestAsyncioBackend(TestImmediateBackend):
+    BACKEND_CLASS = AsyncioBackend
+
+    def test_async_tasks_overlap(self):
+        backend = AsyncioBackend(n_workers=1)
+
+        start = time.perf_counter()
+        result = backend.run([AsyncTask(i, delay=0.5) for i in range(50)])
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual([4 + i for i in range(50)], result)
+        self.assertLess(elapsed, 2.0)
+
+    def test_max_concurrent_tasks(self):
+        backend = AsyncioBackend(max_concurrent_tasks=2)
+
+        start = time.perf_counter()
+        backend.run([AsyncTask(i, delay=0.2) for i in range(4)])
+        elapsed = time.perf_counter() - start
+
+        self.assertGreaterEqual(elapsed, 0.4)
 
 
 class TestDaskBackend(TestImmediateBackend):
@@ -144,4 +601,112 @@ class TestDaskBackend(TestImmediateBackend):
         pass
 
     def test_load_artifact(self):
-        pass
\ No newline at end of file
+        pass
+
+    def test_shared_dependency_runs_once(self):
+        # Tasks run in worker processes, so the run counts cannot be observed here.
+        result = self.backend.run(DiamondTask())
+        self.assertEqual(result, 33)
+
+    def test_intermediate_results_are_released(self):
+        # Dask releases intermediate results on its own.
+        pass
+
+
+class TestPersistentDaskBackend(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cluster = LocalCluster(n_workers=1, processes=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cluster.close()
+
+    def setUp(self):
+        self.backend = DaskBackend(self.cluster.get_client(), persist=True)
+        EXPANSIONS.clear()
+        STAMPS.clear()
+
+    def tearDown(self):
+        self.backend.evict()
+
+    def test_results_are_reused(self):
+        self.assertEqual(33, self.backend.run(ExpandedTask()))
+        self.assertIn(CountedTask(10)._unique_key(), self.backend.persisted_keys())
+        self.assertEqual(1, len(EXPANSIONS))
+
+        # The requirements of persisted tasks are not expanded again.
+        self.assertEqual(33, self.backend.run(ExpandedTask()))
+        self.assertEqual(1, len(EXPANSIONS))
+
+    def test_forced_tasks_are_not_reused(self):
+        self.backend.run(ExpandedTask())
+        self.backend.run(ExpandedTask(), force_tasks={ExpandedTask})
+        self.assertEqual(2, len(EXPANSIONS))
+
+    def test_forced_tasks_are_computed_again(self):
+        self.assertEqual(1, self.backend.run(StampedTask()))
+
+        # The persisted result of the root is reused, its requirements are not run.
+        self.assertEqual(1, self.backend.run(StampedTask(), force_tasks={StampTask}))
+
+        forced = {StampedTask, StampTask}
+        self.assertEqual(2, self.backend.run(StampedTask(), force_tasks=forced))
+        self.assertEqual(3, self.backend.run(StampedTask(), force_tasks=forced))
+
+        # Another backend on the same cluster does not get the persisted results.
+        other = DaskBackend(self.backend.client)
+        self.assertEqual(4, other.run(StampTask()))
+
+    def test_evict(self):
+        self.backend.run(ExpandedTask())
+        self.backend.evict(ExpandedTask())
+        self.assertNotIn(ExpandedTask()._unique_key(), self.backend.persisted_keys())
+        self.assertIn(CountedTask(10)._unique_key(), self.backend.persisted_keys())
+
+        self.assertEqual(33, self.backend.run(ExpandedTask()))
+        self.assertEqual(2, len(EXPANSIONS))
+
+        self.backend.evict()
+        self.assertEqual([], self.backend.persisted_keys())
+
+    def test_max_persisted_bytes(self):
+        self.backend.max_persisted_bytes = 0
+        self.assertEqual(33, self.backend.run(ExpandedTask()))
+        self.assertEqual([], self.backend.persisted_keys())
+
+
+class TestIncrementalDaskBackend(unittest.TestCase):
+    def setUp(self):
+        self.cluster = LocalCluster(
+            n_workers=1, processes=False, resources={"memory": 2e9}
+        )
+        # Results are persisted, so that their tasks can be inspected on the scheduler.
+        self.backend = DaskBackend(self.cluster.get_client(), persist=True)
+        for event in LEAVES_STARTED.values():
+            event.clear()
+        LEAVES_STARTED_BEFORE_BRANCH.clear()
+
+    def tearDown(self):
+        self.backend.close()
+        self.cluster.close()
+
+    def test_leaves_run_while_graph_is_built(self):
+        self.assertEqual(2, self.backend.run(StreamedTask()))
+        self.assertEqual([True, True], LEAVES_STARTED_BEFORE_BRANCH)
+
+    def test_annotations_are_submitted(self):
+        self.assertEqual(4, self.backend.run(HeavyTask(4)))
+
+        # Persisted tasks have a token appended to their unique key.
+        prefix = HeavyTask(4)._unique_key()
+
+        def restrictions(dask_scheduler):
+            [task] = [
+                t for k, t in dask_scheduler.tasks.items() if k.startswith(prefix)
+            ]
+            return task.resource_restrictions, task.priority[0]
+
+        self.assertEqual(
+            ({"memory": 1e9}, -3), self.backend.client.run_on_scheduler(restrictions)
+        )
@@ -0,0 +1,66 @@
+import contextlib
+import unittest
+import unittest.mock
+
+import aqueduct.backend.broadcast
+from aqueduct.backend.broadcast import (
+    AQ_WORKER_BROADCASTS,
+    Broadcast,
+    receive_broadcast,
+)
+
+
+class TestBroadcast(unittest.TestCase):
+    def setUp(self):
+        AQ_WORKER_BROADCASTS.clear()
+
+    def test_receive_is_cached(self):
+        with Broadcast({"table": list(range(100))}, key="task") as broadcast:
+            first = receive_broadcast(broadcast.handle)
+            second = receive_broadcast(broadcast.handle)
+
+        self.assertEqual(list(range(100)), first["table"])
+        self.assertIs(first, second)
+
+    def test_new_broadcast_replaces_key(self):
+        with Broadcast(1, key="task") as broadcast:
+            self.assertEqual(1, receive_broadcast(broadcast.handle))
+
+        with Broadcast(2, key="task") as broadcast:
+            self.assertEqual(2, receive_broadcast(broadcast.handle))
+
+        self.assertEqual(1, len(AQ_WORKER_BROADCASTS))
+
+    def test_closed_broadcasts_are_dropped(self):
+        with Broadcast(0, key=0) as broadcast:
+            receive_broadcast(broadcast.handle)
+
+        with Broadcast(1, key=1) as broadcast:
+            self.assertIn(0, AQ_WORKER_BROADCASTS)
+            receive_broadcast(broadcast.handle)
+
+        self.assertEqual([1], list(AQ_WORKER_BROADCASTS))
+
+    def test_cache_is_bounded_by_bytes(self):
+        values = [bytes(1000 * (i + 1)) for i in range(3)]
+
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(
+                unittest.mock.patch.object(
+                    aqueduct.backend.broadcast, "MAX_CACHED_BROADCAST_BYTES", 3500
+                )
+            )
+
+            # The broadcasts are all open, only their size limits the cache.
+            broadcasts = [
+                stack.enter_context(Broadcast(v, key=i)) for i, v in enumerate(values)
+            ]
+            for broadcast in broadcasts:
+                receive_broadcast(broadcast.handle)
+
+            self.assertEqual([2], list(AQ_WORKER_BROADCASTS))
+
+            # The object received last is kept whatever its size.
+            with Broadcast(bytes(10000), key=3) as broadcast:
+                receive_broadcast(broadcast.handle)
+            self.assertEqual([3], list(AQ_WORKER_BROADCASTS))
@@ -1,7 +1,21 @@
 import unittest
 
-from aqueduct import Task
-from aqueduct.backend.dask import add_work_to_dask_graph
+import aqueduct.backend.backend
+import aqueduct.backend.dask
+from aqueduct import Task, MapReduceTask
+from aqueduct.backend.dask import (
+    add_work_to_dask_graph,
+    build_dask_context,
+    client_factory_from_dict_spec,
+    parse_resources,
+    partition_units,
+    task_graph_to_high_level_graph,
+    worker_backend,
+    wrap_in_context,
+)
+from aqueduct.artifact import InMemoryArtifact
+from aqueduct.config import get_config, set_config
+from aqueduct.task_graph import TaskGraph
 
 class TaskB(Task):
     def __init__(self, value):
@@ -18,13 +32,40 @@ class TaskA(Task):
     def run(self, reqs):
         return sum(reqs) + 2
 
+
+class StoredTask(TaskB):
+    def artifact(self):
+        return InMemoryArtifact("stored", {})
+
+
+class HeavyTask(TaskB):
+    AQ_RESOURCES = {"memory": "8GB", "GPU": 1}
+    AQ_PRIORITY = 5
+
+
+class ItemsTask(MapReduceTask):
+    def __init__(self, n_items=10):
+        self.n_items = n_items
+
+    def items(self):
+        return range(self.n_items)
+
+    def map(self, x, requirements=None):
+        return x
+
+
 class TestDaskUtils(unittest.TestCase):
+    def tearDown(self):
+        aqueduct.backend.dask.AQ_WORKER_CONTEXT = None
+        aqueduct.backend.backend.AQ_CURRENT_BACKEND = None
+        set_config({})
+
     def test_add_task(self):
         work = TaskB(2)
         computation, graph = add_work_to_dask_graph(work, {}, {})
 
         self.assertEqual(work._unique_key(), computation)
-        self.assertEqual(len(graph), 1)
+        self.assertEqual(len(graph), 2)
         self.assertIn(work._unique_key(), graph)
 
     def test_add_list(self):
@@ -34,7 +75,7 @@ class TestDaskUtils(unittest.TestCase):
         computation, graph = add_work_to_dask_graph(work, {}, {})
 
         self.assertListEqual([task1._unique_key(), task2._unique_key()], computation)
-        self.assertEqual(len(graph), 2)
+        self.assertEqual(len(graph), 3)
         self.assertIn(task1._unique_key(), graph)
         self.assertIn(task2._unique_key(), graph)
 
@@ -43,4 +84,106 @@ class TestDaskUtils(unittest.TestCase):
         computation, graph = add_work_to_dask_graph(work, {}, {})
 
         self.assertEqual(work._unique_key(), computation)
-        self.assertEqual(len(graph), 3)
+        self.assertEqual(len(graph), 4)
+
+    def test_context_is_interned(self):
+        context = build_dask_context(get_config(), {})
+        computation, graph = add_work_to_dask_graph(ItemsTask(), {}, {})
+
+        self.assertIn(context.key, graph)
+        contexts = [
+            v for v in graph.values() if isinstance(v, tuple) and v[0] is type(context)
+        ]
+        self.assertEqual(1, len(contexts))
+
+        # Tasks refer to the context by key.
+        for key, value in graph.items():
+            if key != context.key:
+                self.assertIs(wrap_in_context, value[0])
+                self.assertEqual(context.key, value[1])
+
+    def test_context_installed_once(self):
+        set_config({"a": 1})
+        context = build_dask_context(get_config(), {})
+        aqueduct.backend.dask.AQ_WORKER_CONTEXT = context
+
+        # The worker already runs with this context, the backend is not resolved again.
+        self.assertIs(context.cfg, wrap_in_context(context, get_config))
+
+        # The configuration changed since, so the context is installed again.
+        set_config({"a": 2})
+        with self.assertRaises(ValueError):
+            wrap_in_context(context, get_config)
+
+    def test_worker_backend_is_cached(self):
+        # Nothing listens on this port, the backend must not connect.
+        spec = {"type": "dask", "address": "tcp://127.0.0.1:1"}
+        context = build_dask_context(get_config(), spec)
+
+        wrap_in_context(context, get_config)
+        backend = aqueduct.backend.backend.AQ_CURRENT_BACKEND
+
+        set_config({"a": 1})
+        wrap_in_context(build_dask_context(get_config(), spec), get_config)
+
+        self.assertIs(backend, aqueduct.backend.backend.AQ_CURRENT_BACKEND)
+        self.assertIs(backend, worker_backend(dict(spec)))
+
+    def test_partition_units(self):
+        self.assertEqual(
+            [[0, 1, 2], [3, 4, 5], [6]], partition_units(list(range(7)), 3)
+        )
+        self.assertEqual([[0], [1]], partition_units([0, 1], 8))
+        self.assertEqual([], partition_units([], 8))
+
+    def test_graph_size_follows_partitions(self):
+        work = ItemsTask(100000)
+        computation, graph = add_work_to_dask_graph(work, {}, {}, n_partitions=5)
+
+        # Context, 5 partitions, 4 pairwise reduces and the post step.
+        self.assertEqual(11, len(graph))
+
+    def test_partitions_follow_workers(self):
+        work = ItemsTask(100000)
+        computation, graph = add_work_to_dask_graph(work, {}, {}, n_workers=2)
+
+        # Context, 4 partitions per worker, 7 pairwise reduces and the post step.
+        self.assertEqual(17, len(graph))
+
+    def test_save_runs_with_task(self):
+        computation, graph = add_work_to_dask_graph(StoredTask(2), {}, {})
+
+        # The context, and the task wrapped in the step which saves its result.
+        self.assertEqual(2, len(graph))
+        self.assertIn(computation, graph)
+
+    def test_high_level_graph(self):
+        context = build_dask_context(get_config(), {})
+        task_graph = TaskGraph.build(TaskA())
+        computation, graph = task_graph_to_high_level_graph(task_graph, {})
+
+        # One layer for the context, and one for each task.
+        self.assertEqual(4, len(graph.layers))
+        self.assertEqual(
+            {context.key, TaskB(2)._unique_key(), TaskB(3)._unique_key()},
+            graph.dependencies[computation],
+        )
+
+    def test_annotations(self):
+        task_graph = TaskGraph.build([HeavyTask(2), TaskB(2)])
+        computation, graph = task_graph_to_high_level_graph(task_graph, {})
+
+        self.assertEqual(
+            {"resources": {"memory": 8e9, "GPU": 1}, "priority": 5},
+            graph.layers[HeavyTask(2)._unique_key()].annotations,
+        )
+        self.assertIsNone(graph.layers[TaskB(2)._unique_key()].annotations)
+
+    def test_resources_in_spec(self):
+        self.assertEqual(
+            {"memory": 1e9, "GPU": 2}, parse_resources({"memory": "1GB", "GPU": 2})
+        )
+
+        # The specification is checked without starting the cluster.
+        spec = {"type": "dask", "n_workers": 1, "resources": {"memory": "1GB"}}
+        self.assertTrue(callable(client_factory_from_dict_spec(spec)))
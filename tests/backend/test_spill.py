@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from aqueduct import Task
+from aqueduct.backend.immediate import ImmediateBackend
+from aqueduct.backend.spill import SpillingResultStore, memory_budget
+from aqueduct.config import set_config
+from aqueduct.task_graph import TaskGraph
+
+
+class ArrayTask(Task):
+    def __init__(self, value):
+        self.value = value
+
+    def run(self, requirements=None):
+        return np.full(1000, self.value, dtype=float)
+
+
+class SumTask(Task):
+    def __init__(self, values):
+        self.values = values
+
+    def requirements(self):
+        return [ArrayTask(v) for v in self.values]
+
+    def run(self, requirements):
+        return sum([r.sum() for r in requirements])
+
+
+class TestSpillingResultStore(unittest.TestCase):
+    def setUp(self):
+        self.scratch = tempfile.TemporaryDirectory()
+        set_config({"aqueduct": {"scratch_store": self.scratch.name}})
+
+    def tearDown(self):
+        set_config({})
+        self.scratch.cleanup()
+
+    def test_memory_budget(self):
+        self.assertIsNone(memory_budget())
+
+        set_config({"aqueduct": {"memory_budget": "1kB"}})
+        self.assertEqual(1000, memory_budget())
+
+    def test_spill_needed_last(self):
+        graph = TaskGraph.build([ArrayTask(3), SumTask([1, 2])])
+        store = SpillingResultStore(graph, memory_budget=10000)
+
+        returned = graph.index[ArrayTask(3)._unique_key()]
+        first = graph.index[ArrayTask(1)._unique_key()]
+
+        store.put(returned, np.full(1000, 3.0))
+        store.put(first, np.ones(1000))
+
+        # The result of ArrayTask(3) is only needed at the end of the run.
+        self.assertTrue(store.is_spilled(returned))
+        self.assertFalse(store.is_spilled(first))
+        np.testing.assert_array_equal(np.full(1000, 3.0), store.get(returned))
+
+        store.release(returned)
+        store.close()
+        self.assertFalse(store.directory.exists())
+
+    def test_run_with_budget(self):
+        set_config(
+            {
+                "aqueduct": {
+                    "scratch_store": self.scratch.name,
+                    "memory_budget": 10000,
+                }
+            }
+        )
+
+        result = ImmediateBackend().run(SumTask([1, 2, 3, 4]))
+
+        self.assertEqual(10000.0, result)
+        self.assertEqual([], os.listdir(self.scratch.name))
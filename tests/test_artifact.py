@@ -1,6 +1,7 @@
 from typing import Optional, cast
 
 import pathlib
+import tempfile
 import unittest
 
 from aqueduct.artifact import (
@@ -14,6 +15,7 @@ import aqueduct as aq
 from aqueduct.task_tree import TaskTree
 
 from aqueduct.artifact import InMemoryArtifact, CompositeArtifact
+from aqueduct.artifact.snapshot import ArtifactSnapshot, artifact_exists, use_snapshot
 
 
 class TestResolveArtifact(unittest.TestCase):
@@ -97,3 +99,66 @@ class TestHeadArtifact(unittest.TestCase):
         self.assertEqual(2, len(head))
         for a in head:
             self.assertIsInstance(a, InMemoryArtifact)
+
+
+class TestArtifactSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_stat_few_artifacts(self):
+        (self.root / "a.txt").write_text("hello")
+        present = LocalFilesystemArtifact(self.root / "a.txt")
+        missing = LocalFilesystemArtifact(self.root / "b.txt")
+
+        snapshot = ArtifactSnapshot()
+        snapshot.prefetch([present, missing])
+
+        self.assertTrue(snapshot.exists(present))
+        self.assertFalse(snapshot.exists(missing))
+        self.assertEqual(5, snapshot.size(present))
+        snapshot.close()
+
+    def test_scan_directory(self):
+        for i in range(0, 20, 2):
+            (self.root / f"{i}.txt").write_text("x")
+
+        artifacts = [LocalFilesystemArtifact(self.root / f"{i}.txt") for i in range(20)]
+        snapshot = ArtifactSnapshot(scan_threshold=4)
+        snapshot.prefetch(artifacts)
+
+        for i, a in enumerate(artifacts):
+            self.assertEqual(i % 2 == 0, snapshot.exists(a))
+        snapshot.close()
+
+    def test_negative_cache_and_invalidate(self):
+        artifact = LocalFilesystemArtifact(self.root / "missing" / "a.txt")
+        other = LocalFilesystemArtifact(self.root / "missing" / "b.txt")
+
+        snapshot = ArtifactSnapshot(scan_threshold=1)
+        snapshot.prefetch([artifact, other])
+        self.assertFalse(snapshot.exists(artifact))
+
+        artifact.dump_text("written")
+        self.assertFalse(snapshot.exists(artifact))
+
+        snapshot.invalidate(artifact)
+        self.assertTrue(snapshot.exists(artifact))
+        self.assertFalse(snapshot.exists(other))
+        snapshot.close()
+
+    def test_composite(self):
+        (self.root / "a.txt").write_text("hello")
+        composite = CompositeArtifact(
+            [
+                LocalFilesystemArtifact(self.root / "a.txt"),
+                LocalFilesystemArtifact(self.root / "b.txt"),
+            ]
+        )
+
+        with use_snapshot() as snapshot:
+            snapshot.prefetch([composite])
+            self.assertFalse(artifact_exists(composite))
@@ -1,10 +1,15 @@
+import os
+import tempfile
+import time
 import unittest
 
 from aqueduct.backend import (
     resolve_backend_from_spec,
     ImmediateBackend,
     ConcurrentBackend,
+    ThreadBackend,
 )
+from aqueduct.artifact import LocalStoreArtifact
 from aqueduct.config import set_config
 from aqueduct.task import Task
 
@@ -33,6 +38,12 @@ class TestBackendResolution(unittest.TestCase):
         backend = resolve_backend_from_spec({"type": "concurrent", "n_workers": 4})
         self.assertIsInstance(backend, ConcurrentBackend)
 
+    def test_thread_by_dict(self):
+        backend = resolve_backend_from_spec({"type": "thread", "n_workers": 4})
+        self.assertIsInstance(backend, ThreadBackend)
+        self.assertEqual({"type": "thread", "n_workers": 4}, backend._spec())
+        backend.close()
+
 
 class SimpleTask(Task):
     def run(self):
@@ -69,6 +80,48 @@ class TaskB(Task[int]):
         return TaskA()
 
 
+class SleepTask(Task):
+    def __init__(self, index):
+        self.index = index
+
+    def run(self):
+        time.sleep(0.5)
+        return os.getpid()
+
+
+class WideTask(Task):
+    def requirements(self):
+        return [SleepTask(i) for i in range(4)]
+
+    def run(self, requirements):
+        return requirements
+
+
+class StoredTask(Task):
+    def __init__(self, log):
+        self.log = log
+
+    def run(self):
+        with open(self.log, "a") as f:
+            f.write("run\n")
+
+        return 21
+
+    def artifact(self):
+        return LocalStoreArtifact("stored.pkl")
+
+
+class DependsOnStored(Task):
+    def __init__(self, log):
+        self.log = log
+
+    def requirements(self):
+        return StoredTask(self.log)
+
+    def run(self, requirements):
+        return requirements * 2
+
+
 class TestImmediateBackend(unittest.TestCase):
     def setUp(self):
         self.backend = ImmediateBackend()
@@ -94,3 +147,31 @@ class TestImmediateBackend(unittest.TestCase):
 class TestConcurrentBackend(TestImmediateBackend):
     def setUp(self):
         self.backend = ConcurrentBackend()
+
+    def test_independent_branches_run_concurrently(self):
+        backend = ConcurrentBackend(n_workers=4)
+
+        start = time.perf_counter()
+        pids = backend.run(WideTask())
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(4, len(set(pids)))
+        self.assertLess(elapsed, 1.9)
+
+    def test_artifacts_are_saved_and_loaded(self):
+        with tempfile.TemporaryDirectory() as store:
+            set_config({"aqueduct": {"local_store": store}})
+            log = os.path.join(store, "runs.log")
+
+            try:
+                backend = ConcurrentBackend(n_workers=2)
+                self.assertEqual(42, backend.run(DependsOnStored(log)))
+                self.assertTrue(os.path.exists(os.path.join(store, "stored.pkl")))
+
+                self.assertEqual(42, backend.run(DependsOnStored(log)))
+                self.assertEqual(21, backend.run(StoredTask(log)))
+            finally:
+                set_config({})
+
+            with open(log) as f:
+                self.assertEqual(1, len(f.readlines()))
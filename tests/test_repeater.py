@@ -1,6 +1,8 @@
 import unittest
 
 from aqueduct.artifact import InMemoryArtifact, CompositeArtifact
+from aqueduct.artifact.snapshot import forget_task_artifact, use_snapshot
+from aqueduct.backend import ImmediateBackend
 from aqueduct.task import Task
 from aqueduct.task.repeater import RepeaterTask
 
@@ -51,3 +53,44 @@ class TestRepeaterTask(unittest.TestCase):
 
         artifact = t.artifact()
         self.assertIsInstance(artifact, CompositeArtifact)
+
+
+ARTIFACT_CALLS = []
+
+
+class CountedArtifactTask(Task):
+    def __init__(self, a):
+        self.a = a
+
+    def artifact(self):
+        ARTIFACT_CALLS.append(self.a)
+        return InMemoryArtifact(f"counted-{self.a}", STORE)
+
+    def run(self):
+        return self.a
+
+
+class TestRepeaterArtifactCache(unittest.TestCase):
+    def setUp(self):
+        STORE.clear()
+        ARTIFACT_CALLS.clear()
+
+    def test_artifact_resolved_once_per_run(self):
+        t = RepeaterTask(CountedArtifactTask, {"a": [0, 1, 2]})
+
+        result = ImmediateBackend().run(t)
+
+        self.assertEqual([0, 1, 2], result)
+        self.assertEqual([0, 1, 2], sorted(ARTIFACT_CALLS))
+
+    def test_forget_task(self):
+        t = CountedArtifactTask(0)
+
+        with use_snapshot():
+            t._resolve_artifact()
+            t._resolve_artifact()
+            self.assertEqual(1, len(ARTIFACT_CALLS))
+
+            forget_task_artifact(t)
+            t._resolve_artifact()
+            self.assertEqual(2, len(ARTIFACT_CALLS))
@@ -2,6 +2,7 @@ import datetime
 from typing import Optional
 import unittest
 
+import cloudpickle
 import omegaconf as oc
 import pandas as pd
 
@@ -16,11 +17,21 @@ from aqueduct.config import set_config, resolve_config_from_spec
 from aqueduct.task import (
     Task,
     AggregateTask,
+    MapReduceTask,
+)
+from aqueduct.task.mapreduce import (
+    DEFAULT_BATCH_SIZE,
+    AbstractMapReduceTask,
+    iter_batches,
+    map_reduce_units,
 )
 
 from aqueduct.task.autoresolve import fetch_args_from_config
 from aqueduct.task.autostore import resolve_writer
+from aqueduct.task.serialize import deserialize_task, serialize_task
+from aqueduct.artifact.snapshot import use_snapshot
 from aqueduct.base import run
+from aqueduct.staleness import find_stale_tasks, mark_stale_tasks
 from aqueduct import apply
 
 
@@ -224,6 +235,59 @@ class FarDepOnDate(Task):
         return TaskDependsOnDate()
 
 
+class TaskUpdatedAfterArtifact(Task):
+    AQ_UPDATED = "2024-01-01"
+
+    def artifact(self):
+        return FixedDateArtifact(datetime.datetime(2023, 1, 1))
+
+
+class TestStaleness(unittest.TestCase):
+    def test_updated_before_artifact(self):
+        t = TaskWithDate()
+
+        self.assertFalse(t.is_stale())
+        self.assertTrue(t.is_cached())
+
+    def test_updated_after_artifact(self):
+        t = TaskUpdatedAfterArtifact()
+
+        self.assertTrue(t.is_stale())
+        self.assertFalse(t.is_cached())
+
+    def test_upstream_newer_than_artifact(self):
+        stale = find_stale_tasks(FarDepOnDate())
+
+        self.assertEqual({TaskDependsOnDate()._unique_key()}, stale)
+
+    def test_stale_propagates_downstream(self):
+        class DependsOnUpdated(Task):
+            def requirements(self):
+                return TaskUpdatedAfterArtifact()
+
+            def artifact(self):
+                return FixedDateArtifact(datetime.datetime(2025, 1, 1))
+
+        stale = find_stale_tasks(DependsOnUpdated())
+
+        self.assertEqual(
+            {
+                TaskUpdatedAfterArtifact()._unique_key(),
+                DependsOnUpdated()._unique_key(),
+            },
+            stale,
+        )
+
+    def test_marked_stale_during_run(self):
+        with use_snapshot():
+            self.assertTrue(TaskDependsOnDate().is_cached())
+
+        with use_snapshot():
+            mark_stale_tasks(FarDepOnDate())
+            self.assertFalse(TaskDependsOnDate().is_cached())
+            self.assertTrue(TaskWithDate().is_cached())
+
+
 def square(x):
     return x * x
 
@@ -243,3 +307,83 @@ class TestApply(unittest.TestCase):
         t = AppliedClass(2, 2, 2)
         result = run(t)
         self.assertEqual(36, result)
+
+    def test_apply_async(self):
+        class AsyncPretenseTask(PretenseTask):
+            async def run(self, requirements=None):
+                return self.a + self.b + self.c
+
+        self.assertEqual(36, run(apply(square, AsyncPretenseTask(2, 2, 2))))
+        self.assertEqual(36, run(apply(square, AsyncPretenseTask)(2, 2, 2)))
+
+
+class TestBatchSize(unittest.TestCase):
+    def test_iter_batches(self):
+        batches = list(iter_batches(iter(range(7)), 3))
+        self.assertEqual([[0, 1, 2], [3, 4, 5], [6]], batches)
+
+    def test_batch_size(self):
+        class ItemTask(MapReduceTask):
+            pass
+
+        class BatchTask(MapReduceTask):
+            def map_batch(self, items, requirements=None):
+                return items
+
+        class FixedTask(MapReduceTask):
+            AQ_BATCH_SIZE = 10
+
+        self.assertEqual(1, ItemTask()._batch_size(1000, 4))
+        self.assertEqual(10, FixedTask()._batch_size(1000, 4))
+        self.assertEqual(63, BatchTask()._batch_size(1000, 4))
+        self.assertEqual(DEFAULT_BATCH_SIZE, BatchTask()._batch_size(None, 4))
+
+    def test_single_item_batches(self):
+        class BatchOnlyTask(AbstractMapReduceTask):
+            AQ_BATCH_SIZE = 1
+
+            def map_batch(self, items, requirements=None):
+                return sum(items)
+
+        batched, units = map_reduce_units(BatchOnlyTask(), [1, 2])
+        self.assertTrue(batched)
+        self.assertEqual([[1], [2]], list(units))
+
+
+class PretenseSubtask(PretenseTask):
+    def __init__(self, d, a=1):
+        super().__init__(a)
+        self.d = d
+
+
+class TestSerializeTask(unittest.TestCase):
+    def test_compact(self):
+        t = PretenseTask(1, b=2)
+        serialized = serialize_task(t)
+        deserialized = deserialize_task(serialized)
+
+        self.assertIsInstance(deserialized, PretenseTask)
+        self.assertEqual(t._unique_key(), deserialized._unique_key())
+        self.assertEqual(15, run(deserialized))
+        self.assertLess(len(serialized), len(cloudpickle.dumps(t)))
+
+    def test_subclass_arguments(self):
+        # The arguments of the subclass are kept, rather than those sent to super().
+        self.assertNotEqual(
+            PretenseSubtask(1)._unique_key(), PretenseSubtask(2)._unique_key()
+        )
+
+        deserialized = deserialize_task(serialize_task(PretenseSubtask(3, a=2)))
+        self.assertEqual(3, deserialized.d)
+        self.assertEqual(2, deserialized.a)
+
+    def test_fallback(self):
+        class LocalTask(Task):
+            def __init__(self, value):
+                self.value = value
+
+            def run(self):
+                return self.value
+
+        local = deserialize_task(serialize_task(LocalTask(4)))
+        self.assertEqual(4, run(local))
@@ -0,0 +1,198 @@
+import tempfile
+import unittest
+
+from aqueduct import Task
+from aqueduct.artifact.snapshot import use_snapshot
+from aqueduct.cli.base import (
+    PeelParentTaskClasses,
+    peel_parents,
+    tasks_within_depth,
+)
+from aqueduct.task_graph import TaskGraph
+
+
+class Leaf(Task):
+    def __init__(self, value):
+        self.value = value
+
+    def run(self):
+        return self.value
+
+
+class Branch(Task):
+    def __init__(self, offset):
+        self.offset = offset
+
+    def requirements(self):
+        return Leaf(1)
+
+    def run(self, requirements):
+        return requirements + self.offset
+
+
+class Diamond(Task):
+    def requirements(self):
+        return {"left": Branch(1), "right": Branch(2), "leaves": [Leaf(1), Leaf(1)]}
+
+    def run(self, requirements):
+        return requirements
+
+
+class Chain(Task):
+    def __init__(self, length):
+        self.length = length
+
+    def requirements(self):
+        if self.length > 0:
+            return Chain(self.length - 1)
+        else:
+            return None
+
+    def run(self, requirements=None):
+        return 0 if requirements is None else requirements + 1
+
+
+class Shortcut(Task):
+    def requirements(self):
+        return [Chain(2), Chain(1)]
+
+    def run(self, requirements):
+        return requirements
+
+
+ARTIFACT_CALLS = []
+
+
+class StoredLeaf(Task):
+    def __init__(self, path):
+        self.path = path
+
+    def artifact(self):
+        ARTIFACT_CALLS.append(self.path)
+        return self.path
+
+    def run(self):
+        return 1
+
+
+class StoredRoot(Task):
+    def __init__(self, directory):
+        self.directory = directory
+
+    def requirements(self):
+        return [StoredLeaf(f"{self.directory}/{i}.pkl") for i in range(3)]
+
+    def run(self, requirements):
+        return sum(requirements)
+
+
+class TestTaskGraph(unittest.TestCase):
+    def test_shared_tasks_are_interned(self):
+        graph = TaskGraph.build(Diamond())
+
+        self.assertEqual(4, len(graph))
+        self.assertEqual(1, len([t for t in graph.tasks if isinstance(t, Leaf)]))
+
+    def test_topological_order(self):
+        graph = TaskGraph.build(Diamond())
+
+        for node in range(len(graph)):
+            for dependency in graph.dependencies(node):
+                self.assertLess(dependency, node)
+
+    def test_on_node(self):
+        added = []
+
+        def on_node(graph, node):
+            # The dependencies of a node are complete when it is added.
+            deps = [graph.keys[d] for d in graph.dependencies(node)]
+            added.append((graph.keys[node], deps))
+
+        graph = TaskGraph.build(Diamond(), on_node=on_node)
+
+        self.assertEqual([(k, added[n][1]) for n, k in enumerate(graph.keys)], added)
+        self.assertEqual([Leaf(1)._unique_key()], added[1][1])
+
+    def test_reverse_edges(self):
+        graph = TaskGraph.build(Diamond())
+        leaf = graph.index[Leaf(1)._unique_key()]
+        diamond = graph.index[Diamond()._unique_key()]
+
+        dependents = [graph.tasks[n] for n in graph.dependents(leaf)]
+        self.assertEqual(3, len(dependents))
+        self.assertEqual([], list(graph.dependents(diamond)))
+
+    def test_requirements_structure(self):
+        graph = TaskGraph.build(Diamond())
+        diamond = graph.index[Diamond()._unique_key()]
+
+        requirements = graph.map_requirements(diamond, graph.tasks.__getitem__)
+        self.assertIsInstance(requirements["left"], Branch)
+        self.assertEqual(2, len(requirements["leaves"]))
+
+    def test_occurrences(self):
+        graph = TaskGraph.build(Diamond())
+        occurrences = graph.occurrences()
+
+        self.assertEqual(4, occurrences[graph.index[Leaf(1)._unique_key()]])
+
+    def test_depths(self):
+        graph = TaskGraph.build(Diamond())
+        depths = graph.depths()
+
+        self.assertEqual(1, depths[graph.index[Leaf(1)._unique_key()]])
+        self.assertEqual(0, depths[graph.index[Diamond()._unique_key()]])
+
+    def test_root_tree(self):
+        graph = TaskGraph.build([Leaf(1), (Branch(1), Leaf(2))])
+
+        root = graph.map_root(graph.tasks.__getitem__)
+        self.assertIsInstance(root[1], tuple)
+        self.assertIsInstance(root[1][0], Branch)
+
+    def test_deep_chain(self):
+        graph = TaskGraph.build(Chain(3000))
+
+        self.assertEqual(3001, len(graph))
+
+    def test_visit_deep_chain(self):
+        tasks = PeelParentTaskClasses().visit(Chain(3000), [])
+
+        self.assertEqual(3001, len(tasks))
+        self.assertEqual(
+            [Chain(2999)._unique_key()],
+            [t._unique_key() for t in peel_parents(Chain(3000))],
+        )
+
+    def test_artifacts_are_resolved_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ARTIFACT_CALLS.clear()
+            TaskGraph.build(StoredRoot(directory))
+            self.assertEqual(3, len(ARTIFACT_CALLS))
+
+            ARTIFACT_CALLS.clear()
+            with use_snapshot():
+                TaskGraph.build(StoredRoot(directory))
+            self.assertEqual(3, len(ARTIFACT_CALLS))
+
+    def test_tasks_within_depth(self):
+        keys = [t._unique_key() for t in tasks_within_depth(Shortcut(), 2)]
+
+        # Chain(1) is also required by Chain(2), one level deeper.
+        self.assertCountEqual(
+            [t._unique_key() for t in [Shortcut(), Chain(2), Chain(1), Chain(0)]],
+            keys,
+        )
+
+    def test_tasks_within_depth_are_not_expanded_further(self):
+        requirement_calls = []
+
+        class Counted(Chain):
+            def requirements(self):
+                requirement_calls.append(self.length)
+                return Counted(self.length - 1) if self.length > 0 else None
+
+        tasks = tasks_within_depth(Counted(1000), 2)
+
+        self.assertEqual(3, len(tasks))
+        self.assertEqual([1000, 999], requirement_calls)
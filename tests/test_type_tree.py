@@ -19,3 +19,26 @@ class TestTypeTree(unittest.TestCase):
         self.assertEqual(result[1], 4)
 
         self.assertEqual(result[2]["a"]["b"], 10)  # type: ignore
+
+    def test_map_preserves_structure(self):
+        tree = [1, (2, None), {"a": [3], "b": {}}]
+
+        result = _map_type_in_tree(tree, int, lambda x: 2 * x)
+
+        self.assertEqual([2, (4, None), {"a": [6], "b": {}}], result)
+
+    def test_deeply_nested(self):
+        tree = []
+        for i in range(10000):
+            tree = [tree, {"value": i}]
+
+        self.assertEqual(
+            sum(range(10000)), reduce_type_in_tree(tree, int, int.__add__, 0)
+        )
+
+        mapped = _map_type_in_tree(tree, int, lambda x: x + 1)
+        self.assertEqual(10000, mapped[1]["value"])
+
+    def test_unhandled_node(self):
+        with self.assertRaises(ValueError):
+            _map_type_in_tree([1, "a"], int, lambda x: x)